@@ -13,17 +13,83 @@ class FuncaoAtivacao:
     A função de ativação tem o objetivo de introduzir não linearidade na rede.
     Para ser utilizada numa descida de gradiente, a função de ativação deve ser
     diferenciável.
+
+    Todas as operações aceitam um parâmetro opcional `out`, uma matriz onde é escrito
+    o resultado (que pode ser a própria matriz de entrada), evitando a alocação de
+    novas matrizes a cada lote.
+
+    Atributos:
+        derivada_pela_saida: Se verdadeiro, a derivada pode ser calculada apenas a
+        partir da saída da função (por exemplo, s' = s * (1 - s) para a sigmóide),
+        pelo que a camada pode aplicar a função no próprio lugar e dispensar os
+        valores de entrada na retropropagação.
     """
 
-    def aplicar(self, x):
+    derivada_pela_saida = False
+
+    def aplicar(self, x, out=None):
         """
         Aplica a função de ativação a uma matriz de valores x.
 
         Parâmetros:
             x: Valores a aplicar a função de ativação.
+            out: Matriz onde escrever o resultado (opcional).
+        """
+        raise NotImplementedError
+
+    def derivada(self, x, saida=None, out=None):
+        """
+        Calcula a derivada da função de ativação para uma matriz de valores x,
+        necessária para a retropropagação do erro.
+
+        Parâmetros:
+            x: Valores em que se calcula a derivada (antes de aplicar a função).
+            Pode ser None se `derivada_pela_saida` for verdadeiro e a saída for dada.
+            saida: Resultado de `aplicar(x)`, já calculado na propagação, que é
+            reutilizado para evitar calcular a função de novo (opcional).
+            out: Matriz onde escrever o resultado (opcional, pode ser `saida`).
         """
         raise NotImplementedError
 
+    def propagar_gradiente(self, gradiente, x, saida=None, out=None):
+        """
+        Propaga o gradiente da perda em relação às saídas da função para o gradiente
+        em relação às entradas da função (regra da cadeia).
+
+        Para funções aplicadas elemento a elemento, corresponde ao produto do
+        gradiente pela derivada.
+
+        Parâmetros:
+            gradiente: Gradiente da perda em relação às saídas da função.
+            x: Valores de entrada da função (ver `derivada`).
+            saida: Resultado de `aplicar(x)` (opcional).
+            out: Matriz onde escrever o resultado (opcional, pode ser `saida`).
+
+        Retorna:
+            Gradiente da perda em relação às entradas da função.
+        """
+
+        resultado = self.derivada(x, saida, out=out)
+        return np.multiply(resultado, gradiente, out=resultado)
+
+    def configuracao(self):
+        """
+        Obtém os parâmetros da função de ativação, para que possa ser guardada e
+        recriada com `criar_funcao_ativacao`.
+
+        Retorna:
+            Dicionário com os argumentos do construtor da função de ativação.
+        """
+
+        return {}
+
+    def _saida(self, x, saida, out):
+        """
+        Obtém a saída da função, reutilizando a saída dada, se existir.
+        """
+
+        return saida if saida is not None else self.aplicar(x, out=out)
+
 
 class Degrau(FuncaoAtivacao):
     """
@@ -44,18 +110,382 @@ class Degrau(FuncaoAtivacao):
         self.__limiar = limiar
         super().__init__()
 
-    def aplicar(self, x):
+    @property
+    def limiar(self):
+        return self.__limiar
+
+    def configuracao(self):
+        return {"limiar": self.__limiar}
+
+    def aplicar(self, x, out=None):
         """
         Aplica a função degrau a uma matriz de valores x.
 
         Parâmetros:
             x: Valores a aplicar à função degrau.
+            out: Matriz onde escrever o resultado (opcional).
 
         Retorna:
             Valores resultantes da aplicação da função degrau.
         """
 
-        return np.heaviside(x, self.__limiar)
+        return np.heaviside(x, self.__limiar, out=out)
+
+
+class Sigmoide(FuncaoAtivacao):
+    """
+    Classe para representar a função de ativação sigmóide (logística).
+
+    A função sigmóide mapeia os valores reais para o intervalo ]0, 1[, sendo
+    adequada para saídas binárias ou que representem probabilidades.
+    """
+
+    derivada_pela_saida = True
+
+    def aplicar(self, x, out=None):
+        """
+        Aplica a função sigmóide, 1 / (1 + e^-x), a uma matriz de valores x.
+
+        Parâmetros:
+            x: Valores a aplicar à função sigmóide.
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Valores resultantes da aplicação da função sigmóide.
+        """
+
+        # Para x muito negativo, e^-x excede a gama de vírgula flutuante (infinito),
+        # mas o resultado 1 / infinito = 0 continua correto
+        if out is None:
+            out = np.empty(np.shape(x), dtype=np.result_type(x, np.float32))
+        with np.errstate(over="ignore"):
+            out = np.negative(x, out=out)
+            np.exp(out, out=out)
+            np.add(out, 1, out=out)
+            return np.reciprocal(out, out=out)
+
+    def derivada(self, x, saida=None, out=None):
+        """
+        Calcula a derivada da função sigmóide, dada por s(x) * (1 - s(x)).
+
+        Parâmetros:
+            x: Valores em que se calcula a derivada.
+            saida: Valores s(x) já calculados (opcional).
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Valores da derivada da função sigmóide.
+        """
+
+        s = self._saida(x, saida, out)
+
+        # s * (1 - s) = 1/4 - (s - 1/2)^2, que pode ser calculado no próprio lugar
+        out = np.subtract(s, 0.5, out=out)
+        np.multiply(out, out, out=out)
+        return np.subtract(0.25, out, out=out)
+
+
+class TangenteHiperbolica(FuncaoAtivacao):
+    """
+    Classe para representar a função de ativação tangente hiperbólica.
+
+    A tangente hiperbólica mapeia os valores reais para o intervalo ]-1, 1[,
+    sendo centrada em 0, o que é adequado para camadas escondidas.
+    """
+
+    derivada_pela_saida = True
+
+    def aplicar(self, x, out=None):
+        """
+        Aplica a tangente hiperbólica a uma matriz de valores x.
+
+        Parâmetros:
+            x: Valores a aplicar à tangente hiperbólica.
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Valores resultantes da aplicação da tangente hiperbólica.
+        """
+
+        return np.tanh(x, out=out)
+
+    def derivada(self, x, saida=None, out=None):
+        """
+        Calcula a derivada da tangente hiperbólica, dada por 1 - tanh(x)^2.
+
+        Parâmetros:
+            x: Valores em que se calcula a derivada.
+            saida: Valores tanh(x) já calculados (opcional).
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Valores da derivada da tangente hiperbólica.
+        """
+
+        t = self._saida(x, saida, out)
+        out = np.multiply(t, t, out=out)
+        return np.subtract(1, out, out=out)
+
+
+class ReLU(FuncaoAtivacao):
+    """
+    Classe para representar a função de ativação retificadora (ReLU), max(0, x).
+
+    A ReLU não satura para valores positivos, o que acelera a aprendizagem em redes
+    profundas. A derivada em 0 é indefinida, considerando-se 0.
+    """
+
+    derivada_pela_saida = True
+
+    def aplicar(self, x, out=None):
+        """
+        Aplica a função ReLU a uma matriz de valores x.
+
+        Parâmetros:
+            x: Valores a aplicar à função ReLU.
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Valores resultantes da aplicação da função ReLU.
+        """
+
+        return np.maximum(x, 0, out=out)
+
+    def derivada(self, x, saida=None, out=None):
+        """
+        Calcula a derivada da função ReLU: 1 para valores positivos, 0 caso contrário.
+        Como max(0, x) > 0 se e só se x > 0, pode ser usada a saída ou a entrada.
+
+        Parâmetros:
+            x: Valores em que se calcula a derivada.
+            saida: Valores max(0, x) já calculados (opcional).
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Valores da derivada da função ReLU.
+        """
+
+        valores = saida if saida is not None else x
+        if out is None:
+            out = np.empty_like(valores, dtype=np.result_type(valores, np.float32))
+        return np.greater(valores, 0, out=out)
+
+
+class LeakyReLU(FuncaoAtivacao):
+    """
+    Classe para representar a função de ativação ReLU com fuga, que multiplica os
+    valores negativos por um declive alfa em vez de os anular, evitando neurónios
+    que deixam de aprender.
+
+    Parâmetros:
+        alfa: Declive para os valores negativos (0 < alfa < 1).
+    """
+
+    derivada_pela_saida = True
+
+    def __init__(self, alfa=0.01):
+        assert 0 < alfa < 1
+        self.__alfa = alfa
+        super().__init__()
+
+    @property
+    def alfa(self):
+        return self.__alfa
+
+    def configuracao(self):
+        return {"alfa": self.__alfa}
+
+    def aplicar(self, x, out=None):
+        """
+        Aplica a função ReLU com fuga, max(alfa * x, x), a uma matriz de valores x.
+
+        Parâmetros:
+            x: Valores a aplicar à função.
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Valores resultantes da aplicação da função.
+        """
+
+        if out is None:
+            out = np.array(x, dtype=np.result_type(x, np.float32))
+        elif out is not x:
+            np.copyto(out, x)
+        return np.multiply(out, self.__alfa, out=out, where=out < 0)
+
+    def derivada(self, x, saida=None, out=None):
+        """
+        Calcula a derivada da função ReLU com fuga: 1 para valores positivos, alfa
+        caso contrário. O sinal da saída é igual ao da entrada.
+
+        Parâmetros:
+            x: Valores em que se calcula a derivada.
+            saida: Valores já calculados da função (opcional).
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Valores da derivada da função.
+        """
+
+        valores = saida if saida is not None else x
+        if out is None:
+            out = np.empty_like(valores, dtype=np.result_type(valores, np.float32))
+        np.greater(valores, 0, out=out)
+        np.multiply(out, 1 - self.__alfa, out=out)
+        return np.add(out, self.__alfa, out=out)
+
+
+class Softmax(FuncaoAtivacao):
+    """
+    Classe para representar a função de ativação softmax, que transforma cada linha
+    de valores numa distribuição de probabilidade (valores positivos de soma 1).
+
+    Ao contrário das restantes funções, cada saída depende de todas as entradas da
+    mesma linha, pelo que a propagação do gradiente usa o produto pela matriz
+    jacobiana e não apenas a derivada elemento a elemento.
+    """
+
+    derivada_pela_saida = True
+
+    def aplicar(self, x, out=None):
+        """
+        Aplica a função softmax, e^x / soma(e^x), a cada linha de uma matriz x.
+
+        Subtrai-se o máximo de cada linha antes da exponencial, o que não altera o
+        resultado mas evita que a exponencial exceda a gama de vírgula flutuante.
+
+        Parâmetros:
+            x: Valores a aplicar à função softmax.
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Valores resultantes da aplicação da função softmax.
+        """
+
+        if out is None:
+            out = np.empty(np.shape(x), dtype=np.result_type(x, np.float32))
+        maximo = np.max(x, axis=-1, keepdims=True)
+        out = np.subtract(x, maximo, out=out)
+        np.exp(out, out=out)
+        return np.divide(out, np.sum(out, axis=-1, keepdims=True), out=out)
+
+    def derivada(self, x, saida=None, out=None):
+        """
+        Calcula a diagonal da matriz jacobiana da função softmax, s * (1 - s).
+        Para a retropropagação deve ser usada `propagar_gradiente`.
+
+        Parâmetros:
+            x: Valores em que se calcula a derivada.
+            saida: Valores já calculados da função (opcional).
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Valores da diagonal da jacobiana.
+        """
+
+        s = self._saida(x, saida, out)
+        out = np.subtract(s, 0.5, out=out)
+        np.multiply(out, out, out=out)
+        return np.subtract(0.25, out, out=out)
+
+    def propagar_gradiente(self, gradiente, x, saida=None, out=None):
+        """
+        Propaga o gradiente através da função softmax, multiplicando-o pela matriz
+        jacobiana sem a construir: s * (g - soma(g * s)).
+
+        Parâmetros:
+            gradiente: Gradiente da perda em relação às saídas da função.
+            x: Valores de entrada da função.
+            saida: Resultado de `aplicar(x)` (opcional).
+            out: Matriz onde escrever o resultado (opcional, pode ser `saida`).
+
+        Retorna:
+            Gradiente da perda em relação às entradas da função.
+        """
+
+        s = saida if saida is not None else self.aplicar(x)
+        produto = np.einsum("...i,...i->...", gradiente, s)[..., np.newaxis]
+        if out is s:
+            out = None
+        out = np.subtract(gradiente, produto, out=out)
+        return np.multiply(out, s, out=out)
+
+
+class Linear(FuncaoAtivacao):
+    """
+    Classe para representar a função de ativação linear (identidade), usada em
+    camadas de saída para regressão. Camadas lineares consecutivas equivalem a uma
+    única camada linear.
+    """
+
+    derivada_pela_saida = True
+
+    def aplicar(self, x, out=None):
+        """
+        Aplica a função identidade a uma matriz de valores x.
+
+        Parâmetros:
+            x: Valores a aplicar à função.
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Os próprios valores (copiados para `out`, se for dada).
+        """
+
+        if out is None or out is x:
+            return x
+        np.copyto(out, x)
+        return out
+
+    def derivada(self, x, saida=None, out=None):
+        """
+        Calcula a derivada da função identidade, que é sempre 1.
+
+        Parâmetros:
+            x: Valores em que se calcula a derivada.
+            saida: Valores já calculados da função (opcional).
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Matriz de uns.
+        """
+
+        valores = saida if saida is not None else x
+        if out is None:
+            return np.ones_like(valores, dtype=np.result_type(valores, np.float32))
+        out.fill(1)
+        return out
+
+    def propagar_gradiente(self, gradiente, x, saida=None, out=None):
+        """
+        Propaga o gradiente através da função identidade, que não o altera.
+        """
+
+        if out is None:
+            return gradiente
+        np.copyto(out, gradiente)
+        return out
+
+
+def criar_funcao_ativacao(nome, **parametros):
+    """
+    Cria uma função de ativação a partir do nome da sua classe e dos seus parâmetros,
+    tal como obtidos com `configuracao`.
+
+    Parâmetros:
+        nome: Nome da classe da função de ativação (por exemplo, "Degrau").
+        parametros: Argumentos do construtor da função de ativação.
+
+    Retorna:
+        Nova função de ativação.
+
+    Exceções:
+        AssertionError: Se não existir uma função de ativação com o nome dado.
+    """
+
+    classes = {classe.__name__: classe for classe in FuncaoAtivacao.__subclasses__()}
+    assert nome in classes
+    return classes[nome](**parametros)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,42 @@
+import copy
+import time
 import numpy as np
+from lib.rna.ativacao import Linear
+from lib.rna.esparsa import MatrizEsparsa
+
+# Densidade (fração de valores não nulos) abaixo da qual as entradas de uma camada
+# larga são multiplicadas pelos pesos como matriz esparsa (ver `calibrar_esparsidade`)
+LIMIAR_DENSIDADE = 0.005
+
+# Dimensão de entrada mínima para verificar a densidade de entradas densas (numa
+# camada estreita, o produto denso é sempre mais rápido do que a conversão)
+MIN_DIM_ESPARSA = 1024
+
+# Número de linhas de entradas densas usadas para estimar a sua densidade
+AMOSTRA_DENSIDADE = 64
+
+# Maior valor absoluto dos inteiros de 8 bits da quantização simétrica
+MAX_INT8 = 127
+
+# Densidade dos pesos podados até à qual são guardados numa matriz esparsa
+LIMIAR_DENSIDADE_PESOS = 0.1
+
+# Valor máximo de (amostras do lote x densidade dos pesos) para o qual o produto
+# pelos pesos esparsos é mais rápido do que o produto denso (medido com lotes de 1
+# a 64 amostras e camadas de 1024x256 e 4096x512)
+LIMIAR_PRODUTO_ESPARSO = 0.1
+
+
+def _validar_tipo(dtype):
+    dtype = np.dtype(dtype)
+    assert np.issubdtype(dtype, np.floating)
+    return dtype
+
+
+def _converter(valores, dtype):
+    valores = np.asarray(valores)
+    assert np.can_cast(valores.dtype, dtype, casting="same_kind")
+    return valores.astype(dtype, copy=False)
 
 
 class CamadaDensa:
@@ -14,8 +52,18 @@ class CamadaDensa:
         neurónio vai ter para a camada anterior
         dim_saida: Dimensão de saída da camada - quantidade de neurónios na camada
         funcao_ativacao: Função de ativação da camada.
+        dtype: Tipo de vírgula flutuante dos pesos e pendores (por exemplo,
+        np.float32 reduz para metade a memória e a largura de banda necessárias).
+        inicializar: Se falso, os pesos e pendores começam a zero, sem o custo da
+        inicialização aleatória, para serem substituídos (por exemplo, ao carregar).
         pesos: Pesos da camada, inicializados com uma distribuição normal.
         pendores: Pendores da camada, inicializados com uma distribuição normal.
+        limiar_densidade: Densidade das entradas abaixo da qual o produto pelos
+        pesos é esparso (ver `ativar`).
+
+    Uma camada quantizada (ver `quantizar`) guarda os pesos como inteiros de 8 bits,
+    e uma camada podada (ver `podar`) pode guardar apenas os pesos não nulos, numa
+    matriz esparsa, ambas só para inferência.
     """
 
     def __init__(
@@ -23,78 +71,1352 @@ class CamadaDensa:
         dim_entrada,
         dim_saida,
         funcao_ativacao=None,
+        dtype=np.float64,
+        inicializar=True,
     ):
         self.__funcao_ativacao = funcao_ativacao
         self.dim_entrada = dim_entrada
         self.dim_saida = dim_saida
-        self.__pesos = np.random.randn(dim_entrada, dim_saida)
-        self.__pendores = np.random.randn(dim_saida)
+        self.__dtype = _validar_tipo(dtype)
+        if inicializar:
+            self.__pesos = np.random.randn(dim_entrada, dim_saida).astype(self.__dtype)
+            self.__pendores = np.random.randn(dim_saida).astype(self.__dtype)
+        else:
+            self.__pesos = np.zeros((dim_entrada, dim_saida), dtype=self.__dtype)
+            self.__pendores = np.zeros(dim_saida, dtype=self.__dtype)
+        self.__memoria_treino = None
+        self.__gradiente_pesos = None
+        self.__gradiente_pendores = None
+        self.__perfil = None
+        self.__nome_perfil = None
+        self.__quantizacao = None
+        self.__pesos_esparsos = None
+        self.limiar_densidade = LIMIAR_DENSIDADE
 
     @property
     def pesos(self):
+        """
+        Pesos da camada (numa camada quantizada ou com pesos esparsos, a matriz
+        densa, calculada a pedido).
+        """
+        if self.__quantizacao is not None:
+            return self.__pesos * self.__quantizacao[0]
+        if self.__pesos_esparsos is not None and self.__pesos is None:
+            return self.__pesos_esparsos.densa(self.__dtype).T
         return self.__pesos
 
     @property
     def pendores(self):
         return self.__pendores
 
+    @property
+    def dtype(self):
+        return self.__dtype
+
+    @property
+    def quantizada(self):
+        return self.__quantizacao is not None
+
+    @property
+    def pesos_quantizados(self):
+        """
+        Pesos inteiros (np.int8) de uma camada quantizada, ou None.
+        """
+        return self.__pesos if self.__quantizacao is not None else None
+
+    @property
+    def escalas(self):
+        """
+        Tuplo (escala de cada neurónio dos pesos, escala das entradas) de uma camada
+        quantizada, ou None.
+        """
+        return self.__quantizacao
+
+    @property
+    def pesos_esparsos(self):
+        """
+        Pesos não nulos de uma camada podada guardados numa matriz esparsa (uma
+        linha por neurónio, com os pesos das suas entradas), ou None.
+        """
+        return self.__pesos_esparsos
+
+    @property
+    def num_parametros(self):
+        """
+        Número de parâmetros guardados (numa camada com pesos esparsos, apenas os
+        pesos não nulos).
+        """
+        if not self.treinavel:
+            return 0
+        if self.__pesos_esparsos is not None:
+            return self.__pesos_esparsos.num_nao_nulos + self.dim_saida
+        return (self.dim_entrada + 1) * self.dim_saida
+
+    @property
+    def nbytes(self):
+        """
+        Memória ocupada pelos parâmetros da camada, em bytes (incluindo a cópia
+        densa dos pesos esparsos, se existir, ver `ativar`).
+        """
+        num_bytes = self.__pendores.nbytes
+        if self.__pesos is not None:
+            num_bytes += self.__pesos.nbytes
+        if self.__quantizacao is not None:
+            num_bytes += self.__quantizacao[0].nbytes
+        if self.__pesos_esparsos is not None:
+            num_bytes += self.__pesos_esparsos.nbytes
+        return num_bytes
+
+    @property
+    def forma_entrada(self):
+        return (self.dim_entrada,)
+
+    @property
+    def forma_saida(self):
+        return (self.dim_saida,)
+
+    @property
+    def funcao_ativacao(self):
+        return self.__funcao_ativacao
+
+    @property
+    def treinavel(self):
+        """
+        Indica se a camada tem parâmetros a aprender. A camada de entrada, sem
+        função de ativação, apenas passa as entradas à camada seguinte.
+        """
+        return self.__funcao_ativacao is not None and self.dim_entrada > 0
+
+    @property
+    def perfil(self):
+        return self.__perfil
+
+    @property
+    def gradiente_pesos(self):
+        return self.__gradiente_pesos
+
+    @property
+    def gradiente_pendores(self):
+        return self.__gradiente_pendores
+
     def atualizar_pesos(self, pesos):
         """
-        Atualiza os pesos da camada.
+        Atualiza os pesos da camada, convertidos para o tipo de dados da camada
+        (sem cópia, se já forem desse tipo). Numa camada quantizada ou com pesos
+        esparsos, os novos pesos substituem os inteiros ou a matriz esparsa.
 
         Parâmetros:
             pesos: Novos pesos da camada.
 
         Exceções:
             AssertionError: Se a dimensão dos pesos não for igual à dimensão dos pesos
-            da camada.
+            da camada, ou se o seu tipo não puder ser convertido (por exemplo,
+            números complexos).
         """
 
-        assert pesos.shape == self.__pesos.shape
-        self.__pesos = pesos
+        assert pesos.shape == (self.dim_entrada, self.dim_saida)
+        self.__pesos = _converter(pesos, self.__dtype)
+        self.__quantizacao = None
+        self.__pesos_esparsos = None
 
     def atualizar_pendores(self, pendores):
         """
-        Atualiza os pendores da camada.
+        Atualiza os pendores da camada, convertidos para o tipo de dados da camada
+        (sem cópia, se já forem desse tipo).
 
         Parâmetros:
             pendores: Novos pendores da camada.
 
         Exceções:
             AssertionError: Se a dimensão dos pendores não for igual à dimensão dos
-            pendores da camada.
+            pendores da camada, ou se o seu tipo não puder ser convertido.
         """
 
         assert pendores.shape == self.__pendores.shape
-        self.__pendores = pendores
+        self.__pendores = _converter(pendores, self.__dtype)
+
+    def converter_tipo(self, dtype):
+        """
+        Converte os pesos e pendores da camada para outro tipo de vírgula flutuante.
+
+        Parâmetros:
+            dtype: Novo tipo de dados da camada.
+        """
+
+        self.__dtype = _validar_tipo(dtype)
+        self.__pendores = self.__pendores.astype(self.__dtype, copy=False)
+        if self.__quantizacao is not None:
+            escalas, escala_entrada = self.__quantizacao
+            self.__quantizacao = (escalas.astype(self.__dtype), escala_entrada)
+            return
+        if self.__pesos_esparsos is not None:
+            self.__pesos_esparsos = self.__pesos_esparsos.converter_tipo(self.__dtype)
+            self.__pesos = None
+            return
+        self.__pesos = self.__pesos.astype(self.__dtype, copy=False)
+
+    def copiar(self, dtype=None):
+        """
+        Cria uma cópia independente da camada, opcionalmente com outro tipo de dados.
+        A função de ativação é partilhada (não tem estado).
+
+        Parâmetros:
+            dtype: Tipo de dados da cópia (por omissão, o da camada).
+
+        Retorna:
+            Nova camada com os mesmos pesos e pendores.
+        """
+
+        copia = copy.copy(self)
+        copia.__dtype = _validar_tipo(self.__dtype if dtype is None else dtype)
+        if self.__pesos_esparsos is not None:
+            copia.__pesos_esparsos = self.__pesos_esparsos.converter_tipo(copia.__dtype)
+            copia.__pesos = None
+        else:
+            copia.__pesos = self.__pesos.astype(
+                self.__pesos.dtype if self.__quantizacao is not None else copia.__dtype
+            )
+        copia.__pendores = self.__pendores.astype(copia.__dtype)
+        if self.__quantizacao is not None:
+            escalas, escala_entrada = self.__quantizacao
+            copia.__quantizacao = (escalas.astype(copia.__dtype), escala_entrada)
+        copia.__memoria_treino = None
+        copia.__gradiente_pesos = None
+        copia.__gradiente_pendores = None
+        copia.__perfil = None
+        copia.__nome_perfil = None
+        return copia
+
+    def configuracao(self):
+        """
+        Obtém a descrição da camada (dimensões, tipo de dados e função de ativação),
+        sem os pesos e pendores, para que possa ser guardada e recriada.
+
+        Retorna:
+            Dicionário serializável em JSON.
+        """
+
+        funcao = self.__funcao_ativacao
+        return {
+            "dim_entrada": self.dim_entrada,
+            "dim_saida": self.dim_saida,
+            "dtype": self.__dtype.name,
+            "funcao_ativacao": (
+                None
+                if funcao is None
+                else {
+                    "nome": type(funcao).__name__,
+                    "parametros": funcao.configuracao(),
+                }
+            ),
+        }
+
+    def quantizar(self, escala_entrada):
+        """
+        Cria uma cópia da camada, só para inferência, com quantização simétrica dos
+        pesos em inteiros de 8 bits, com uma escala por neurónio (coluna dos pesos):
+        o maior peso absoluto de cada neurónio corresponde a MAX_INT8. A memória dos
+        pesos é 1/8 da de np.float64.
 
-    def ativar(self, entradas):
+        Na propagação, as entradas são também quantizadas em inteiros de 8 bits, com
+        a escala dada (calibrada com o maior valor absoluto das entradas, ver
+        `RedeNeuronal.quantizar`), e a soma dos produtos dos inteiros é exata, como
+        numa acumulação em inteiros de 32 bits. A desquantização (a multiplicação
+        pelo produto das escalas) é feita juntamente com a soma dos pendores.
+
+        Parâmetros:
+            escala_entrada: Valor de uma unidade das entradas quantizadas.
+
+        Retorna:
+            Nova camada quantizada.
+
+        Exceções:
+            AssertionError: Se a camada não for treinável ou a escala não for
+            positiva.
+        """
+
+        assert self.treinavel and escala_entrada > 0
+        pesos = self.pesos
+        escalas = np.max(np.abs(pesos), axis=0) / MAX_INT8
+        escalas[escalas == 0] = 1
+
+        copia = self.copiar()
+        copia.__pesos_esparsos = None
+        copia.__pesos = np.clip(np.rint(pesos / escalas), -MAX_INT8, MAX_INT8).astype(
+            np.int8
+        )
+        copia.__quantizacao = (escalas.astype(self.__dtype), float(escala_entrada))
+        return copia
+
+    def podar(self, limiar=None, manter=None):
+        """
+        Cria uma cópia da camada com os pesos de menor valor absoluto a zero (poda
+        por magnitude): os pesos abaixo de um limiar, ou todos exceto os `manter`
+        maiores de cada neurónio. Se a densidade dos pesos que restam for até
+        LIMIAR_DENSIDADE_PESOS, a cópia guarda apenas os pesos não nulos, numa
+        matriz esparsa com uma linha por neurónio, só para inferência (ver
+        `ativar`).
+
+        Parâmetros:
+            limiar: Valor absoluto abaixo do qual os pesos são podados.
+            manter: Número de pesos mantidos em cada neurónio.
+
+        Retorna:
+            Nova camada podada.
+
+        Exceções:
+            AssertionError: Se não for dado exatamente um dos critérios (com
+            `manter` positivo), se a camada não for treinável ou se estiver
+            quantizada.
+        """
+
+        assert (limiar is None) != (manter is None)
+        assert manter is None or manter > 0
+        assert self.treinavel and self.__quantizacao is None
+
+        pesos = np.array(self.pesos)
+        if limiar is not None:
+            pesos[np.abs(pesos) < limiar] = 0
+        elif manter < self.dim_entrada:
+            podados = np.argpartition(np.abs(pesos), -manter, axis=0)[:-manter]
+            np.put_along_axis(pesos, podados, 0, axis=0)
+
+        copia = self.copiar()
+        copia.atualizar_pesos(pesos)
+        if np.count_nonzero(pesos) <= LIMIAR_DENSIDADE_PESOS * pesos.size:
+            copia.__pesos_esparsos = MatrizEsparsa.de_densa(pesos.T)
+            copia.__pesos = None
+        return copia
+
+    def __produto_quantizado(self, entradas):
+        """
+        Multiplica as entradas, quantizadas, pelos pesos inteiros e desquantiza o
+        resultado. Os produtos de inteiros de 8 bits são somados em vírgula flutuante
+        (em que as somas de inteiros são exatas enquanto não excedem a mantissa),
+        porque o produto de matrizes inteiras do NumPy não usa a biblioteca BLAS e é
+        dezenas de vezes mais lento.
+        """
+
+        escalas, escala_entrada = self.__quantizacao
+        if isinstance(entradas, MatrizEsparsa):
+            entradas = entradas.densa(self.__dtype)
+
+        # Com float32, a soma é exata até 2^24 (mantissa de 24 bits)
+        maximo = self.dim_entrada * MAX_INT8 * MAX_INT8
+        tipo = np.float32 if maximo < 2**24 else np.float64
+
+        x = np.multiply(entradas, 1 / escala_entrada, dtype=tipo)
+        np.rint(x, out=x)
+        np.clip(x, -MAX_INT8, MAX_INT8, out=x)
+        y = np.dot(x, self.__pesos.astype(tipo)).astype(self.__dtype, copy=False)
+        y *= escalas * escala_entrada
+        return y
+
+    def perfilar(self, perfil, nome=None):
+        """
+        Ativa (ou desativa) o registo do custo das operações da camada.
+
+        Parâmetros:
+            perfil: Perfil (`lib.rna.perfil.Perfil`) onde registar o custo de cada
+            chamada de `ativar` e `retropropagar`, ou None para desativar.
+            nome: Nome da camada no perfil (por omissão, o nome da classe).
+        """
+
+        self.__perfil = perfil
+        self.__nome_perfil = type(self).__name__ if nome is None else nome
+
+    def estimar_custo(
+        self, num_amostras, operacao="ativar", treino=False, propagar=True
+    ):
+        """
+        Estima o custo de uma operação da camada para um lote de amostras.
+
+        Parâmetros:
+            num_amostras: Número de amostras do lote.
+            operacao: "ativar" ou "retropropagar".
+            treino: Na propagação, se os valores intermédios são guardados.
+            propagar: Na retropropagação, se o gradiente das entradas é calculado.
+
+        Retorna:
+            Tuplo (FLOPs, bytes reservados). A função de ativação é contada como uma
+            operação por elemento.
+        """
+
+        if self.__funcao_ativacao is None:
+            return 0, 0
+
+        n, i, o = num_amostras, self.dim_entrada, self.dim_saida
+        tamanho = self.__dtype.itemsize
+        if operacao == "ativar":
+            # Produto (só com os pesos não nulos, se forem esparsos), pendores e
+            # ativação; uma matriz de saída (e os valores antes da ativação, se
+            # forem guardados para a retropropagação)
+            num_pesos = self.num_parametros - o
+            flops = 2 * n * num_pesos + 2 * n * o
+            guardar = treino and not self.__funcao_ativacao.derivada_pela_saida
+            num_matrizes = 2 if guardar else 1
+            return flops, num_matrizes * n * o * tamanho
+
+        # Derivada, gradientes dos pesos e pendores e, se pedido, das entradas
+        flops = 2 * n * o + 2 * n * i * o + n * o
+        num_bytes = (i * o + o) * tamanho
+        if propagar:
+            flops += 2 * n * i * o
+            num_bytes += n * i * tamanho
+        return flops, num_bytes
+
+    def calibrar_esparsidade(
+        self, num_amostras=256, densidades=(0.001, 0.002, 0.005, 0.01, 0.02, 0.05)
+    ):
+        """
+        Mede a densidade de entradas binárias abaixo da qual o produto esparso
+        (incluindo a conversão de entradas densas) é mais rápido do que o produto
+        denso, para as dimensões e o tipo de dados desta camada, e usa-a como
+        `limiar_densidade`.
+
+        Parâmetros:
+            num_amostras: Número de amostras dos lotes medidos.
+            densidades: Densidades medidas, por ordem crescente.
+
+        Retorna:
+            Limiar de densidade medido (0 se o produto esparso nunca for mais
+            rápido, o que desativa o caminho esparso).
+        """
+
+        def medir(funcao, *argumentos):
+            melhor = np.inf
+            for _ in range(3):
+                inicio = time.perf_counter()
+                funcao(*argumentos)
+                melhor = min(melhor, time.perf_counter() - inicio)
+            return melhor
+
+        pesos = self.pesos
+
+        def esparso(entradas):
+            return MatrizEsparsa.de_densa(entradas).produto(pesos)
+
+        self.limiar_densidade = 0.0
+        gerador = np.random.default_rng(0)
+        forma = (num_amostras, self.dim_entrada)
+        for densidade in densidades:
+            entradas = (gerador.random(forma) < densidade).astype(self.__dtype)
+            if medir(esparso, entradas) >= medir(np.dot, entradas, pesos):
+                break
+            self.limiar_densidade = densidade
+        return self.limiar_densidade
+
+    def __produto(self, entradas):
+        """
+        Multiplica as entradas pelos pesos, somando apenas as linhas dos pesos dos
+        valores não nulos se as entradas forem esparsas (uma `MatrizEsparsa`, ou
+        uma matriz densa de uma camada larga) com densidade até `limiar_densidade`.
+
+        Retorna:
+            Tuplo (produto, entradas), com as entradas convertidas (matriz esparsa
+            ou densa) para a retropropagação.
+        """
+
+        if self.__quantizacao is not None:
+            return self.__produto_quantizado(entradas), entradas
+
+        if self.__pesos_esparsos is not None:
+            return self.__produto_pesos_esparsos(entradas)
+
+        if isinstance(entradas, MatrizEsparsa):
+            if entradas.densidade > self.limiar_densidade:
+                entradas = entradas.densa(self.__dtype)
+                return np.dot(entradas, self.__pesos), entradas
+            return entradas.produto(self.__pesos), entradas
+
+        esparsa = self.limiar_densidade > 0 and self.dim_entrada >= MIN_DIM_ESPARSA
+        if esparsa and np.ndim(entradas) == 2:
+            amostra = entradas[:AMOSTRA_DENSIDADE]
+            if np.count_nonzero(amostra) <= self.limiar_densidade * amostra.size:
+                entradas = MatrizEsparsa.de_densa(entradas)
+                return entradas.produto(self.__pesos), entradas
+        return np.dot(entradas, self.__pesos), entradas
+
+    def __produto_pesos_esparsos(self, entradas):
+        """
+        Multiplica as entradas pelos pesos esparsos de uma camada podada. O produto
+        esparso só é mais rápido para lotes pequenos (até LIMIAR_PRODUTO_ESPARSO,
+        em amostras x densidade); para lotes maiores, é usada uma cópia densa dos
+        pesos, criada no primeiro lote que a use.
+        """
+
+        if isinstance(entradas, MatrizEsparsa):
+            entradas = entradas.densa(self.__dtype)
+
+        esparsos = self.__pesos_esparsos
+        if len(entradas) * esparsos.densidade <= LIMIAR_PRODUTO_ESPARSO:
+            return esparsos.produto_esquerda(entradas), entradas
+
+        if self.__pesos is None:
+            self.__pesos = np.ascontiguousarray(esparsos.densa(self.__dtype).T)
+        return np.dot(entradas, self.__pesos), entradas
+
+    def ativar(self, entradas, treino=False):
         """
         Aplica a função de ativação, pesos e pendores da camada às entradas fornecidas.
 
+        As entradas esparsas (por exemplo, padrões binários ou codificações one-hot)
+        com densidade até `limiar_densidade`, dadas como `MatrizEsparsa` ou, numa
+        camada com pelo menos MIN_DIM_ESPARSA entradas, como matriz densa, são
+        multiplicadas pelos pesos somando apenas as linhas dos pesos dos valores não
+        nulos, com um custo proporcional à densidade.
+
+        Numa camada podada com pesos esparsos, os lotes pequenos são multiplicados
+        apenas pelos pesos não nulos (ver `podar`).
+
         Parâmetros:
-            entradas: Dados de entrada na camada.
+            entradas: Dados de entrada na camada (matriz ou `MatrizEsparsa`).
+            treino: Se verdadeiro, guarda as entradas e os valores intermédios,
+            necessários para a retropropagação.
 
         Retorna:
             Saídas da camada depois de ativada.
 
+        Exceções:
+            AssertionError: Se uma camada quantizada ou com pesos esparsos for
+            ativada em modo de treino.
         """
 
+        if self.__perfil is not None:
+            return self.__perfil.medir(
+                self.__nome_perfil,
+                "ativar",
+                len(entradas),
+                self.estimar_custo(len(entradas), "ativar", treino),
+                self.__ativar,
+                entradas,
+                treino,
+            )
+        return self.__ativar(entradas, treino)
+
+    def __ativar(self, entradas, treino):
         if self.__funcao_ativacao is None:
             return entradas
 
-        y = np.dot(entradas, self.__pesos) + self.__pendores
-        return self.__funcao_ativacao.aplicar(y)
+        # Uma camada quantizada ou com pesos esparsos é só para inferência
+        assert not treino or (
+            self.__quantizacao is None and self.__pesos_esparsos is None
+        )
+        y, entradas = self.__produto(entradas)
+        y += self.__pendores
+
+        if not treino:
+            return self.__funcao_ativacao.aplicar(y, out=y)
+
+        # Se a derivada depender apenas da saída, a função é aplicada no próprio
+        # lugar e os valores antes da ativação não precisam de ser guardados
+        if self.__funcao_ativacao.derivada_pela_saida:
+            saidas = self.__funcao_ativacao.aplicar(y, out=y)
+            self.__memoria_treino = (entradas, None, saidas)
+        else:
+            saidas = self.__funcao_ativacao.aplicar(y)
+            self.__memoria_treino = (entradas, y, saidas)
+
+        return saidas
+
+    def retropropagar(self, gradiente, propagar=True):
+        """
+        Propaga o gradiente da perda através da camada (regra da cadeia).
+
+        Os gradientes dos pesos e pendores ficam disponíveis em `gradiente_pesos`
+        e `gradiente_pendores`, para serem aplicados pelo algoritmo de otimização.
+        A derivada da função de ativação reutiliza as saídas guardadas na propagação,
+        que são substituídas pelo gradiente local (já não são necessárias).
+
+        Parâmetros:
+            gradiente: Gradiente da perda em relação às saídas da camada.
+            propagar: Se falso, não calcula o gradiente em relação às entradas
+            (desnecessário na primeira camada treinável).
+
+        Retorna:
+            Gradiente da perda em relação às entradas da camada, ou None se
+            `propagar` for falso.
+
+        Exceções:
+            AssertionError: Se a camada não tiver sido ativada em modo de treino.
+        """
+
+        if self.__perfil is not None:
+            return self.__perfil.medir(
+                self.__nome_perfil,
+                "retropropagar",
+                len(gradiente),
+                self.estimar_custo(len(gradiente), "retropropagar", propagar=propagar),
+                self.__retropropagar,
+                gradiente,
+                propagar,
+            )
+        return self.__retropropagar(gradiente, propagar)
+
+    def __retropropagar(self, gradiente, propagar):
+        if self.__funcao_ativacao is None:
+            return gradiente
+
+        assert self.__memoria_treino is not None
+        entradas, y, saidas = self.__memoria_treino
+        self.__memoria_treino = None
+
+        delta = self.__funcao_ativacao.propagar_gradiente(
+            gradiente, y, saidas, out=saidas
+        )
+        if isinstance(entradas, MatrizEsparsa):
+            self.__gradiente_pesos = entradas.produto_transposto(delta)
+        else:
+            self.__gradiente_pesos = np.dot(entradas.T, delta)
+        self.__gradiente_pendores = np.sum(delta, axis=0)
+
+        if not propagar:
+            return None
+        return np.dot(delta, self.__pesos.T)
 
     def __str__(self):
         return f"""CamadaDensa(
             dim_entrada={self.dim_entrada},
             dim_saida={self.dim_saida},
             funcao_ativacao={self.__funcao_ativacao},
+            dtype={self.__dtype},
             pesos={self.pesos},
             pendores={self.pendores})"""
 
 
+def _par(valor):
+    """
+    Converte um inteiro ou uma sequência de dois inteiros num tuplo (altura,
+    largura).
+    """
+
+    if np.ndim(valor) == 0:
+        return (int(valor), int(valor))
+    assert len(valor) == 2
+    return tuple(int(v) for v in valor)
+
+
+def _preenchimento(dim, dim_filtro, passo, modo):
+    """
+    Obtém a dimensão de saída de uma convolução num eixo e o preenchimento com
+    zeros antes e depois das entradas, como nas camadas Keras: "valid" sem
+    preenchimento, ou "same" com ceil(dim / passo) saídas.
+    """
+
+    if modo == "valid":
+        return (dim - dim_filtro) // passo + 1, 0, 0
+    saida = -(-dim // passo)
+    total = max((saida - 1) * passo + dim_filtro - dim, 0)
+    return saida, total // 2, total - total // 2
+
+
+def _colunas(x, dim_filtro, passo):
+    """
+    Obtém a matriz im2col de entradas (amostras, altura, largura, canais): uma linha
+    por posição do filtro, com os valores da janela pela ordem (altura, largura,
+    canais) dos pesos. As janelas são uma vista (`sliding_window_view`) e só a
+    matriz final é copiada.
+
+    Retorna:
+        Matriz (amostras * altura de saída * largura de saída, valores da janela).
+    """
+
+    janelas = np.lib.stride_tricks.sliding_window_view(x, dim_filtro, axis=(1, 2))
+    janelas = janelas[:, :: passo[0], :: passo[1]].transpose(0, 1, 2, 4, 5, 3)
+    return janelas.reshape(-1, dim_filtro[0] * dim_filtro[1] * x.shape[3])
+
+
+def _espacial(entradas, forma_entrada, dtype):
+    """
+    Obtém as entradas de uma camada espacial com a forma (amostras, *forma_entrada),
+    aceitando também entradas achatadas (por exemplo, vindas da camada de entrada).
+    """
+
+    if isinstance(entradas, MatrizEsparsa):
+        entradas = entradas.densa(dtype)
+    return np.reshape(entradas, (-1, *forma_entrada))
+
+
+class CamadaConv2D:
+    """
+    Representa uma camada de convolução 2D de uma rede neuronal.
+
+    Cada filtro é um conjunto de pesos (altura, largura, canais) partilhado por
+    todas as posições das entradas (amostras, altura, largura, canais), pelo que a
+    camada tem muito menos parâmetros do que uma camada densa com as mesmas
+    entradas e saídas.
+
+    A propagação transforma as janelas de todas as posições de um lote numa matriz
+    (im2col, com `sliding_window_view`) e calcula a convolução com um único produto
+    de matrizes por lote, sem ciclos sobre as posições. Na retropropagação, o
+    gradiente dos pesos é o produto da transposta dessa matriz pelo gradiente das
+    saídas, e o gradiente das entradas é a convolução (também um único produto) do
+    gradiente das saídas, dilatado pelo passo, com os filtros rodados.
+
+    As entradas podem também ser dadas achatadas, com o mesmo número de valores
+    (por exemplo, a saída da camada de entrada), e o gradiente das entradas tem a
+    forma das entradas recebidas.
+
+    Parâmetros:
+        forma_entrada: Forma (altura, largura, canais) das entradas de cada amostra.
+        num_filtros: Número de filtros (canais de saída).
+        dim_filtro: Dimensão (altura, largura) dos filtros, ou um inteiro.
+        funcao_ativacao: Função de ativação da camada (por omissão, linear).
+        passo: Passo (vertical, horizontal) entre posições do filtro, ou um inteiro.
+        preenchimento: "valid" (sem preenchimento) ou "same" (preenchimento com
+        zeros para que, com passo 1, a saída tenha a altura e largura das entradas).
+        dtype: Tipo de vírgula flutuante dos pesos e pendores.
+        inicializar: Se falso, os pesos e pendores começam a zero.
+
+    Exceções:
+        AssertionError: Se a forma das entradas não tiver 3 dimensões, se o
+        preenchimento não existir ou se os filtros não couberem nas entradas.
+    """
+
+    def __init__(
+        self,
+        forma_entrada,
+        num_filtros,
+        dim_filtro=3,
+        funcao_ativacao=None,
+        passo=1,
+        preenchimento="valid",
+        dtype=np.float64,
+        inicializar=True,
+    ):
+        assert len(forma_entrada) == 3 and num_filtros > 0
+        assert preenchimento in ("valid", "same")
+        self.__forma_entrada = tuple(int(d) for d in forma_entrada)
+        self.num_filtros = num_filtros
+        self.dim_filtro = _par(dim_filtro)
+        self.passo = _par(passo)
+        self.preenchimento = preenchimento
+        self.__funcao_ativacao = (
+            Linear() if funcao_ativacao is None else funcao_ativacao
+        )
+
+        altura, largura, canais = self.__forma_entrada
+        saida_h, *self.__preenchimento_h = _preenchimento(
+            altura, self.dim_filtro[0], self.passo[0], preenchimento
+        )
+        saida_w, *self.__preenchimento_w = _preenchimento(
+            largura, self.dim_filtro[1], self.passo[1], preenchimento
+        )
+        assert saida_h > 0 and saida_w > 0
+        self.__forma_saida = (saida_h, saida_w, num_filtros)
+
+        self.__dtype = _validar_tipo(dtype)
+        forma_pesos = (*self.dim_filtro, canais, num_filtros)
+        if inicializar:
+            self.__pesos = np.random.randn(*forma_pesos).astype(self.__dtype)
+            self.__pendores = np.random.randn(num_filtros).astype(self.__dtype)
+        else:
+            self.__pesos = np.zeros(forma_pesos, dtype=self.__dtype)
+            self.__pendores = np.zeros(num_filtros, dtype=self.__dtype)
+        self.__memoria_treino = None
+        self.__gradiente_pesos = None
+        self.__gradiente_pendores = None
+        self.__perfil = None
+        self.__nome_perfil = None
+
+    @property
+    def forma_entrada(self):
+        return self.__forma_entrada
+
+    @property
+    def forma_saida(self):
+        return self.__forma_saida
+
+    @property
+    def dim_entrada(self):
+        return int(np.prod(self.__forma_entrada))
+
+    @property
+    def dim_saida(self):
+        return int(np.prod(self.__forma_saida))
+
+    @property
+    def pesos(self):
+        """
+        Pesos (altura, largura, canais, filtros) da camada.
+        """
+        return self.__pesos
+
+    @property
+    def pendores(self):
+        return self.__pendores
+
+    @property
+    def dtype(self):
+        return self.__dtype
+
+    @property
+    def num_parametros(self):
+        return self.__pesos.size + self.__pendores.size
+
+    @property
+    def nbytes(self):
+        return self.__pesos.nbytes + self.__pendores.nbytes
+
+    @property
+    def funcao_ativacao(self):
+        return self.__funcao_ativacao
+
+    @property
+    def treinavel(self):
+        return True
+
+    @property
+    def perfil(self):
+        return self.__perfil
+
+    @property
+    def gradiente_pesos(self):
+        return self.__gradiente_pesos
+
+    @property
+    def gradiente_pendores(self):
+        return self.__gradiente_pendores
+
+    def atualizar_pesos(self, pesos):
+        """
+        Atualiza os pesos da camada, convertidos para o tipo de dados da camada.
+
+        Exceções:
+            AssertionError: Se a forma dos pesos não for a dos pesos da camada.
+        """
+
+        assert pesos.shape == self.__pesos.shape
+        self.__pesos = _converter(pesos, self.__dtype)
+
+    def atualizar_pendores(self, pendores):
+        """
+        Atualiza os pendores da camada, convertidos para o tipo de dados da camada.
+
+        Exceções:
+            AssertionError: Se a forma dos pendores não for a dos pendores da camada.
+        """
+
+        assert pendores.shape == self.__pendores.shape
+        self.__pendores = _converter(pendores, self.__dtype)
+
+    def converter_tipo(self, dtype):
+        """
+        Converte os pesos e pendores da camada para outro tipo de vírgula flutuante.
+        """
+
+        self.__dtype = _validar_tipo(dtype)
+        self.__pesos = self.__pesos.astype(self.__dtype, copy=False)
+        self.__pendores = self.__pendores.astype(self.__dtype, copy=False)
+
+    def copiar(self, dtype=None):
+        """
+        Cria uma cópia independente da camada, opcionalmente com outro tipo de dados.
+        """
+
+        copia = copy.copy(self)
+        copia.__dtype = _validar_tipo(self.__dtype if dtype is None else dtype)
+        copia.__pesos = self.__pesos.astype(copia.__dtype)
+        copia.__pendores = self.__pendores.astype(copia.__dtype)
+        copia.__memoria_treino = None
+        copia.__gradiente_pesos = None
+        copia.__gradiente_pendores = None
+        copia.__perfil = None
+        copia.__nome_perfil = None
+        return copia
+
+    def configuracao(self):
+        """
+        Obtém a descrição da camada, sem os pesos e pendores, para que possa ser
+        guardada e recriada.
+
+        Retorna:
+            Dicionário serializável em JSON.
+        """
+
+        funcao = self.__funcao_ativacao
+        return {
+            "forma_entrada": list(self.__forma_entrada),
+            "num_filtros": self.num_filtros,
+            "dim_filtro": list(self.dim_filtro),
+            "passo": list(self.passo),
+            "preenchimento": self.preenchimento,
+            "dtype": self.__dtype.name,
+            "funcao_ativacao": {
+                "nome": type(funcao).__name__,
+                "parametros": funcao.configuracao(),
+            },
+        }
+
+    def perfilar(self, perfil, nome=None):
+        """
+        Ativa (ou desativa) o registo do custo das operações da camada (ver
+        `CamadaDensa.perfilar`).
+        """
+
+        self.__perfil = perfil
+        self.__nome_perfil = type(self).__name__ if nome is None else nome
+
+    def estimar_custo(
+        self, num_amostras, operacao="ativar", treino=False, propagar=True
+    ):
+        """
+        Estima o custo de uma operação da camada para um lote de amostras (ver
+        `CamadaDensa.estimar_custo`).
+
+        Retorna:
+            Tuplo (FLOPs, bytes reservados).
+        """
+
+        saida_h, saida_w, f = self.__forma_saida
+        m = num_amostras * saida_h * saida_w
+        k = self.dim_filtro[0] * self.dim_filtro[1] * self.__forma_entrada[2]
+        tamanho = self.__dtype.itemsize
+        if operacao == "ativar":
+            # Matriz im2col, produto, pendores e ativação
+            guardar = treino and not self.__funcao_ativacao.derivada_pela_saida
+            num_matrizes = 2 if guardar else 1
+            flops = 2 * m * k * f + 2 * m * f
+            return flops, (m * k + num_matrizes * m * f) * tamanho
+
+        flops = 2 * m * f + 2 * m * k * f + m * f
+        num_bytes = (k * f + f) * tamanho
+        if propagar:
+            # Convolução do gradiente dilatado (do tamanho das entradas preenchidas)
+            altura, largura, canais = self.__forma_entrada
+            posicoes = (
+                num_amostras
+                * (altura + sum(self.__preenchimento_h))
+                * (largura + sum(self.__preenchimento_w))
+            )
+            janela = self.dim_filtro[0] * self.dim_filtro[1] * f
+            flops += 2 * posicoes * janela * canais
+            num_bytes += posicoes * (janela + canais) * tamanho
+        return flops, num_bytes
+
+    def ativar(self, entradas, treino=False):
+        """
+        Aplica a convolução, os pendores e a função de ativação às entradas.
+
+        Parâmetros:
+            entradas: Entradas (amostras, altura, largura, canais), ou achatadas.
+            treino: Se verdadeiro, guarda os valores necessários para a
+            retropropagação.
+
+        Retorna:
+            Saídas (amostras, altura de saída, largura de saída, filtros).
+        """
+
+        if self.__perfil is not None:
+            return self.__perfil.medir(
+                self.__nome_perfil,
+                "ativar",
+                len(entradas),
+                self.estimar_custo(len(entradas), "ativar", treino),
+                self.__ativar,
+                entradas,
+                treino,
+            )
+        return self.__ativar(entradas, treino)
+
+    def __ativar(self, entradas, treino):
+        forma = np.shape(entradas)
+        x = _espacial(entradas, self.__forma_entrada, self.__dtype)
+        if any(self.__preenchimento_h) or any(self.__preenchimento_w):
+            x = np.pad(
+                x, ((0, 0), self.__preenchimento_h, self.__preenchimento_w, (0, 0))
+            )
+
+        colunas = _colunas(x, self.dim_filtro, self.passo)
+        y = np.dot(colunas, self.__pesos.reshape(-1, self.num_filtros))
+        y += self.__pendores
+        y = y.reshape(len(x), *self.__forma_saida)
+
+        if not treino:
+            return self.__funcao_ativacao.aplicar(y, out=y)
+
+        if self.__funcao_ativacao.derivada_pela_saida:
+            saidas = self.__funcao_ativacao.aplicar(y, out=y)
+            self.__memoria_treino = (forma, colunas, None, saidas)
+        else:
+            saidas = self.__funcao_ativacao.aplicar(y)
+            self.__memoria_treino = (forma, colunas, y, saidas)
+        return saidas
+
+    def retropropagar(self, gradiente, propagar=True):
+        """
+        Propaga o gradiente da perda através da camada (ver
+        `CamadaDensa.retropropagar`).
+
+        Parâmetros:
+            gradiente: Gradiente da perda em relação às saídas da camada.
+            propagar: Se falso, não calcula o gradiente em relação às entradas.
+
+        Retorna:
+            Gradiente da perda em relação às entradas da camada, com a forma das
+            entradas recebidas, ou None se `propagar` for falso.
+
+        Exceções:
+            AssertionError: Se a camada não tiver sido ativada em modo de treino.
+        """
+
+        if self.__perfil is not None:
+            return self.__perfil.medir(
+                self.__nome_perfil,
+                "retropropagar",
+                len(gradiente),
+                self.estimar_custo(len(gradiente), "retropropagar", propagar=propagar),
+                self.__retropropagar,
+                gradiente,
+                propagar,
+            )
+        return self.__retropropagar(gradiente, propagar)
+
+    def __retropropagar(self, gradiente, propagar):
+        assert self.__memoria_treino is not None
+        forma, colunas, y, saidas = self.__memoria_treino
+        self.__memoria_treino = None
+
+        gradiente = np.reshape(gradiente, saidas.shape)
+        delta = self.__funcao_ativacao.propagar_gradiente(
+            gradiente, y, saidas, out=saidas
+        )
+        delta_colunas = delta.reshape(-1, self.num_filtros)
+        self.__gradiente_pesos = np.dot(colunas.T, delta_colunas).reshape(
+            self.__pesos.shape
+        )
+        self.__gradiente_pendores = np.sum(delta_colunas, axis=0)
+
+        if not propagar:
+            return None
+        return self.__gradiente_entradas(delta).reshape(forma)
+
+    def __gradiente_entradas(self, delta):
+        """
+        Calcula o gradiente das entradas como a convolução "full" do gradiente das
+        saídas, dilatado pelo passo, com os filtros rodados 180 graus.
+        """
+
+        (filtro_h, filtro_w), (passo_h, passo_w) = self.dim_filtro, self.passo
+        altura, largura, canais = self.__forma_entrada
+        altura_p = altura + sum(self.__preenchimento_h)
+        largura_p = largura + sum(self.__preenchimento_w)
+        saida_h, saida_w, _ = self.__forma_saida
+
+        # Cada saída fica na posição de entrada preenchida em que começa a sua
+        # janela, afastada de (filtro - 1) para a convolução "full"
+        dilatado = np.zeros(
+            (
+                len(delta),
+                altura_p + filtro_h - 1,
+                largura_p + filtro_w - 1,
+                self.num_filtros,
+            ),
+            dtype=delta.dtype,
+        )
+        dilatado[
+            :,
+            filtro_h - 1 : filtro_h - 1 + (saida_h - 1) * passo_h + 1 : passo_h,
+            filtro_w - 1 : filtro_w - 1 + (saida_w - 1) * passo_w + 1 : passo_w,
+        ] = delta
+
+        rodados = self.__pesos[::-1, ::-1].transpose(0, 1, 3, 2)
+        gradiente = np.dot(
+            _colunas(dilatado, self.dim_filtro, (1, 1)),
+            rodados.reshape(-1, canais),
+        ).reshape(len(delta), altura_p, largura_p, canais)
+
+        topo, esquerda = self.__preenchimento_h[0], self.__preenchimento_w[0]
+        return gradiente[:, topo : topo + altura, esquerda : esquerda + largura]
+
+    def __str__(self):
+        return f"""CamadaConv2D(
+            forma_entrada={self.__forma_entrada},
+            num_filtros={self.num_filtros},
+            dim_filtro={self.dim_filtro},
+            passo={self.passo},
+            preenchimento={self.preenchimento},
+            funcao_ativacao={self.__funcao_ativacao},
+            dtype={self.__dtype})"""
+
+
+class _CamadaSemParametros:
+    """
+    Base das camadas sem parâmetros, que apenas transformam a forma das entradas
+    (por exemplo, a subamostragem e o achatamento): não são treináveis, mas
+    propagam o gradiente na retropropagação.
+    """
+
+    def __init__(self, forma_entrada, forma_saida, dtype=np.float64):
+        self._forma_entrada = tuple(int(d) for d in forma_entrada)
+        self._forma_saida = tuple(int(d) for d in forma_saida)
+        self.__dtype = _validar_tipo(dtype)
+        self._memoria_treino = None
+        self.__perfil = None
+        self.__nome_perfil = None
+
+    @property
+    def forma_entrada(self):
+        return self._forma_entrada
+
+    @property
+    def forma_saida(self):
+        return self._forma_saida
+
+    @property
+    def dim_entrada(self):
+        return int(np.prod(self._forma_entrada))
+
+    @property
+    def dim_saida(self):
+        return int(np.prod(self._forma_saida))
+
+    @property
+    def dtype(self):
+        return self.__dtype
+
+    @property
+    def funcao_ativacao(self):
+        return None
+
+    @property
+    def treinavel(self):
+        return False
+
+    @property
+    def num_parametros(self):
+        return 0
+
+    @property
+    def nbytes(self):
+        return 0
+
+    @property
+    def perfil(self):
+        return self.__perfil
+
+    def converter_tipo(self, dtype):
+        self.__dtype = _validar_tipo(dtype)
+
+    def copiar(self, dtype=None):
+        copia = copy.copy(self)
+        copia.__dtype = _validar_tipo(self.__dtype if dtype is None else dtype)
+        copia._memoria_treino = None
+        copia.__perfil = None
+        copia.__nome_perfil = None
+        return copia
+
+    def configuracao(self):
+        return {
+            "forma_entrada": list(self._forma_entrada),
+            "dtype": self.__dtype.name,
+        }
+
+    def perfilar(self, perfil, nome=None):
+        self.__perfil = perfil
+        self.__nome_perfil = type(self).__name__ if nome is None else nome
+
+    def estimar_custo(
+        self, num_amostras, operacao="ativar", treino=False, propagar=True
+    ):
+        return 0, 0
+
+    def ativar(self, entradas, treino=False):
+        if self.__perfil is not None:
+            return self.__perfil.medir(
+                self.__nome_perfil,
+                "ativar",
+                len(entradas),
+                self.estimar_custo(len(entradas), "ativar", treino),
+                self._ativar,
+                entradas,
+                treino,
+            )
+        return self._ativar(entradas, treino)
+
+    def retropropagar(self, gradiente, propagar=True):
+        if self.__perfil is not None:
+            return self.__perfil.medir(
+                self.__nome_perfil,
+                "retropropagar",
+                len(gradiente),
+                self.estimar_custo(len(gradiente), "retropropagar", propagar=propagar),
+                self._retropropagar,
+                gradiente,
+                propagar,
+            )
+        return self._retropropagar(gradiente, propagar)
+
+    def _ativar(self, entradas, treino):
+        raise NotImplementedError
+
+    def _retropropagar(self, gradiente, propagar):
+        raise NotImplementedError
+
+
+class CamadaMaxPooling2D(_CamadaSemParametros):
+    """
+    Representa uma camada de subamostragem pelo máximo (max pooling 2D): cada saída
+    é o maior valor de uma janela (altura, largura) de cada canal, com janelas sem
+    sobreposição. As linhas e colunas que não completam uma janela são ignoradas,
+    como no preenchimento "valid" das camadas Keras.
+
+    A propagação é uma única redução sobre uma vista das entradas com as janelas
+    num eixo próprio. Na retropropagação, o gradiente de cada saída vai apenas para
+    a posição do máximo da sua janela (a primeira, em caso de empate).
+
+    Parâmetros:
+        forma_entrada: Forma (altura, largura, canais) das entradas de cada amostra.
+        dim_janela: Dimensão (altura, largura) das janelas, ou um inteiro.
+        dtype: Tipo de dados da rede (a camada não tem parâmetros).
+
+    Exceções:
+        AssertionError: Se a forma das entradas não tiver 3 dimensões ou se a janela
+        for maior do que as entradas.
+    """
+
+    def __init__(self, forma_entrada, dim_janela=2, dtype=np.float64):
+        assert len(forma_entrada) == 3
+        self.dim_janela = _par(dim_janela)
+        altura, largura, canais = forma_entrada
+        forma_saida = (
+            altura // self.dim_janela[0],
+            largura // self.dim_janela[1],
+            canais,
+        )
+        assert forma_saida[0] > 0 and forma_saida[1] > 0
+        super().__init__(forma_entrada, forma_saida, dtype)
+
+    def configuracao(self):
+        return {**super().configuracao(), "dim_janela": list(self.dim_janela)}
+
+    def estimar_custo(
+        self, num_amostras, operacao="ativar", treino=False, propagar=True
+    ):
+        """
+        Estima o custo de uma operação da camada: uma comparação por valor das
+        janelas na propagação (e a cópia das janelas, no treino), e a matriz do
+        gradiente das entradas na retropropagação.
+        """
+
+        tamanho = self.dtype.itemsize
+        num_valores = (
+            num_amostras * int(np.prod(self._forma_saida)) * np.prod(self.dim_janela)
+        )
+        if operacao == "ativar":
+            num_saidas = num_amostras * self.dim_saida
+            copia = num_valores if treino else 0
+            return int(num_valores), int((copia + num_saidas) * tamanho)
+        return 0, int(num_amostras * self.dim_entrada * tamanho) if propagar else 0
+
+    def __janelas(self, x):
+        """
+        Obtém a vista (amostras, altura de saída, largura de saída, canais, altura
+        da janela, largura da janela) das janelas das entradas.
+        """
+
+        janela_h, janela_w = self.dim_janela
+        saida_h, saida_w, canais = self._forma_saida
+        x = x[:, : saida_h * janela_h, : saida_w * janela_w]
+        return x.reshape(
+            len(x), saida_h, janela_h, saida_w, janela_w, canais
+        ).transpose(0, 1, 3, 5, 2, 4)
+
+    def _ativar(self, entradas, treino):
+        forma = np.shape(entradas)
+        janelas = self.__janelas(_espacial(entradas, self._forma_entrada, self.dtype))
+        if not treino:
+            return np.max(janelas, axis=(4, 5))
+
+        # A posição do máximo de cada janela, para a retropropagação
+        janelas = janelas.reshape(*janelas.shape[:4], -1)
+        posicoes = np.argmax(janelas, axis=-1)[..., np.newaxis]
+        self._memoria_treino = (forma, posicoes)
+        return np.take_along_axis(janelas, posicoes, axis=-1)[..., 0]
+
+    def _retropropagar(self, gradiente, propagar):
+        assert self._memoria_treino is not None
+        forma, posicoes = self._memoria_treino
+        self._memoria_treino = None
+        if not propagar:
+            return None
+
+        gradiente = np.reshape(gradiente, (-1, *self._forma_saida))
+        janelas = np.zeros(
+            (*posicoes.shape[:4], np.prod(self.dim_janela)), gradiente.dtype
+        )
+        np.put_along_axis(janelas, posicoes, gradiente[..., np.newaxis], axis=-1)
+
+        # Volta a pôr cada janela na sua posição das entradas (as linhas e colunas
+        # ignoradas têm gradiente nulo)
+        n, saida_h, saida_w, canais = gradiente.shape
+        janela_h, janela_w = self.dim_janela
+        janelas = janelas.reshape(n, saida_h, saida_w, canais, janela_h, janela_w)
+        resultado = np.zeros((n, *self._forma_entrada), gradiente.dtype)
+        resultado[:, : saida_h * janela_h, : saida_w * janela_w] = janelas.transpose(
+            0, 1, 4, 2, 5, 3
+        ).reshape(n, saida_h * janela_h, saida_w * janela_w, canais)
+        return resultado.reshape(forma)
+
+    def __str__(self):
+        return f"""CamadaMaxPooling2D(
+            forma_entrada={self._forma_entrada},
+            dim_janela={self.dim_janela})"""
+
+
+class CamadaAchatar(_CamadaSemParametros):
+    """
+    Representa uma camada que achata as entradas de cada amostra num vetor (por
+    exemplo, entre uma camada de convolução e uma camada densa), sem copiar os
+    valores.
+
+    Parâmetros:
+        forma_entrada: Forma das entradas de cada amostra.
+        dtype: Tipo de dados da rede (a camada não tem parâmetros).
+    """
+
+    def __init__(self, forma_entrada, dtype=np.float64):
+        super().__init__(forma_entrada, (int(np.prod(forma_entrada)),), dtype)
+
+    def _ativar(self, entradas, treino):
+        if treino:
+            self._memoria_treino = np.shape(entradas)
+        return np.reshape(entradas, (len(entradas), self.dim_saida))
+
+    def _retropropagar(self, gradiente, propagar):
+        assert self._memoria_treino is not None
+        forma = self._memoria_treino
+        self._memoria_treino = None
+        return np.reshape(gradiente, forma) if propagar else None
+
+    def __str__(self):
+        return f"CamadaAchatar(forma_entrada={self._forma_entrada})"
+
+
+def criar_camada(tipo, **parametros):
+    """
+    Cria uma camada a partir do nome da sua classe e dos seus parâmetros, tal como
+    obtidos com `configuracao`.
+
+    Parâmetros:
+        tipo: Nome da classe da camada (por exemplo, "CamadaConv2D").
+        parametros: Argumentos do construtor da camada.
+
+    Retorna:
+        Nova camada.
+
+    Exceções:
+        AssertionError: Se não existir uma camada com o nome dado.
+    """
+
+    classes = {
+        classe.__name__: classe
+        for classe in (CamadaDensa, CamadaConv2D, CamadaMaxPooling2D, CamadaAchatar)
+    }
+    assert tipo in classes
+    return classes[tipo](**parametros)
+
+
 if __name__ == "__main__":
     camada = CamadaDensa(2, 2)
     print(camada)
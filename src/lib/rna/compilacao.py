@@ -0,0 +1,130 @@
+import numpy as np
+from lib.rna.ativacao import Linear
+
+
+class RedeCompilada:
+    """
+    Plano de inferência imutável de uma rede neuronal, para previsões repetidas com
+    um tamanho de lote fixo.
+
+    Na compilação, as camadas de entrada (que apenas passam os valores) são omitidas,
+    as camadas com ativação linear são combinadas com a camada seguinte numa única
+    matriz (x W1 + b1) W2 + b2 = x (W1 W2) + (b1 W2 + b2), e é reservada uma matriz
+    de saída para cada camada. A previsão calcula o produto das matrizes diretamente
+    nessas matrizes, somando os pendores e aplicando a função de ativação no próprio
+    lugar, pelo que não aloca novas matrizes a cada chamada.
+
+    Os pesos são copiados na compilação, pelo que alterações posteriores à rede não
+    afetam o plano (é necessário compilar de novo).
+
+    Parâmetros:
+        camadas: Camadas da rede neuronal, pela ordem de propagação.
+        tamanho_lote: Número máximo de amostras em cada previsão.
+        dim_entrada: Dimensão das entradas da rede.
+        dtype: Tipo de dados das matrizes do plano.
+    """
+
+    def __init__(self, camadas, tamanho_lote, dim_entrada, dtype=np.float64):
+        self.__tamanho_lote = tamanho_lote
+        self.__dim_entrada = dim_entrada
+        self.__dtype = np.dtype(dtype)
+        self.__entrada = np.empty((tamanho_lote, dim_entrada), dtype=self.__dtype)
+        self.__etapas = []
+
+        for pesos, pendores, funcao in self.__combinar(camadas):
+            pesos = np.array(pesos, dtype=self.__dtype)
+            pendores = np.array(pendores, dtype=self.__dtype)
+            pesos.flags.writeable = False
+            pendores.flags.writeable = False
+            saida = np.empty((tamanho_lote, pesos.shape[1]), dtype=self.__dtype)
+            self.__etapas.append((pesos, pendores, funcao, saida))
+
+    @staticmethod
+    def __combinar(camadas):
+        """
+        Obtém as etapas (pesos, pendores, função de ativação) da propagação,
+        omitindo as camadas sem função de ativação e combinando cada camada linear
+        com a camada seguinte.
+        """
+
+        etapas = []
+        pendente = None  # camada linear ainda por combinar (pesos, pendores)
+
+        for camada in camadas:
+            if camada.funcao_ativacao is None:
+                continue
+
+            pesos = np.asarray(camada.pesos, dtype=np.float64)
+            pendores = np.asarray(camada.pendores, dtype=np.float64)
+            if pendente is not None:
+                pesos_ant, pendores_ant = pendente
+                pendores = np.dot(pendores_ant, pesos) + pendores
+                pesos = np.dot(pesos_ant, pesos)
+                pendente = None
+
+            if isinstance(camada.funcao_ativacao, Linear):
+                pendente = (pesos, pendores)
+            else:
+                etapas.append((pesos, pendores, camada.funcao_ativacao))
+
+        if pendente is not None:
+            etapas.append((*pendente, Linear()))
+
+        return etapas
+
+    @property
+    def tamanho_lote(self):
+        return self.__tamanho_lote
+
+    @property
+    def dim_entrada(self):
+        return self.__dim_entrada
+
+    @property
+    def dtype(self):
+        return self.__dtype
+
+    @property
+    def num_etapas(self):
+        return len(self.__etapas)
+
+    def prever(self, entradas):
+        """
+        Realiza a previsão da rede neuronal compilada para as entradas fornecidas.
+
+        A matriz devolvida pertence ao plano e é reescrita na chamada seguinte,
+        pelo que deve ser copiada se for necessário guardá-la.
+
+        Parâmetros:
+            entradas: Entradas da rede neuronal, no máximo `tamanho_lote` linhas.
+
+        Retorna:
+            Saídas da rede neuronal.
+
+        Exceções:
+            AssertionError: Se o número de entradas exceder o tamanho do lote ou se a
+            dimensão das entradas não for a da rede.
+        """
+
+        num_amostras = len(entradas)
+        assert num_amostras <= self.__tamanho_lote
+        completo = num_amostras == self.__tamanho_lote
+
+        x = entradas
+        if (
+            not isinstance(x, np.ndarray)
+            or x.dtype != self.__dtype
+            or not x.flags.c_contiguous
+        ):
+            x = self.__entrada if completo else self.__entrada[:num_amostras]
+            np.copyto(x, entradas)
+        assert x.shape == (num_amostras, self.__dim_entrada)
+
+        for pesos, pendores, funcao, saida in self.__etapas:
+            y = saida if completo else saida[:num_amostras]
+            np.dot(x, pesos, out=y)
+            np.add(y, pendores, out=y)
+            funcao.aplicar(y, out=y)
+            x = y
+
+        return x
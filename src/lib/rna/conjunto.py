@@ -0,0 +1,244 @@
+import numpy as np
+from lib.rna.camada import CamadaDensa
+
+
+class ConjuntoRedes:
+    """
+    Conjunto de réplicas independentes de uma rede neuronal com a mesma arquitetura,
+    treinadas em simultâneo.
+
+    Os pesos de cada camada de todas as réplicas são guardados numa única matriz de
+    forma (réplicas, dim_entrada, dim_saida), e os pendores numa matriz (réplicas,
+    dim_saida). A propagação e a retropropagação de cada mini-lote são feitas para
+    todas as réplicas com um único produto de matrizes em lote (np.matmul), pelo que,
+    para redes pequenas como a do problema XOR, treinar centenas de réplicas custa
+    aproximadamente o mesmo que treinar uma, já que o tempo é dominado pelo custo
+    fixo de cada operação e não pela aritmética.
+
+    Cada réplica pode ter a sua taxa de aprendizagem e momento, o que permite treinar
+    várias combinações de hiperparâmetros (e repetições) de uma só vez.
+
+    Parâmetros:
+        rede: Rede neuronal que define a arquitetura (camadas densas).
+        num_replicas: Número de réplicas.
+        inicializar: Se verdadeiro, os pesos de cada réplica são inicializados com uma
+        distribuição normal, como em `CamadaDensa`; caso contrário, todas as réplicas
+        começam com os pesos da rede dada.
+    """
+
+    def __init__(self, rede, num_replicas, inicializar=True):
+        assert num_replicas > 0
+        self.__num_replicas = num_replicas
+        self.__classe_rede = type(rede)
+        self.__dtype = rede.dtype
+        self.__dim_entrada = rede.camadas[0].dim_saida
+        self.__camadas = []
+        self.__gradientes = []
+
+        for camada in rede.camadas:
+            if not camada.treinavel:
+                continue
+
+            forma = (num_replicas, camada.dim_entrada, camada.dim_saida)
+            if inicializar:
+                pesos = np.random.randn(*forma)
+                pendores = np.random.randn(num_replicas, camada.dim_saida)
+            else:
+                pesos = np.broadcast_to(camada.pesos, forma)
+                pendores = np.broadcast_to(camada.pendores, forma[::2])
+
+            self.__camadas.append(
+                (
+                    camada.funcao_ativacao,
+                    np.array(pesos, dtype=self.__dtype),
+                    np.array(pendores, dtype=self.__dtype),
+                )
+            )
+
+    @property
+    def num_replicas(self):
+        return self.__num_replicas
+
+    @property
+    def pesos(self):
+        """
+        Lista com a matriz (réplicas, dim_entrada, dim_saida) de pesos de cada camada.
+        """
+        return [pesos for _, pesos, _ in self.__camadas]
+
+    @property
+    def pendores(self):
+        """
+        Lista com a matriz (réplicas, dim_saida) de pendores de cada camada.
+        """
+        return [pendores for _, _, pendores in self.__camadas]
+
+    def replica(self, indice):
+        """
+        Obtém uma réplica como uma rede neuronal independente.
+
+        Parâmetros:
+            indice: Índice da réplica.
+
+        Retorna:
+            Rede neuronal com uma cópia dos pesos e pendores da réplica.
+        """
+
+        rede = self.__classe_rede(self.__dtype)
+        rede.juntar(CamadaDensa(0, self.__dim_entrada, dtype=self.__dtype))
+        for funcao, pesos, pendores in self.__camadas:
+            camada = CamadaDensa(
+                *pesos.shape[1:], funcao, dtype=self.__dtype, inicializar=False
+            )
+            camada.atualizar_pesos(pesos[indice].copy())
+            camada.atualizar_pendores(pendores[indice].copy())
+            rede.juntar(camada)
+        return rede
+
+    def prever(self, entradas):
+        """
+        Realiza a previsão de todas as réplicas para as entradas fornecidas.
+
+        Parâmetros:
+            entradas: Entradas (amostras, dim_entrada), comuns a todas as réplicas, ou
+            (réplicas, amostras, dim_entrada).
+
+        Retorna:
+            Saídas (réplicas, amostras, dim_saida) de cada réplica.
+        """
+
+        a = np.asarray(entradas, dtype=self.__dtype)
+        for funcao, pesos, pendores in self.__camadas:
+            z = np.matmul(a, pesos)
+            z += pendores[:, np.newaxis, :]
+            a = funcao.aplicar(z, out=z)
+        return a
+
+    def treinar(
+        self,
+        entradas,
+        saidas,
+        epocas,
+        taxa_aprendizagem,
+        momento=0.0,
+        ordem_aleatoria=False,
+        tamanho_lote=32,
+    ):
+        """
+        Treina todas as réplicas com retropropagação, erro quadrático médio e descida
+        de gradiente estocástico com momento, como `RedeNeuronal.treinar`, mas com os
+        cálculos de todas as réplicas feitos em conjunto.
+
+        Parâmetros:
+            entradas: Entradas da rede neuronal.
+            saidas: Saídas desejadas para as entradas fornecidas.
+            epocas: Número de épocas de treino.
+            taxa_aprendizagem: Taxa de aprendizagem, comum ou uma por réplica.
+            momento: Momento, comum ou um por réplica.
+            ordem_aleatoria: Se verdadeiro, as entradas são apresentadas a cada réplica
+            por uma ordem aleatória própria (diferente em cada época).
+            tamanho_lote: Número de amostras em cada mini-lote.
+
+        Retorna:
+            Matriz (réplicas, épocas) com os erros de cada réplica em cada época.
+
+        Exceções:
+            AssertionError: Se o número de entradas e de saídas for diferente, ou se
+            os hiperparâmetros por réplica não tiverem uma entrada por réplica.
+        """
+
+        entradas = np.asarray(entradas, dtype=self.__dtype)
+        saidas = np.asarray(saidas, dtype=self.__dtype)
+        assert len(entradas) == len(saidas)
+
+        taxa = self.__por_replica(taxa_aprendizagem)
+        momento = self.__por_replica(momento)
+        velocidades = [
+            (np.zeros_like(pesos), np.zeros_like(pendores))
+            for _, pesos, pendores in self.__camadas
+        ]
+
+        num_amostras = len(entradas)
+        erros = np.empty((self.__num_replicas, epocas), dtype=np.float64)
+        for epoca in range(epocas):
+            x, y = entradas, saidas
+            if ordem_aleatoria:
+                # Uma permutação por réplica: (réplicas, amostras, dimensão)
+                permutacoes = np.argsort(
+                    np.random.rand(self.__num_replicas, num_amostras), axis=1
+                )
+                x, y = entradas[permutacoes], saidas[permutacoes]
+
+            perda_epoca = np.zeros(self.__num_replicas)
+            for inicio in range(0, num_amostras, tamanho_lote):
+                lote = slice(inicio, inicio + tamanho_lote)
+                x_lote, y_lote = x[..., lote, :], y[..., lote, :]
+                perda_epoca += self.__retropropagar(x_lote, y_lote) * y_lote.shape[-2]
+
+                for (_, pesos, pendores), (v_pesos, v_pendores), gradientes in zip(
+                    self.__camadas, velocidades, self.__gradientes
+                ):
+                    v_pesos *= momento[:, :, np.newaxis]
+                    v_pesos -= taxa[:, :, np.newaxis] * gradientes[0]
+                    v_pendores *= momento
+                    v_pendores -= taxa * gradientes[1]
+                    pesos += v_pesos
+                    pendores += v_pendores
+
+            erros[:, epoca] = perda_epoca / num_amostras
+
+        return erros
+
+    def __por_replica(self, valor):
+        """
+        Converte um hiperparâmetro comum ou por réplica numa matriz (réplicas, 1).
+        """
+
+        valor = np.asarray(valor, dtype=self.__dtype)
+        if valor.ndim == 0:
+            valor = np.full(self.__num_replicas, valor)
+        assert valor.shape == (self.__num_replicas,)
+        return valor[:, np.newaxis]
+
+    def __retropropagar(self, entradas, saidas):
+        """
+        Propaga um mini-lote por todas as réplicas e retropropaga o gradiente do erro
+        quadrático médio, guardando os gradientes de cada camada.
+
+        Retorna:
+            Erro quadrático médio do mini-lote em cada réplica.
+        """
+
+        ativacoes = [entradas]
+        intermedios = []
+        for funcao, pesos, pendores in self.__camadas:
+            z = np.matmul(ativacoes[-1], pesos)
+            z += pendores[:, np.newaxis, :]
+            if funcao.derivada_pela_saida:
+                intermedios.append(None)
+                ativacoes.append(funcao.aplicar(z, out=z))
+            else:
+                intermedios.append(z)
+                ativacoes.append(funcao.aplicar(z))
+
+        erro = ativacoes[-1] - saidas
+        perda = np.mean(erro**2, axis=(1, 2))
+        gradiente = erro * (2 / (erro.shape[1] * erro.shape[2]))
+
+        self.__gradientes = [None] * len(self.__camadas)
+        for i in range(len(self.__camadas) - 1, -1, -1):
+            funcao, pesos, _ = self.__camadas[i]
+            saida = ativacoes[i + 1]
+            delta = funcao.propagar_gradiente(
+                gradiente, intermedios[i], saida, out=saida
+            )
+
+            entrada = ativacoes[i]
+            self.__gradientes[i] = (
+                np.matmul(np.swapaxes(entrada, -1, -2), delta),
+                np.sum(delta, axis=1),
+            )
+            if i > 0:
+                gradiente = np.matmul(delta, np.swapaxes(pesos, -1, -2))
+
+        return perda
@@ -0,0 +1,150 @@
+import os
+import numpy as np
+from lib.rna.ativacao import (
+    Degrau,
+    LeakyReLU,
+    Linear,
+    ReLU,
+    Sigmoide,
+    Softmax,
+    TangenteHiperbolica,
+)
+from lib.rna.camada import CamadaDensa
+from lib.rna.rede_neuronal import RedeNeuronal
+
+
+def custom_activation(x):
+    """
+    Função de ativação degrau em TensorFlow, equivalente à usada em
+    tests/parte1_3/test_xor_manual.py (1 para x > 0, 0 caso contrário), necessária
+    para carregar modelos Keras guardados com essa função.
+    """
+
+    import tensorflow as tf
+
+    return tf.cast(tf.math.greater(x, tf.constant([0.0])), tf.float32)
+
+
+# Correspondência entre os nomes das funções de ativação Keras e as funções nativas
+FUNCOES_ATIVACAO_KERAS = {
+    "linear": Linear,
+    "sigmoid": Sigmoide,
+    "tanh": TangenteHiperbolica,
+    "relu": ReLU,
+    "leaky_relu": lambda: LeakyReLU(alfa=0.2),
+    "softmax": Softmax,
+    "custom_activation": lambda: Degrau(limiar=0),
+}
+
+
+def carregar_keras(caminho):
+    """
+    Carrega um modelo Keras guardado (por exemplo, models/xor.keras), sem o compilar,
+    reconhecendo a função de ativação degrau personalizada.
+
+    Parâmetros:
+        caminho: Caminho do ficheiro .keras.
+
+    Retorna:
+        Modelo Keras carregado.
+    """
+
+    from keras.models import load_model
+
+    return load_model(
+        caminho,
+        custom_objects={"custom_activation": custom_activation},
+        compile=False,
+    )
+
+
+def importar_keras(modelo, dtype=None):
+    """
+    Converte um modelo Keras sequencial de camadas densas numa rede neuronal nativa
+    equivalente, que pode ser executada (e guardada com `RedeNeuronal.guardar`) sem
+    TensorFlow.
+
+    É criada uma camada de entrada com a dimensão de entrada da primeira camada densa,
+    seguida de uma `CamadaDensa` por cada camada densa do modelo, com os mesmos pesos,
+    pendores e função de ativação.
+
+    Parâmetros:
+        modelo: Modelo Keras sequencial ou caminho de um ficheiro .keras.
+        dtype: Tipo de dados da rede nativa (por omissão, o dos pesos Keras).
+
+    Retorna:
+        Rede neuronal nativa.
+
+    Exceções:
+        AssertionError: Se o modelo tiver camadas que não sejam densas, ou funções de
+        ativação sem equivalente nativo.
+    """
+
+    if isinstance(modelo, (str, os.PathLike)):
+        modelo = carregar_keras(modelo)
+
+    rede = RedeNeuronal(dtype)
+    for camada_keras in modelo.layers:
+        assert type(camada_keras).__name__ == "Dense"
+
+        nome_ativacao = camada_keras.activation.__name__
+        assert nome_ativacao in FUNCOES_ATIVACAO_KERAS
+
+        parametros = camada_keras.get_weights()
+        pesos = parametros[0]
+        pendores = (
+            parametros[1]
+            if len(parametros) > 1
+            else np.zeros(pesos.shape[1], pesos.dtype)
+        )
+
+        if len(rede.camadas) == 0:
+            rede.juntar(
+                CamadaDensa(0, pesos.shape[0], dtype=pesos.dtype, inicializar=False)
+            )
+
+        camada = CamadaDensa(
+            pesos.shape[0],
+            pesos.shape[1],
+            funcao_ativacao=FUNCOES_ATIVACAO_KERAS[nome_ativacao](),
+            dtype=pesos.dtype,
+            inicializar=False,
+        )
+        camada.atualizar_pesos(pesos)
+        camada.atualizar_pendores(pendores)
+        rede.juntar(camada)
+
+    return rede
+
+
+def verificar_equivalencia(modelo, rede, entradas, tolerancia=1e-5):
+    """
+    Compara as saídas de um modelo Keras e de uma rede nativa para as mesmas entradas.
+
+    Parâmetros:
+        modelo: Modelo Keras.
+        rede: Rede neuronal nativa (por exemplo, obtida com `importar_keras`).
+        entradas: Entradas de teste.
+        tolerancia: Diferença absoluta máxima admitida entre as saídas.
+
+    Retorna:
+        Dicionário com o erro absoluto máximo e se as redes são equivalentes.
+    """
+
+    saidas_keras = np.asarray(modelo.predict(entradas, verbose=0), dtype=np.float64)
+    saidas_nativas = np.asarray(rede.prever(entradas), dtype=np.float64)
+    erro_maximo = float(np.max(np.abs(saidas_keras - saidas_nativas)))
+
+    return {"erro_maximo": erro_maximo, "equivalente": erro_maximo <= tolerancia}
+
+
+if __name__ == "__main__":
+    # Converte o modelo XOR guardado em tests/parte1_3/test_xor_manual.py
+    modelo = carregar_keras("models/xor.keras")
+    rede = importar_keras(modelo)
+
+    x = np.array([[0, 0], [0, 1], [1, 0], [1, 1]])
+    print(verificar_equivalencia(modelo, rede, x))
+    rede.imprimir_previsao(x)
+
+    rede.guardar("models/xor")
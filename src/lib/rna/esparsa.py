@@ -0,0 +1,296 @@
+import numpy as np
+
+# Tamanho (em bytes) das linhas recolhidas de cada bloco do produto, para que
+# caibam na cache
+BYTES_BLOCO = 2**18
+
+
+class MatrizEsparsa:
+    """
+    Matriz esparsa no formato CSR (compressed sparse row): para cada linha, os
+    índices das colunas com valores não nulos e, se a matriz não for binária, esses
+    valores. As colunas da linha i são `indices[ponteiros[i]:ponteiros[i + 1]]`.
+
+    Numa matriz binária (por exemplo, padrões de bits ou codificações one-hot) os
+    valores são todos 1 e não são guardados, pelo que o produto por uma matriz densa
+    é apenas a soma das linhas dessa matriz correspondentes aos bits ativos de cada
+    linha (ver `produto`), com um custo proporcional ao número de valores não nulos.
+
+    Parâmetros:
+        ponteiros: Matriz (linhas + 1,) com o início de cada linha em `indices`.
+        indices: Matriz com os índices das colunas não nulas, linha a linha.
+        num_colunas: Número de colunas da matriz.
+        valores: Valores não nulos, pela ordem de `indices`, ou None se a matriz for
+        binária.
+
+    Exceções:
+        AssertionError: Se os ponteiros, índices e valores não forem consistentes.
+    """
+
+    def __init__(self, ponteiros, indices, num_colunas, valores=None):
+        self.__ponteiros = np.asarray(ponteiros, dtype=np.intp)
+        self.__indices = np.asarray(indices, dtype=np.intp)
+        self.__num_colunas = num_colunas
+        self.__valores = None if valores is None else np.asarray(valores)
+
+        assert self.__ponteiros.ndim == 1 and len(self.__ponteiros) > 0
+        assert self.__ponteiros[0] == 0 and self.__ponteiros[-1] == len(indices)
+        assert self.__valores is None or len(self.__valores) == len(indices)
+
+    @staticmethod
+    def de_densa(matriz):
+        """
+        Cria a matriz esparsa com os valores não nulos de uma matriz densa. Se todos
+        forem 1, a matriz esparsa é binária.
+
+        Parâmetros:
+            matriz: Matriz densa (linhas, colunas).
+
+        Retorna:
+            Matriz esparsa.
+        """
+
+        matriz = np.asarray(matriz)
+        assert matriz.ndim == 2
+        # Posições na matriz achatada (mais rápido do que np.nonzero em 2D)
+        num_linhas, num_colunas = matriz.shape
+        posicoes = np.flatnonzero(matriz != 0)
+        linhas, indices = np.divmod(posicoes, num_colunas)
+        ponteiros = np.searchsorted(posicoes, np.arange(num_linhas + 1) * num_colunas)
+
+        valores = matriz[linhas, indices]
+        binaria = np.all(valores == 1)
+        return MatrizEsparsa(
+            ponteiros, indices, num_colunas, None if binaria else valores
+        )
+
+    @staticmethod
+    def de_indices(listas, num_colunas):
+        """
+        Cria a matriz binária com os índices dos bits ativos de cada linha.
+
+        Parâmetros:
+            listas: Sequência com uma lista de índices de colunas por linha.
+            num_colunas: Número de colunas da matriz.
+
+        Retorna:
+            Matriz esparsa binária.
+
+        Exceções:
+            AssertionError: Se algum índice estiver fora das colunas.
+        """
+
+        ponteiros = np.zeros(len(listas) + 1, dtype=np.intp)
+        np.cumsum([len(lista) for lista in listas], out=ponteiros[1:])
+        indices = np.fromiter(
+            (i for lista in listas for i in lista), dtype=np.intp, count=ponteiros[-1]
+        )
+        assert np.all((indices >= 0) & (indices < num_colunas))
+        return MatrizEsparsa(ponteiros, indices, num_colunas)
+
+    @property
+    def shape(self):
+        return (len(self), self.__num_colunas)
+
+    @property
+    def ponteiros(self):
+        return self.__ponteiros
+
+    @property
+    def indices(self):
+        return self.__indices
+
+    @property
+    def valores(self):
+        """
+        Valores não nulos, ou None se a matriz for binária.
+        """
+        return self.__valores
+
+    @property
+    def binaria(self):
+        return self.__valores is None
+
+    @property
+    def num_nao_nulos(self):
+        return len(self.__indices)
+
+    @property
+    def densidade(self):
+        """
+        Fração de valores não nulos da matriz.
+        """
+        tamanho = len(self) * self.__num_colunas
+        return self.num_nao_nulos / tamanho if tamanho > 0 else 0.0
+
+    @property
+    def nbytes(self):
+        valores = 0 if self.__valores is None else self.__valores.nbytes
+        return self.__ponteiros.nbytes + self.__indices.nbytes + valores
+
+    def __len__(self):
+        return len(self.__ponteiros) - 1
+
+    def __getitem__(self, indice):
+        """
+        Obtém um conjunto contíguo de linhas (fatia com passo 1), sem copiar os
+        índices e valores.
+        """
+
+        inicio, fim, passo = indice.indices(len(self))
+        assert passo == 1
+        fim = max(inicio, fim)
+        primeiro, ultimo = self.__ponteiros[inicio], self.__ponteiros[fim]
+        return MatrizEsparsa(
+            self.__ponteiros[inicio : fim + 1] - primeiro,
+            self.__indices[primeiro:ultimo],
+            self.__num_colunas,
+            None if self.__valores is None else self.__valores[primeiro:ultimo],
+        )
+
+    def converter_tipo(self, dtype):
+        """
+        Obtém a matriz com os valores convertidos para outro tipo (a própria
+        matriz, se for binária ou os valores já forem desse tipo).
+        """
+
+        if self.__valores is None or self.__valores.dtype == dtype:
+            return self
+        return MatrizEsparsa(
+            self.__ponteiros,
+            self.__indices,
+            self.__num_colunas,
+            self.__valores.astype(dtype),
+        )
+
+    def linhas(self):
+        """
+        Obtém a linha de cada valor não nulo, pela ordem de `indices`.
+        """
+
+        return np.repeat(np.arange(len(self)), np.diff(self.__ponteiros))
+
+    def densa(self, dtype=np.float64):
+        """
+        Converte a matriz numa matriz densa.
+
+        Parâmetros:
+            dtype: Tipo de dados da matriz densa.
+
+        Retorna:
+            Matriz (linhas, colunas).
+        """
+
+        matriz = np.zeros(self.shape, dtype=dtype)
+        matriz[self.linhas(), self.__indices] = (
+            1 if self.__valores is None else self.__valores
+        )
+        return matriz
+
+    def produto(self, matriz):
+        """
+        Calcula o produto desta matriz por uma matriz densa (self @ matriz),
+        somando, para cada linha, as linhas da matriz densa das colunas não nulas
+        (multiplicadas pelos valores, se a matriz não for binária).
+
+        Parâmetros:
+            matriz: Matriz densa (colunas, n).
+
+        Retorna:
+            Matriz densa (linhas, n).
+        """
+
+        resultado = np.zeros((len(self), matriz.shape[1]), dtype=matriz.dtype)
+        if self.num_nao_nulos == 0:
+            return resultado
+
+        # Blocos de linhas cujas linhas recolhidas cabem na cache, em vez de uma
+        # única matriz (valores não nulos, n) percorrida duas vezes
+        bytes_linha = matriz.shape[1] * matriz.dtype.itemsize
+        media = max(1, self.num_nao_nulos // len(self))
+        linhas_bloco = max(1, BYTES_BLOCO // (media * bytes_linha))
+
+        ponteiros = self.__ponteiros
+        for inicio in range(0, len(self), linhas_bloco):
+            fim = min(inicio + linhas_bloco, len(self))
+            primeiro, ultimo = ponteiros[inicio], ponteiros[fim]
+            if primeiro == ultimo:
+                continue
+
+            recolhidas = matriz[self.__indices[primeiro:ultimo]]
+            if self.__valores is not None:
+                recolhidas *= self.__valores[primeiro:ultimo, np.newaxis]
+
+            # As linhas vazias não têm valores a somar (e reduceat não as suporta)
+            inicios = ponteiros[inicio:fim]
+            nao_vazias = inicios < ponteiros[inicio + 1 : fim + 1]
+            resultado[inicio:fim][nao_vazias] = np.add.reduceat(
+                recolhidas, inicios[nao_vazias] - primeiro, axis=0
+            )
+        return resultado
+
+    def produto_transposto(self, matriz):
+        """
+        Calcula o produto da transposta desta matriz por uma matriz densa
+        (self.T @ matriz), como no gradiente dos pesos de uma camada cujas entradas
+        são esta matriz.
+
+        Parâmetros:
+            matriz: Matriz densa (linhas, n).
+
+        Retorna:
+            Matriz densa (colunas, n).
+        """
+
+        resultado = np.zeros((self.__num_colunas, matriz.shape[1]), dtype=matriz.dtype)
+        if self.num_nao_nulos == 0:
+            return resultado
+
+        ordem = np.argsort(self.__indices, kind="stable")
+        colunas = self.__indices[ordem]
+        recolhidas = matriz[self.linhas()[ordem]]
+        if self.__valores is not None:
+            recolhidas *= self.__valores[ordem, np.newaxis]
+
+        inicios = np.flatnonzero(np.diff(colunas, prepend=-1))
+        resultado[colunas[inicios]] = np.add.reduceat(recolhidas, inicios, axis=0)
+        return resultado
+
+    def produto_esquerda(self, matriz):
+        """
+        Calcula o produto de uma matriz densa pela transposta desta matriz
+        (matriz @ self.T), em que cada linha desta matriz tem os pesos não nulos de
+        um neurónio (por exemplo, os pesos podados de uma camada, guardados por
+        neurónio): cada saída é a soma das colunas da matriz densa dos pesos não
+        nulos do neurónio, multiplicadas por esses pesos.
+
+        Parâmetros:
+            matriz: Matriz densa (n, colunas).
+
+        Retorna:
+            Matriz densa (n, linhas).
+        """
+
+        tipo = np.result_type(
+            matriz, self.__valores if self.__valores is not None else matriz
+        )
+        resultado = np.zeros((len(matriz), len(self)), dtype=tipo)
+        if self.num_nao_nulos == 0:
+            return resultado
+
+        inicios = self.__ponteiros[:-1]
+        nao_vazias = inicios < self.__ponteiros[1:]
+        inicios = inicios[nao_vazias]
+
+        # Blocos de linhas da matriz densa cujas colunas recolhidas cabem na cache
+        bytes_linha = self.num_nao_nulos * resultado.dtype.itemsize
+        linhas_bloco = max(1, BYTES_BLOCO // bytes_linha)
+        for inicio in range(0, len(matriz), linhas_bloco):
+            bloco = slice(inicio, inicio + linhas_bloco)
+            recolhidas = matriz[bloco][:, self.__indices].astype(tipo, copy=False)
+            if self.__valores is not None:
+                recolhidas *= self.__valores
+            resultado[bloco][:, nao_vazias] = np.add.reduceat(
+                recolhidas, inicios, axis=1
+            )
+        return resultado
@@ -0,0 +1,205 @@
+import numpy as np
+
+# Fator da média móvel exponencial do erro corrente (cerca dos últimos 50 lotes)
+SUAVIZACAO_PERDA = 0.98
+
+
+class Reservatorio:
+    """
+    Amostra aleatória uniforme, de tamanho fixo, de todas as amostras de um fluxo
+    (amostragem por reservatório, "algoritmo R"): as primeiras `capacidade`
+    amostras são guardadas e, depois, a n-ésima amostra substitui uma amostra
+    guardada ao acaso com probabilidade capacidade / n. Em cada momento, todas as
+    amostras vistas têm a mesma probabilidade de estar no reservatório, e a memória
+    não depende do comprimento do fluxo.
+
+    As matrizes do reservatório são reservadas uma única vez, na primeira amostra.
+
+    Parâmetros:
+        capacidade: Número máximo de amostras guardadas.
+        semente: Semente do gerador aleatório (opcional).
+
+    Exceções:
+        AssertionError: Se a capacidade não for positiva.
+    """
+
+    def __init__(self, capacidade, semente=None):
+        assert capacidade > 0
+        self.__capacidade = capacidade
+        self.__gerador = np.random.default_rng(semente)
+        self.__entradas = None
+        self.__saidas = None
+        self.__num_vistas = 0
+
+    @property
+    def capacidade(self):
+        return self.__capacidade
+
+    @property
+    def num_vistas(self):
+        """
+        Número de amostras do fluxo vistas pelo reservatório.
+        """
+        return self.__num_vistas
+
+    def __len__(self):
+        return min(self.__num_vistas, self.__capacidade)
+
+    def adicionar(self, entradas, saidas):
+        """
+        Apresenta um lote de amostras do fluxo ao reservatório.
+
+        Parâmetros:
+            entradas: Entradas do lote.
+            saidas: Saídas desejadas do lote.
+        """
+
+        if self.__entradas is None:
+            self.__entradas = np.empty(
+                (self.__capacidade, *entradas.shape[1:]), entradas.dtype
+            )
+            self.__saidas = np.empty(
+                (self.__capacidade, *saidas.shape[1:]), saidas.dtype
+            )
+
+        # As amostras que cabem são guardadas; as seguintes (n-ésimas do fluxo)
+        # substituem a posição j, sorteada entre 0 e n - 1, se j < capacidade
+        livres = max(0, min(len(entradas), self.__capacidade - self.__num_vistas))
+        inicio = self.__num_vistas
+        self.__entradas[inicio : inicio + livres] = entradas[:livres]
+        self.__saidas[inicio : inicio + livres] = saidas[:livres]
+
+        vistas = np.arange(inicio + livres, inicio + len(entradas)) + 1
+        posicoes = self.__gerador.integers(0, vistas)
+        substituir = posicoes < self.__capacidade
+        self.__entradas[posicoes[substituir]] = entradas[livres:][substituir]
+        self.__saidas[posicoes[substituir]] = saidas[livres:][substituir]
+        self.__num_vistas += len(entradas)
+
+    def amostrar(self, entradas, saidas):
+        """
+        Sorteia amostras do reservatório (com reposição) para as matrizes dadas.
+
+        Parâmetros:
+            entradas: Matriz onde escrever as entradas sorteadas (uma por linha).
+            saidas: Matriz onde escrever as saídas sorteadas.
+
+        Retorna:
+            Número de amostras escritas (0 se o reservatório estiver vazio).
+        """
+
+        if len(self) == 0:
+            return 0
+        indices = self.__gerador.integers(0, len(self), len(entradas))
+        np.take(self.__entradas, indices, axis=0, out=entradas)
+        np.take(self.__saidas, indices, axis=0, out=saidas)
+        return len(entradas)
+
+
+def treinar_fluxo(
+    fluxo,
+    tamanho_lote,
+    passo,
+    dtype,
+    reservatorio=None,
+    repeticoes=0,
+    monitores=None,
+    intervalo=100,
+):
+    """
+    Treina uma rede neuronal a partir de um fluxo de amostras (x, y), de
+    comprimento desconhecido ou infinito, com memória constante.
+
+    As amostras são copiadas para matrizes de mini-lote reservadas uma única vez
+    (na primeira amostra) e reutilizadas em todos os lotes. Cada lote completo (e o
+    último, se estiver incompleto) é uma atualização da rede. Com um reservatório,
+    cada lote é completado com `repeticoes` amostras antigas sorteadas do
+    reservatório (repetição de experiência, que reduz o esquecimento das amostras
+    antigas), e as novas amostras são depois apresentadas ao reservatório.
+
+    O erro corrente é a média móvel exponencial (com correção do viés inicial) do
+    erro de cada lote. Os monitores recebem o erro corrente em `ao_terminar_lote` e,
+    a cada `intervalo` lotes, em `ao_terminar_epoca` (em que cada "época" é esse
+    conjunto de lotes), pelo que os monitores de paragem também funcionam com
+    fluxos. O treino termina quando o fluxo acaba ou um monitor pede para parar.
+
+    Parâmetros:
+        fluxo: Iterável de pares (entrada, saída desejada) de uma amostra.
+        tamanho_lote: Número de amostras novas em cada mini-lote.
+        passo: Função (entradas, saidas) -> erro, que atualiza a rede com um lote.
+        dtype: Tipo de dados das matrizes de mini-lote.
+        reservatorio: Reservatório para a repetição de amostras (opcional).
+        repeticoes: Número de amostras do reservatório acrescentadas a cada lote.
+        monitores: Lista de monitores do treino (opcional).
+        intervalo: Número de lotes de cada "época" dos monitores.
+
+    Retorna:
+        Dicionário com o número de amostras do fluxo e de lotes treinados, o erro
+        corrente e o erro médio de todos os lotes.
+
+    Exceções:
+        AssertionError: Se o tamanho do lote ou o intervalo não forem positivos, ou
+        se forem pedidas repetições sem reservatório.
+    """
+
+    assert tamanho_lote > 0 and intervalo > 0 and repeticoes >= 0
+    assert repeticoes == 0 or reservatorio is not None
+
+    monitores = monitores or []
+    for monitor in monitores:
+        monitor.ao_iniciar()
+
+    entradas = saidas = None
+    num_novas = num_amostras = num_lotes = 0
+    media_movel = soma_perdas = perda_corrente = 0.0
+
+    def treinar_lote():
+        nonlocal media_movel, soma_perdas, perda_corrente, num_lotes
+        num = num_novas
+        if repeticoes > 0:
+            num += reservatorio.amostrar(
+                entradas[num : num + repeticoes], saidas[num : num + repeticoes]
+            )
+        perda = float(passo(entradas[:num], saidas[:num]))
+        if reservatorio is not None:
+            reservatorio.adicionar(entradas[:num_novas], saidas[:num_novas])
+
+        num_lotes += 1
+        soma_perdas += perda
+        media_movel = SUAVIZACAO_PERDA * media_movel + (1 - SUAVIZACAO_PERDA) * perda
+        perda_corrente = media_movel / (1 - SUAVIZACAO_PERDA**num_lotes)
+
+        for monitor in monitores:
+            monitor.ao_terminar_lote(num_lotes - 1, perda_corrente)
+        if num_lotes % intervalo == 0:
+            for monitor in monitores:
+                monitor.ao_terminar_epoca(num_lotes // intervalo - 1, perda_corrente)
+        return any(monitor.parar for monitor in monitores)
+
+    parar = False
+    for entrada, saida in fluxo:
+        if entradas is None:
+            entrada, saida = np.asarray(entrada), np.asarray(saida)
+            num_linhas = tamanho_lote + repeticoes
+            entradas = np.empty((num_linhas, *entrada.shape), dtype)
+            saidas = np.empty((num_linhas, *saida.shape), dtype)
+
+        entradas[num_novas] = entrada
+        saidas[num_novas] = saida
+        num_novas += 1
+        num_amostras += 1
+        if num_novas == tamanho_lote:
+            parar = treinar_lote()
+            num_novas = 0
+            if parar:
+                break
+
+    if num_novas > 0 and not parar:
+        treinar_lote()
+
+    return {
+        "amostras": num_amostras,
+        "lotes": num_lotes,
+        "perda": perda_corrente,
+        "perda_media": soma_perdas / num_lotes if num_lotes > 0 else 0.0,
+    }
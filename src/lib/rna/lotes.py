@@ -0,0 +1,96 @@
+import itertools
+import numpy as np
+from lib.rna.padroes import PadroesEmpacotados
+
+
+def iterar_lotes(fonte, tamanho_lote, dtype=None):
+    """
+    Percorre uma fonte de dados em lotes de, no máximo, `tamanho_lote` linhas,
+    sem nunca ter a fonte completa em memória.
+
+    A fonte pode ser:
+    - uma matriz (np.ndarray ou np.memmap), da qual são devolvidas fatias, que no
+    caso de um np.memmap só são lidas do disco quando utilizadas;
+    - padrões binários empacotados (`PadroesEmpacotados`), desempacotados lote a
+    lote numa matriz reservada uma única vez;
+    - um iterável de linhas (por exemplo, um gerador), cujas linhas são acumuladas
+    numa matriz reservada uma única vez e reutilizada em todos os lotes.
+
+    Parâmetros:
+        fonte: Matriz, padrões empacotados ou iterável de linhas.
+        tamanho_lote: Número máximo de linhas em cada lote.
+        dtype: Tipo de dados dos lotes (por omissão, o da fonte ou np.float64 para
+        padrões empacotados e iteráveis de linhas).
+
+    Retorna:
+        Gerador de lotes. Para padrões empacotados e iteráveis de linhas, cada lote
+        é reescrito no lote seguinte, pelo que deve ser copiado se for necessário
+        guardá-lo.
+
+    Exceções:
+        AssertionError: Se o tamanho do lote não for positivo.
+    """
+
+    assert tamanho_lote > 0
+
+    if isinstance(fonte, PadroesEmpacotados):
+        yield from fonte.lotes(tamanho_lote, np.float64 if dtype is None else dtype)
+        return
+
+    if isinstance(fonte, np.ndarray):
+        for inicio in range(0, len(fonte), tamanho_lote):
+            lote = fonte[inicio : inicio + tamanho_lote]
+            yield lote if dtype is None else np.asarray(lote, dtype=dtype)
+        return
+
+    linhas = iter(fonte)
+    primeira = next(linhas, None)
+    if primeira is None:
+        return
+
+    primeira = np.asarray(primeira, dtype=dtype)
+    lote = np.empty((tamanho_lote, *primeira.shape), dtype=primeira.dtype)
+    num_linhas = 0
+    for linha in itertools.chain((primeira,), linhas):
+        lote[num_linhas] = linha
+        num_linhas += 1
+        if num_linhas == tamanho_lote:
+            yield lote
+            num_linhas = 0
+
+    if num_linhas > 0:
+        yield lote[:num_linhas]
+
+
+def escrever_lotes(lotes, saida=None):
+    """
+    Copia cada lote de resultados para a posição seguinte de uma matriz de saída
+    (por exemplo, um np.memmap aberto para escrita), ou para uma nova matriz do
+    tamanho do lote, se não for dada uma saída.
+
+    Parâmetros:
+        lotes: Iterável de lotes de resultados.
+        saida: Matriz de saída com linhas suficientes para todos os resultados
+        (opcional).
+
+    Retorna:
+        Gerador das partes escritas da saída (ou das cópias de cada lote).
+
+    Exceções:
+        AssertionError: Se a saída não tiver linhas suficientes.
+    """
+
+    inicio = 0
+    for lote in lotes:
+        if saida is None:
+            yield np.array(lote)
+            continue
+
+        fim = inicio + len(lote)
+        assert fim <= len(saida)
+        saida[inicio:fim] = lote
+        yield saida[inicio:fim]
+        inicio = fim
+
+    if isinstance(saida, np.memmap):
+        saida.flush()
@@ -0,0 +1,205 @@
+import time
+import numpy as np
+
+
+class HistoricoTreino(list):
+    """
+    Lista com os erros de cada época de treino, que regista também a época em que o
+    treino foi interrompido por um monitor.
+
+    Parâmetros:
+        erros: Erros de cada época executada.
+        epoca_paragem: Índice da época em que o treino foi interrompido, ou None se o
+        treino executou todas as épocas.
+    """
+
+    def __init__(self, erros=(), epoca_paragem=None):
+        super().__init__(erros)
+        self.epoca_paragem = epoca_paragem
+
+    def completar(self, num_epocas):
+        """
+        Completa a curva de erros até ao número de épocas pedido, repetindo o último
+        erro, para que os treinos interrompidos mantenham a forma dos resultados.
+
+        Parâmetros:
+            num_epocas: Número total de épocas.
+
+        Retorna:
+            Matriz (num_epocas,) com os erros.
+
+        Exceções:
+            AssertionError: Se o histórico tiver mais épocas do que as pedidas, ou
+            estiver vazio.
+        """
+
+        assert 0 < len(self) <= num_epocas
+        return np.pad(
+            np.asarray(self, dtype=np.float64), (0, num_epocas - len(self)), "edge"
+        )
+
+
+class Monitor:
+    """
+    Monitor do treino de uma rede neuronal, chamado no fim de cada mini-lote e de
+    cada época. Para interromper o treino, um monitor define `parar` como verdadeiro;
+    o treino termina no fim do mini-lote ou da época em que isso acontece.
+
+    O mesmo protocolo é usado pelas duas plataformas: a rede nativa chama os métodos
+    diretamente, e a rede Keras envolve os monitores num `keras.callbacks.Callback`
+    (ver `callback_keras`).
+    """
+
+    def __init__(self):
+        self.parar = False
+
+    def ao_iniciar(self):
+        """
+        Chamado no início de cada treino, antes da primeira época.
+        """
+
+        self.parar = False
+
+    def ao_terminar_lote(self, lote, perda):
+        """
+        Chamado no fim de cada mini-lote.
+
+        Parâmetros:
+            lote: Índice do mini-lote na época.
+            perda: Erro do mini-lote (na plataforma Keras, a média da época até esse
+            mini-lote).
+        """
+
+    def ao_terminar_epoca(self, epoca, perda):
+        """
+        Chamado no fim de cada época.
+
+        Parâmetros:
+            epoca: Índice da época.
+            perda: Erro da época.
+        """
+
+
+class ParagemLimiar(Monitor):
+    """
+    Interrompe o treino quando o erro de uma época é inferior ou igual a um limiar.
+
+    Parâmetros:
+        limiar: Erro a partir do qual o treino é interrompido.
+    """
+
+    def __init__(self, limiar):
+        super().__init__()
+        self.__limiar = limiar
+
+    def ao_terminar_epoca(self, epoca, perda):
+        if perda <= self.__limiar:
+            self.parar = True
+
+
+class ParagemPlateau(Monitor):
+    """
+    Interrompe o treino quando o erro deixa de melhorar: se, durante `paciencia`
+    épocas seguidas, o erro não descer mais do que `delta_min` abaixo do melhor erro
+    obtido.
+
+    Parâmetros:
+        paciencia: Número de épocas sem melhoria admitidas.
+        delta_min: Descida mínima do erro considerada uma melhoria.
+
+    Exceções:
+        AssertionError: Se a paciência não for positiva ou o delta for negativo.
+    """
+
+    def __init__(self, paciencia=10, delta_min=0.0):
+        assert paciencia > 0 and delta_min >= 0
+        super().__init__()
+        self.__paciencia = paciencia
+        self.__delta_min = delta_min
+        self.__melhor = np.inf
+        self.__espera = 0
+
+    def ao_iniciar(self):
+        super().ao_iniciar()
+        self.__melhor = np.inf
+        self.__espera = 0
+
+    def ao_terminar_epoca(self, epoca, perda):
+        if perda < self.__melhor - self.__delta_min:
+            self.__melhor = perda
+            self.__espera = 0
+            return
+
+        self.__espera += 1
+        if self.__espera >= self.__paciencia:
+            self.parar = True
+
+
+class LimiteTempo(Monitor):
+    """
+    Interrompe o treino quando é excedido um limite de tempo real, verificado no fim
+    de cada mini-lote.
+
+    Parâmetros:
+        segundos: Duração máxima do treino, em segundos.
+
+    Exceções:
+        AssertionError: Se a duração não for positiva.
+    """
+
+    def __init__(self, segundos):
+        assert segundos > 0
+        super().__init__()
+        self.__segundos = segundos
+        self.__inicio = time.perf_counter()
+
+    def ao_iniciar(self):
+        super().ao_iniciar()
+        self.__inicio = time.perf_counter()
+
+    def ao_terminar_lote(self, lote, perda):
+        if time.perf_counter() - self.__inicio >= self.__segundos:
+            self.parar = True
+
+
+def callback_keras(monitores):
+    """
+    Envolve uma lista de monitores num `keras.callbacks.Callback`, que interrompe o
+    treino do modelo (`stop_training`) quando algum monitor pede para parar.
+
+    Parâmetros:
+        monitores: Lista de monitores.
+
+    Retorna:
+        Callback Keras.
+    """
+
+    from keras.callbacks import Callback
+
+    class CallbackMonitores(Callback):
+        def __init__(self):
+            super().__init__()
+            self.epoca_paragem = None
+
+        def on_train_begin(self, logs=None):
+            self.epoca_paragem = None
+            for monitor in monitores:
+                monitor.ao_iniciar()
+
+        def on_train_batch_end(self, batch, logs=None):
+            for monitor in monitores:
+                monitor.ao_terminar_lote(batch, float(logs["loss"]))
+            self.__verificar_paragem()
+
+        def on_epoch_end(self, epoch, logs=None):
+            for monitor in monitores:
+                monitor.ao_terminar_epoca(epoch, float(logs["loss"]))
+            self.__verificar_paragem()
+            if self.model.stop_training and self.epoca_paragem is None:
+                self.epoca_paragem = epoch
+
+        def __verificar_paragem(self):
+            if any(monitor.parar for monitor in monitores):
+                self.model.stop_training = True
+
+    return CallbackMonitores()
@@ -0,0 +1,349 @@
+import numpy as np
+
+
+class Otimizador:
+    """
+    Classe para representar um algoritmo de otimização dos parâmetros de uma rede
+    neuronal a partir dos gradientes da perda.
+
+    O estado do otimizador (por exemplo, as velocidades ou os momentos) é guardado
+    em matrizes reservadas uma única vez para cada matriz de parâmetros (`iniciar`),
+    e cada passo atualiza o estado e os parâmetros no próprio lugar, com operações
+    `out=` e uma matriz auxiliar por parâmetro, sem reservar memória nova em cada
+    mini-lote.
+
+    As fórmulas são as dos otimizadores Keras com o mesmo nome, pelo que a mesma
+    especificação (ver `criar_otimizador`) dá o mesmo treino nas duas plataformas.
+
+    Parâmetros:
+        taxa_aprendizagem: Taxa de aprendizagem.
+
+    Exceções:
+        AssertionError: Se a taxa de aprendizagem não for positiva.
+    """
+
+    def __init__(self, taxa_aprendizagem):
+        assert taxa_aprendizagem > 0
+        self.taxa_aprendizagem = taxa_aprendizagem
+        self.__estados = None
+        self.__iteracoes = 0
+
+    @property
+    def iteracoes(self):
+        """
+        Número de passos executados desde `iniciar`.
+        """
+        return self.__iteracoes
+
+    def configuracao(self):
+        """
+        Obtém os hiperparâmetros do otimizador, que permitem recriá-lo.
+        """
+
+        return {"taxa_aprendizagem": self.taxa_aprendizagem}
+
+    def iniciar(self, parametros):
+        """
+        Reserva o estado do otimizador para uma lista de matrizes de parâmetros (por
+        exemplo, os pesos e pendores de cada camada), com o mesmo tipo e forma.
+
+        Parâmetros:
+            parametros: Lista de matrizes de parâmetros.
+        """
+
+        self.__estados = [self._novo_estado(p) for p in parametros]
+        self.__iteracoes = 0
+
+    def passo(self, parametros, gradientes):
+        """
+        Atualiza, no próprio lugar, as matrizes de parâmetros dadas a `iniciar`.
+
+        Parâmetros:
+            parametros: Lista de matrizes de parâmetros (as mesmas de `iniciar`).
+            gradientes: Lista com o gradiente da perda para cada matriz.
+
+        Exceções:
+            AssertionError: Se o otimizador não tiver sido iniciado para estes
+            parâmetros.
+        """
+
+        assert self.__estados is not None and len(self.__estados) == len(parametros)
+        self.__iteracoes += 1
+        for estado, parametro, gradiente in zip(self.__estados, parametros, gradientes):
+            self.atualizar(estado, parametro, gradiente)
+
+    def atualizar(self, estado, parametro, gradiente):
+        """
+        Atualiza uma matriz de parâmetros e o seu estado, no próprio lugar.
+
+        Parâmetros:
+            estado: Estado da matriz (tuplo de matrizes, ver `_novo_estado`).
+            parametro: Matriz de parâmetros.
+            gradiente: Gradiente da perda em relação aos parâmetros.
+        """
+
+        raise NotImplementedError
+
+    def keras(self):
+        """
+        Cria o otimizador Keras equivalente.
+        """
+
+        raise NotImplementedError
+
+    def _novo_estado(self, parametro):
+        # Por omissão, apenas uma matriz auxiliar para os cálculos intermédios
+        return (np.zeros_like(parametro),)
+
+    def __str__(self):
+        parametros = ", ".join(f"{k}={v}" for k, v in self.configuracao().items())
+        return f"{type(self).__name__}({parametros})"
+
+
+class SGD(Otimizador):
+    """
+    Descida de gradiente estocástico com termo de momento:
+
+        v = momento * v - taxa_aprendizagem * gradiente
+        w = w + v
+
+    Com `nesterov`, o passo usa o momento de Nesterov (w = w + momento * v -
+    taxa_aprendizagem * gradiente), como no otimizador SGD Keras.
+
+    Parâmetros:
+        taxa_aprendizagem: Taxa de aprendizagem.
+        momento: Momento, entre 0 e 1.
+        nesterov: Se verdadeiro, usa o momento de Nesterov.
+
+    Exceções:
+        AssertionError: Se o momento não estiver entre 0 e 1.
+    """
+
+    def __init__(self, taxa_aprendizagem=0.01, momento=0.0, nesterov=False):
+        assert 0 <= momento < 1
+        super().__init__(taxa_aprendizagem)
+        self.momento = momento
+        self.nesterov = nesterov
+
+    def configuracao(self):
+        return {
+            "taxa_aprendizagem": self.taxa_aprendizagem,
+            "momento": self.momento,
+            "nesterov": self.nesterov,
+        }
+
+    def _novo_estado(self, parametro):
+        return (np.zeros_like(parametro), np.zeros_like(parametro))
+
+    def atualizar(self, estado, parametro, gradiente):
+        velocidade, auxiliar = estado
+        passo = np.multiply(gradiente, self.taxa_aprendizagem, out=auxiliar)
+        velocidade *= self.momento
+        velocidade -= passo
+        if not self.nesterov:
+            parametro += velocidade
+            return
+
+        parametro -= passo
+        parametro += np.multiply(velocidade, self.momento, out=auxiliar)
+
+    def keras(self):
+        from keras.optimizers import SGD as SGDKeras
+
+        return SGDKeras(
+            learning_rate=self.taxa_aprendizagem,
+            momentum=self.momento,
+            nesterov=self.nesterov,
+        )
+
+
+class Nesterov(SGD):
+    """
+    Descida de gradiente estocástico com o momento de Nesterov (ver `SGD`).
+
+    Parâmetros:
+        taxa_aprendizagem: Taxa de aprendizagem.
+        momento: Momento, entre 0 e 1.
+    """
+
+    def __init__(self, taxa_aprendizagem=0.01, momento=0.9):
+        super().__init__(taxa_aprendizagem, momento, nesterov=True)
+
+    def configuracao(self):
+        return {"taxa_aprendizagem": self.taxa_aprendizagem, "momento": self.momento}
+
+
+class RMSProp(Otimizador):
+    """
+    RMSProp: o passo de cada parâmetro é dividido pela raiz da média móvel dos
+    quadrados dos seus gradientes, o que adapta a taxa de aprendizagem à escala de
+    cada parâmetro:
+
+        s = rho * s + (1 - rho) * gradiente^2
+        w = w - taxa_aprendizagem * gradiente / raiz(s + epsilon)
+
+    Parâmetros:
+        taxa_aprendizagem: Taxa de aprendizagem.
+        rho: Fator de decaimento da média móvel, entre 0 e 1.
+        epsilon: Constante que evita divisões por zero.
+
+    Exceções:
+        AssertionError: Se rho não estiver entre 0 e 1.
+    """
+
+    def __init__(self, taxa_aprendizagem=0.001, rho=0.9, epsilon=1e-7):
+        assert 0 <= rho < 1
+        super().__init__(taxa_aprendizagem)
+        self.rho = rho
+        self.epsilon = epsilon
+
+    def configuracao(self):
+        return {
+            "taxa_aprendizagem": self.taxa_aprendizagem,
+            "rho": self.rho,
+            "epsilon": self.epsilon,
+        }
+
+    def _novo_estado(self, parametro):
+        return (np.zeros_like(parametro), np.zeros_like(parametro))
+
+    def atualizar(self, estado, parametro, gradiente):
+        quadrados, auxiliar = estado
+        quadrados *= self.rho
+        np.square(gradiente, out=auxiliar)
+        auxiliar *= 1 - self.rho
+        quadrados += auxiliar
+
+        np.add(quadrados, self.epsilon, out=auxiliar)
+        np.sqrt(auxiliar, out=auxiliar)
+        np.divide(gradiente, auxiliar, out=auxiliar)
+        auxiliar *= self.taxa_aprendizagem
+        parametro -= auxiliar
+
+    def keras(self):
+        from keras.optimizers import RMSprop
+
+        return RMSprop(
+            learning_rate=self.taxa_aprendizagem, rho=self.rho, epsilon=self.epsilon
+        )
+
+
+class Adam(Otimizador):
+    """
+    Adam: combina o momento (média móvel dos gradientes, m) com a adaptação da
+    escala de cada parâmetro (média móvel dos quadrados, v), com correção do viés
+    das médias nas primeiras iterações t:
+
+        m = m + (1 - beta_1) * (gradiente - m)
+        v = v + (1 - beta_2) * (gradiente^2 - v)
+        w = w - taxa_t * m / (raiz(v) + epsilon),
+        com taxa_t = taxa_aprendizagem * raiz(1 - beta_2^t) / (1 - beta_1^t)
+
+    Parâmetros:
+        taxa_aprendizagem: Taxa de aprendizagem.
+        beta_1: Fator de decaimento da média dos gradientes, entre 0 e 1.
+        beta_2: Fator de decaimento da média dos quadrados, entre 0 e 1.
+        epsilon: Constante que evita divisões por zero.
+
+    Exceções:
+        AssertionError: Se os fatores de decaimento não estiverem entre 0 e 1.
+    """
+
+    def __init__(self, taxa_aprendizagem=0.001, beta_1=0.9, beta_2=0.999, epsilon=1e-7):
+        assert 0 <= beta_1 < 1 and 0 <= beta_2 < 1
+        super().__init__(taxa_aprendizagem)
+        self.beta_1 = beta_1
+        self.beta_2 = beta_2
+        self.epsilon = epsilon
+
+    def configuracao(self):
+        return {
+            "taxa_aprendizagem": self.taxa_aprendizagem,
+            "beta_1": self.beta_1,
+            "beta_2": self.beta_2,
+            "epsilon": self.epsilon,
+        }
+
+    def _novo_estado(self, parametro):
+        return (
+            np.zeros_like(parametro),
+            np.zeros_like(parametro),
+            np.zeros_like(parametro),
+        )
+
+    def atualizar(self, estado, parametro, gradiente):
+        media, quadrados, auxiliar = estado
+        t = self.iteracoes
+        taxa = (
+            self.taxa_aprendizagem * np.sqrt(1 - self.beta_2**t) / (1 - self.beta_1**t)
+        )
+
+        np.subtract(gradiente, media, out=auxiliar)
+        auxiliar *= 1 - self.beta_1
+        media += auxiliar
+
+        np.square(gradiente, out=auxiliar)
+        auxiliar -= quadrados
+        auxiliar *= 1 - self.beta_2
+        quadrados += auxiliar
+
+        np.sqrt(quadrados, out=auxiliar)
+        auxiliar += self.epsilon
+        np.divide(media, auxiliar, out=auxiliar)
+        auxiliar *= taxa
+        parametro -= auxiliar
+
+    def keras(self):
+        from keras.optimizers import Adam as AdamKeras
+
+        return AdamKeras(
+            learning_rate=self.taxa_aprendizagem,
+            beta_1=self.beta_1,
+            beta_2=self.beta_2,
+            epsilon=self.epsilon,
+        )
+
+
+def _classes_otimizador(classe=Otimizador):
+    classes = {}
+    for subclasse in classe.__subclasses__():
+        classes[subclasse.__name__.lower()] = subclasse
+        classes.update(_classes_otimizador(subclasse))
+    return classes
+
+
+def criar_otimizador(especificacao, taxa_aprendizagem=None, momento=None):
+    """
+    Cria um otimizador a partir de uma especificação, comum às duas plataformas.
+
+    Parâmetros:
+        especificacao: Otimizador (usado tal como é dado), nome da sua classe (por
+        exemplo, "adam", sem distinção de maiúsculas) ou dicionário {"nome": ...,
+        "parametros": {...}} (como em `configuracao`).
+        taxa_aprendizagem: Taxa de aprendizagem, usada se a especificação não a
+        indicar (opcional).
+        momento: Momento, usado pelos otimizadores com momento se a especificação
+        não o indicar (opcional).
+
+    Retorna:
+        Otimizador.
+
+    Exceções:
+        AssertionError: Se não existir um otimizador com o nome dado.
+    """
+
+    if isinstance(especificacao, Otimizador):
+        return especificacao
+
+    if isinstance(especificacao, str):
+        especificacao = {"nome": especificacao}
+    nome = especificacao["nome"].lower()
+    parametros = dict(especificacao.get("parametros", {}))
+
+    classes = _classes_otimizador()
+    assert nome in classes
+    if taxa_aprendizagem is not None:
+        parametros.setdefault("taxa_aprendizagem", taxa_aprendizagem)
+    if momento is not None and issubclass(classes[nome], SGD):
+        parametros.setdefault("momento", momento)
+    return classes[nome](**parametros)
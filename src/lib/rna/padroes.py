@@ -0,0 +1,377 @@
+import functools
+import numpy as np
+
+# Número máximo de bits dos padrões para os quais as máscaras de mutação são
+# escolhidas de uma tabela de todas as máscaras possíveis (2^20 máscaras, 8 MiB)
+MAX_BITS_TABELA = 20
+
+
+def desempacotar(codigos, num_bits):
+    """
+    Converte números inteiros nas matrizes dos seus bits, do mais significativo para
+    o menos significativo (a ordem de `format(n, "016b")`), sem ciclos Python.
+
+    Os números são representados com bytes em ordem big-endian (por exemplo, uint16
+    ">u2"), cuja vista como bytes é desempacotada com `np.unpackbits`.
+
+    Parâmetros:
+        codigos: Número inteiro ou matriz de números inteiros não negativos.
+        num_bits: Número de bits de cada padrão (no máximo 64).
+
+    Retorna:
+        Matriz (*forma dos códigos, num_bits) de bits (np.uint8).
+
+    Exceções:
+        AssertionError: Se o número de bits não estiver entre 1 e 64.
+    """
+
+    num_bytes = _num_bytes(num_bits)
+    codigos = np.asarray(codigos)
+    grandes = np.ascontiguousarray(codigos, dtype=f">u{num_bytes}")
+    bits = np.unpackbits(grandes.view(np.uint8).reshape(*codigos.shape, num_bytes))
+    return bits.reshape(*codigos.shape, num_bytes * 8)[..., -num_bits:]
+
+
+def empacotar(bits):
+    """
+    Converte matrizes de bits (do mais significativo para o menos significativo)
+    nos números inteiros correspondentes, com `np.packbits`; é a operação inversa
+    de `desempacotar`.
+
+    Parâmetros:
+        bits: Matriz (..., num_bits) de bits (0 ou 1, ou booleanos).
+
+    Retorna:
+        Matriz (...) de números inteiros (np.uint64).
+
+    Exceções:
+        AssertionError: Se o número de bits não estiver entre 1 e 64.
+    """
+
+    bits = np.asarray(bits)
+    num_bits = bits.shape[-1]
+    num_bytes = _num_bytes(num_bits)
+
+    # Os bits são alinhados à direita, com zeros à esquerda, antes de empacotados
+    completos = np.zeros((*bits.shape[:-1], num_bytes * 8), dtype=np.uint8)
+    completos[..., num_bytes * 8 - num_bits :] = bits
+    grandes = np.packbits(completos, axis=-1).view(f">u{num_bytes}")
+    return grandes[..., 0].astype(np.uint64)
+
+
+def _num_bytes(num_bits):
+    """
+    Obtém o número de bytes do menor tipo inteiro (1, 2, 4 ou 8 bytes) com pelo
+    menos `num_bits` bits.
+    """
+
+    assert 0 < num_bits <= 64
+    num_bytes = 1
+    while num_bytes * 8 < num_bits:
+        num_bytes *= 2
+    return num_bytes
+
+
+def tabela_padroes(num_bits=16):
+    """
+    Obtém todos os padrões de `num_bits` bits, em que a linha n é o padrão com o
+    código n.
+
+    Parâmetros:
+        num_bits: Número de bits de cada padrão.
+
+    Retorna:
+        Matriz (2^num_bits, num_bits) de bits (np.uint8).
+    """
+
+    return desempacotar(np.arange(2**num_bits), num_bits)
+
+
+def probabilidades_mutacao(num_bits, fator_exponencial=1.2):
+    """
+    Obtém a distribuição do número de bits alterados numa mutação: é mais provável
+    que se alterem poucos bits do que muitos, com a probabilidade de alterar N bits
+    proporcional a 1 / N^fator_exponencial, entre 1 e metade dos bits.
+
+    Parâmetros:
+        num_bits: Número de bits de cada padrão.
+        fator_exponencial: Expoente da distribuição.
+
+    Retorna:
+        Probabilidades de alterar 1, 2, ..., num_bits // 2 bits.
+    """
+
+    num_alterar = np.arange(1, num_bits // 2 + 1)
+    probabilidades = 1 / num_alterar.astype(np.float64) ** fator_exponencial
+    return probabilidades / np.sum(probabilidades)
+
+
+def gerar_mascaras(num_mascaras, num_bits, fator_exponencial=1.2):
+    """
+    Gera máscaras de mutação aleatórias, de uma só vez: o número de bits de cada
+    máscara segue `probabilidades_mutacao` e as posições desses bits são escolhidas
+    uniformemente, sem repetição.
+
+    Para padrões com até MAX_BITS_TABELA bits, cada máscara é escolhida
+    uniformemente entre todas as máscaras com o número de bits sorteado, numa tabela
+    das máscaras ordenadas pelo número de bits, o que equivale a escolher as posições
+    sem repetição. Para padrões maiores, as posições são escolhidas ordenando números
+    aleatórios em cada linha e selecionando os N menores.
+
+    Parâmetros:
+        num_mascaras: Número de máscaras.
+        num_bits: Número de bits de cada padrão.
+        fator_exponencial: Expoente da distribuição do número de bits alterados.
+
+    Retorna:
+        Matriz (num_mascaras,) de máscaras (np.uint64), com os bits a alterar a 1.
+    """
+
+    probabilidades = probabilidades_mutacao(num_bits, fator_exponencial)
+    num_alterar = np.random.choice(len(probabilidades), num_mascaras, p=probabilidades)
+
+    if num_bits <= MAX_BITS_TABELA:
+        mascaras, inicios, quantidades = _tabela_mascaras(num_bits)
+        escolhas = np.random.random(num_mascaras) * quantidades[num_alterar + 1]
+        return mascaras[inicios[num_alterar + 1] + escolhas.astype(np.int64)]
+
+    # Os bits alterados são os num_alterar + 1 de menor chave aleatória
+    chaves = np.random.random((num_mascaras, num_bits))
+    limites = np.take_along_axis(
+        np.sort(chaves, axis=1), num_alterar[:, np.newaxis], axis=1
+    )
+    return empacotar(chaves <= limites)
+
+
+@functools.lru_cache(maxsize=None)
+def _tabela_mascaras(num_bits):
+    """
+    Obtém todas as máscaras de `num_bits` bits ordenadas pelo número de bits a 1, e,
+    para cada número de bits, a posição da primeira máscara e a quantidade de
+    máscaras com esse número de bits.
+    """
+
+    mascaras = np.arange(2**num_bits, dtype=np.uint64)
+    num_uns = np.sum(desempacotar(mascaras, num_bits), axis=1)
+    ordem = np.argsort(num_uns, kind="stable")
+    quantidades = np.bincount(num_uns, minlength=num_bits + 1)
+    inicios = np.concatenate(([0], np.cumsum(quantidades)[:-1]))
+    return mascaras[ordem], inicios, quantidades
+
+
+def gerar_mutacoes(padrao, num_mutacoes, num_bits, fator_exponencial=1.2):
+    """
+    Gera mutações de um padrão, invertendo os bits de máscaras aleatórias (ver
+    `gerar_mascaras`) com a operação XOR bit-a-bit.
+
+    Parâmetros:
+        padrao: Padrão a ser mutado (número inteiro).
+        num_mutacoes: Número de mutações.
+        num_bits: Número de bits do padrão.
+        fator_exponencial: Expoente da distribuição do número de bits alterados.
+
+    Retorna:
+        Matriz (num_mutacoes,) de padrões mutados (números inteiros, np.uint64).
+    """
+
+    mascaras = gerar_mascaras(num_mutacoes, num_bits, fator_exponencial)
+    return np.uint64(padrao) ^ mascaras
+
+
+def gerar_conjunto(
+    padroes, num_instancias, num_bits, fator_exponencial=1.2, empacotado=False
+):
+    """
+    Gera um conjunto de teste de mutações de vários padrões, com as saídas esperadas.
+    Cada padrão tem num_instancias // len(padroes) mutações, e o último tem também
+    as restantes.
+
+    Parâmetros:
+        padroes: Lista de padrões (números inteiros), um por classe.
+        num_instancias: Número total de instâncias.
+        num_bits: Número de bits de cada padrão.
+        fator_exponencial: Expoente da distribuição do número de bits alterados.
+        empacotado: Se verdadeiro, as entradas são `PadroesEmpacotados`.
+
+    Retorna:
+        Tuplo (entradas, saidas): a matriz (num_instancias, num_bits) de bits das
+        mutações (np.uint8), ou os padrões empacotados, e a matriz
+        (num_instancias, len(padroes)) das saídas esperadas (codificação one-hot).
+    """
+
+    num_por_padrao = np.full(len(padroes), num_instancias // len(padroes))
+    num_por_padrao[-1] += num_instancias - np.sum(num_por_padrao)
+
+    classes = np.repeat(np.arange(len(padroes)), num_por_padrao)
+    codigos = np.asarray(padroes, dtype=np.uint64)[classes] ^ gerar_mascaras(
+        num_instancias, num_bits, fator_exponencial
+    )
+    saidas = np.eye(len(padroes), dtype=np.uint8)[classes]
+    if empacotado:
+        return PadroesEmpacotados(codigos, num_bits), saidas
+    return desempacotar(codigos, num_bits), saidas
+
+
+def tipo_palavra(num_bits):
+    """
+    Obtém o menor tipo inteiro sem sinal (np.uint8, np.uint16, np.uint32 ou
+    np.uint64) com pelo menos `num_bits` bits.
+    """
+
+    return np.dtype(f"u{_num_bytes(num_bits)}")
+
+
+class PadroesEmpacotados:
+    """
+    Conjunto de padrões binários guardados como números inteiros (um por padrão, no
+    menor tipo inteiro com bits suficientes), em vez de uma matriz de bits.
+
+    Um padrão de 16 bits ocupa 2 bytes, em vez de 16 bytes (np.uint8) ou 128 bytes
+    (inteiros de 64 bits), e o conjunto de todos os padrões de N bits pode ser
+    representado por um `range`, sem memória nenhuma, o que permite enumerar espaços
+    de padrões maiores (5x5, 6x6). Os bits são desempacotados apenas lote a lote,
+    imediatamente antes da propagação (`lotes`), pelo que a memória necessária
+    depende do tamanho do lote e não do número de padrões.
+
+    `RedeNeuronal.prever` e `prever_em_lotes` (e `lib.rna.lotes.iterar_lotes`)
+    aceitam diretamente padrões empacotados.
+
+    Parâmetros:
+        codigos: Matriz ou `range` dos códigos (números inteiros) dos padrões.
+        num_bits: Número de bits de cada padrão.
+
+    Exceções:
+        AssertionError: Se o número de bits não estiver entre 1 e 64, ou se algum
+        código tiver mais bits.
+    """
+
+    def __init__(self, codigos, num_bits):
+        self.__num_bits = int(num_bits)
+        self.__dtype = tipo_palavra(self.__num_bits)
+        if isinstance(codigos, range):
+            # Os extremos de um `range` são o primeiro e o último código (por ordem
+            # do passo), pelo que não é preciso percorrê-lo
+            assert len(codigos) == 0 or all(
+                0 <= c < 2**self.__num_bits for c in (codigos[0], codigos[-1])
+            )
+            self.__codigos = codigos
+        else:
+            codigos = np.asarray(codigos)
+            assert codigos.ndim == 1
+            assert codigos.size == 0 or np.max(codigos) >> self.__num_bits == 0
+            self.__codigos = codigos.astype(self.__dtype, copy=False)
+
+    @classmethod
+    def todos(cls, num_bits):
+        """
+        Obtém todos os padrões de `num_bits` bits (o padrão n tem o código n), sem
+        os guardar em memória.
+        """
+
+        return cls(range(2**num_bits), num_bits)
+
+    @classmethod
+    def de_bits(cls, bits):
+        """
+        Empacota uma matriz (padrões, num_bits) de bits.
+        """
+
+        bits = np.asarray(bits)
+        return cls(empacotar(bits), bits.shape[-1])
+
+    @property
+    def num_bits(self):
+        return self.__num_bits
+
+    @property
+    def shape(self):
+        """
+        Forma da matriz de bits equivalente (padrões, num_bits).
+        """
+        return (len(self), self.__num_bits)
+
+    @property
+    def codigos(self):
+        """
+        Códigos dos padrões (matriz ou `range`).
+        """
+        return self.__codigos
+
+    @property
+    def nbytes(self):
+        """
+        Memória ocupada pelos códigos, em bytes (0 para um `range`).
+        """
+        return 0 if isinstance(self.__codigos, range) else self.__codigos.nbytes
+
+    def __len__(self):
+        return len(self.__codigos)
+
+    def __getitem__(self, indice):
+        """
+        Obtém os bits de um padrão (índice inteiro), ou um subconjunto empacotado
+        (fatia ou matriz de índices).
+        """
+
+        if isinstance(indice, (int, np.integer)):
+            return desempacotar(self.__codigos[indice], self.__num_bits)
+        if isinstance(indice, slice) or not isinstance(self.__codigos, range):
+            return PadroesEmpacotados(self.__codigos[indice], self.__num_bits)
+
+        # Os códigos de um `range` são calculados só para os índices pedidos
+        indice = np.asarray(indice)
+        if indice.dtype == bool:
+            indice = np.flatnonzero(indice)
+        indice = np.where(indice < 0, indice + len(self), indice)
+        assert np.all((indice >= 0) & (indice < len(self)))
+        codigos = self.__codigos.start + indice * self.__codigos.step
+        return PadroesEmpacotados(codigos, self.__num_bits)
+
+    def __iter__(self):
+        for lote in self.lotes(4096):
+            yield from lote.copy()
+
+    def desempacotar(self, dtype=np.uint8):
+        """
+        Obtém a matriz (padrões, num_bits) de bits de todos os padrões.
+        """
+
+        return desempacotar(self.__codigos_lote(0, len(self)), self.__num_bits).astype(
+            dtype, copy=False
+        )
+
+    def lotes(self, tamanho_lote, dtype=None):
+        """
+        Percorre os padrões em lotes de, no máximo, `tamanho_lote` padrões,
+        desempacotados numa matriz de bits reservada uma única vez.
+
+        Parâmetros:
+            tamanho_lote: Número máximo de padrões em cada lote.
+            dtype: Tipo de dados dos lotes (por omissão, np.uint8).
+
+        Retorna:
+            Gerador de matrizes (padrões do lote, num_bits). Cada lote é reescrito
+            no lote seguinte, pelo que deve ser copiado se for necessário guardá-lo.
+
+        Exceções:
+            AssertionError: Se o tamanho do lote não for positivo.
+        """
+
+        assert tamanho_lote > 0
+        lote = np.empty(
+            (min(tamanho_lote, len(self)), self.__num_bits),
+            dtype=np.uint8 if dtype is None else dtype,
+        )
+        for inicio in range(0, len(self), tamanho_lote):
+            codigos = self.__codigos_lote(inicio, inicio + tamanho_lote)
+            destino = lote[: len(codigos)]
+            destino[...] = desempacotar(codigos, self.__num_bits)
+            yield destino
+
+    def __codigos_lote(self, inicio, fim):
+        codigos = self.__codigos[inicio:fim]
+        if isinstance(codigos, range):
+            return np.arange(
+                codigos.start, codigos.stop, codigos.step, dtype=self.__dtype
+            )
+        return codigos
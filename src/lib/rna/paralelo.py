@@ -0,0 +1,343 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from lib.rna.monitores import HistoricoTreino
+
+
+class _MatrizPartilhada:
+    """
+    Matriz NumPy num bloco de `multiprocessing.shared_memory`, criado pelo processo
+    principal e aberto pelos trabalhadores a partir da sua descrição.
+    """
+
+    def __init__(self, forma, dtype, nome=None):
+        self.forma = tuple(forma)
+        self.dtype = np.dtype(dtype)
+        tamanho = max(1, int(np.prod(self.forma)) * self.dtype.itemsize)
+        self.__memoria = shared_memory.SharedMemory(
+            name=nome, create=nome is None, size=tamanho
+        )
+        self.matriz = np.ndarray(self.forma, self.dtype, buffer=self.__memoria.buf)
+
+    def descricao(self):
+        return self.forma, self.dtype.str, self.__memoria.name
+
+    @staticmethod
+    def abrir(descricao):
+        forma, dtype, nome = descricao
+        return _MatrizPartilhada(forma, dtype, nome)
+
+    def fechar(self, libertar=False):
+        self.matriz = None
+        self.__memoria.close()
+        if libertar:
+            self.__memoria.unlink()
+
+
+def _plano_parametros(camadas):
+    """
+    Obtém a posição dos pesos e pendores de cada camada treinável no vetor único de
+    parâmetros: lista de (camada, início dos pesos, início dos pendores), e o
+    número total de parâmetros.
+    """
+
+    plano = []
+    total = 0
+    for camada in camadas:
+        plano.append((camada, total, total + camada.pesos.size))
+        total += camada.pesos.size + camada.pendores.size
+    return plano, total
+
+
+def _desligar(camadas):
+    """
+    Substitui os pesos e pendores das camadas (vistas da memória partilhada) por
+    cópias, para que a memória partilhada possa ser fechada.
+    """
+
+    for camada in camadas:
+        camada.atualizar_pesos(np.array(camada.pesos))
+        camada.atualizar_pendores(np.array(camada.pendores))
+
+
+class _Replica:
+    """
+    Réplica de uma rede neuronal num processo do treino paralelo: os pesos e
+    pendores das camadas são vistas do vetor de parâmetros em memória partilhada,
+    comum a todas as réplicas.
+
+    Cada passo tem duas fases, separadas por barreiras:
+    - `calcular`: a réplica calcula o gradiente da sua parte do mini-lote e
+      escreve-o, pesado pela fração do mini-lote, na sua linha da matriz de
+      gradientes;
+    - `aplicar`: a réplica soma os gradientes de todas as réplicas apenas na sua
+      parte do vetor de parâmetros (reduce-scatter) e aplica-lhe o otimizador, cujo
+      estado só existe para essa parte. Como as vistas dos pesos são partilhadas,
+      todas as réplicas veem o resultado no passo seguinte (all-gather implícito).
+    """
+
+    def __init__(self, indice, num_processos, rede, memorias, otimizador):
+        self.__indice = indice
+        self.__num_processos = num_processos
+        self.__rede = rede
+        self.__parametros = memorias["parametros"].matriz
+        self.__gradientes = memorias["gradientes"].matriz
+        self.__perdas = memorias["perdas"].matriz
+        self.__entradas = memorias["entradas"].matriz
+        self.__saidas = memorias["saidas"].matriz
+        self.__ordem = memorias["ordem"].matriz
+
+        camadas = [camada for camada in rede.camadas if camada.treinavel]
+        self.__plano, total = _plano_parametros(camadas)
+        for camada, inicio_pesos, inicio_pendores in self.__plano:
+            camada.atualizar_pesos(
+                self.__parametros[inicio_pesos:inicio_pendores].reshape(
+                    camada.pesos.shape
+                )
+            )
+            camada.atualizar_pendores(
+                self.__parametros[
+                    inicio_pendores : inicio_pendores + camada.pendores.size
+                ]
+            )
+
+        limites = np.linspace(0, total, num_processos + 1).astype(np.intp)
+        self.__parte = slice(limites[indice], limites[indice + 1])
+        self.__soma = np.empty(limites[indice + 1] - limites[indice], rede.dtype)
+        self.__otimizador = otimizador
+        self.__otimizador.iniciar([self.__parametros[self.__parte]])
+
+    def calcular(self, inicio, fim):
+        """
+        Calcula o gradiente da parte desta réplica do mini-lote [inicio, fim) da
+        ordem da época.
+        """
+
+        tamanho = fim - inicio
+        a = inicio + tamanho * self.__indice // self.__num_processos
+        b = inicio + tamanho * (self.__indice + 1) // self.__num_processos
+        gradientes = self.__gradientes[self.__indice]
+        if a == b:
+            gradientes[:] = 0
+            self.__perdas[self.__indice] = 0
+            return
+
+        indices = self.__ordem[a:b]
+        perda = self.__rede.retropropagar(
+            self.__entradas[indices], self.__saidas[indices]
+        )
+        self.__perdas[self.__indice] = perda * (b - a)
+
+        # O gradiente de cada réplica é a média da sua parte; pesado pela fração do
+        # mini-lote, a soma das réplicas é o gradiente do mini-lote completo
+        escala = (b - a) / tamanho
+        for camada, inicio_pesos, inicio_pendores in self.__plano:
+            fim_pendores = inicio_pendores + camada.pendores.size
+            np.multiply(
+                camada.gradiente_pesos.ravel(),
+                escala,
+                out=gradientes[inicio_pesos:inicio_pendores],
+            )
+            np.multiply(
+                camada.gradiente_pendores,
+                escala,
+                out=gradientes[inicio_pendores:fim_pendores],
+            )
+
+    def aplicar(self):
+        """
+        Soma os gradientes de todas as réplicas na parte dos parâmetros desta réplica
+        e atualiza essa parte com o otimizador.
+        """
+
+        np.sum(self.__gradientes[:, self.__parte], axis=0, out=self.__soma)
+        self.__otimizador.passo([self.__parametros[self.__parte]], [self.__soma])
+
+
+def _trabalhador(
+    indice, num_processos, rede, descricoes, otimizador, tamanho_lote, barreira
+):
+    """
+    Ciclo de um processo trabalhador: segue as épocas e os passos do processo
+    principal, sincronizado pelas barreiras.
+    """
+
+    memorias = {nome: _MatrizPartilhada.abrir(d) for nome, d in descricoes.items()}
+    controlo = memorias["controlo"].matriz
+    try:
+        replica = _Replica(indice, num_processos, rede, memorias, otimizador)
+        num_amostras = len(memorias["ordem"].matriz)
+        while True:
+            barreira.wait()
+            if controlo[0] == 0:
+                break
+
+            for inicio in range(0, num_amostras, tamanho_lote):
+                replica.calcular(inicio, min(inicio + tamanho_lote, num_amostras))
+                barreira.wait()
+                replica.aplicar()
+                barreira.wait()
+                if controlo[1]:
+                    break
+    except BaseException:
+        barreira.abort()
+        raise
+    finally:
+        _desligar(camada for camada in rede.camadas if camada.treinavel)
+        replica = controlo = None
+        for memoria in memorias.values():
+            memoria.fechar()
+
+
+def treinar_paralelo(
+    rede,
+    entradas,
+    saidas,
+    epocas,
+    otimizador,
+    ordem_aleatoria=False,
+    tamanho_lote=32,
+    monitores=None,
+    num_processos=2,
+):
+    """
+    Treina uma rede neuronal (plataforma "numpy") com paralelismo de dados: cada
+    mini-lote é dividido por `num_processos` processos, que calculam os gradientes
+    das suas partes ao mesmo tempo. Os parâmetros, as entradas e as saídas estão em
+    `multiprocessing.shared_memory`, pelo que todas as réplicas usam os mesmos
+    pesos sem cópias. Em cada passo, os gradientes são somados por uma redução em
+    memória partilhada (cada processo soma e atualiza uma parte dos parâmetros) e
+    aplicados uma única vez.
+
+    O gradiente de cada passo é o do mini-lote completo e a ordem das amostras é a
+    mesma do treino num só processo, pelo que as curvas de erro são iguais, a menos
+    de arredondamentos. O processo principal é também uma das réplicas e chama os
+    monitores.
+
+    Parâmetros:
+        rede: Rede neuronal (plataforma "numpy"), cujos pesos e pendores são
+        atualizados no fim do treino.
+        entradas: Entradas de treino.
+        saidas: Saídas desejadas.
+        epocas: Número de épocas de treino.
+        otimizador: Otimizador (`lib.rna.otimizador`), copiado para cada processo.
+        ordem_aleatoria: Se verdadeiro, as amostras são apresentadas por ordem
+        aleatória (diferente em cada época).
+        tamanho_lote: Número de amostras em cada mini-lote (de todos os processos).
+        monitores: Lista de monitores do treino (opcional).
+        num_processos: Número de processos (incluindo o principal).
+
+    Retorna:
+        Histórico (lista) com os erros de cada época executada.
+
+    Exceções:
+        AssertionError: Se houver menos de dois processos, ou se as camadas
+        treináveis não tiverem todas o tipo de dados da rede.
+    """
+
+    assert num_processos >= 2
+    camadas = [camada for camada in rede.camadas if camada.treinavel]
+    assert all(camada.dtype == rede.dtype for camada in camadas)
+    num_amostras = len(entradas)
+    _, total = _plano_parametros(camadas)
+
+    memorias = {
+        "parametros": _MatrizPartilhada((total,), rede.dtype),
+        "gradientes": _MatrizPartilhada((num_processos, total), rede.dtype),
+        "perdas": _MatrizPartilhada((num_processos,), np.float64),
+        "entradas": _MatrizPartilhada(entradas.shape, rede.dtype),
+        "saidas": _MatrizPartilhada(saidas.shape, rede.dtype),
+        "ordem": _MatrizPartilhada((num_amostras,), np.intp),
+        "controlo": _MatrizPartilhada((2,), np.int64),
+    }
+    memorias["entradas"].matriz[:] = entradas
+    memorias["saidas"].matriz[:] = saidas
+    for camada, inicio_pesos, inicio_pendores in _plano_parametros(camadas)[0]:
+        parametros = memorias["parametros"].matriz
+        parametros[inicio_pesos:inicio_pendores] = camada.pesos.ravel()
+        parametros[inicio_pendores : inicio_pendores + camada.pendores.size] = (
+            camada.pendores
+        )
+    controlo = memorias["controlo"].matriz
+    ordem = memorias["ordem"].matriz
+    perdas = memorias["perdas"].matriz
+
+    contexto = multiprocessing.get_context()
+    barreira = contexto.Barrier(num_processos)
+    descricoes = {nome: memoria.descricao() for nome, memoria in memorias.items()}
+    processos = [
+        contexto.Process(
+            target=_trabalhador,
+            args=(
+                i,
+                num_processos,
+                rede,
+                descricoes,
+                otimizador,
+                tamanho_lote,
+                barreira,
+            ),
+            daemon=True,
+        )
+        for i in range(1, num_processos)
+    ]
+    for processo in processos:
+        processo.start()
+
+    monitores = monitores or []
+    for monitor in monitores:
+        monitor.ao_iniciar()
+
+    erros = HistoricoTreino()
+    try:
+        replica = _Replica(0, num_processos, rede, memorias, otimizador)
+        for epoca in range(epocas):
+            ordem[:] = (
+                np.random.permutation(num_amostras)
+                if ordem_aleatoria
+                else np.arange(num_amostras)
+            )
+            controlo[:] = (1, 0)
+            barreira.wait()
+
+            perda_epoca = 0.0
+            amostras_epoca = 0
+            for lote, inicio in enumerate(range(0, num_amostras, tamanho_lote)):
+                fim = min(inicio + tamanho_lote, num_amostras)
+                replica.calcular(inicio, fim)
+                barreira.wait()
+                replica.aplicar()
+
+                perda_lote = perdas.sum()
+                perda_epoca += perda_lote
+                amostras_epoca += fim - inicio
+                for monitor in monitores:
+                    monitor.ao_terminar_lote(lote, float(perda_lote / (fim - inicio)))
+                controlo[1] = any(monitor.parar for monitor in monitores)
+                barreira.wait()
+                if controlo[1]:
+                    break
+
+            erros.append(float(perda_epoca / amostras_epoca))
+            for monitor in monitores:
+                monitor.ao_terminar_epoca(epoca, erros[-1])
+            if any(monitor.parar for monitor in monitores):
+                erros.epoca_paragem = epoca
+                break
+
+        controlo[0] = 0
+        barreira.wait()
+    except BaseException:
+        barreira.abort()
+        raise
+    finally:
+        for processo in processos:
+            processo.join()
+
+        # Os parâmetros finais são copiados da memória partilhada para as camadas
+        _desligar(camadas)
+        replica = controlo = ordem = perdas = parametros = None
+        for memoria in memorias.values():
+            memoria.fechar(libertar=True)
+
+    return erros
@@ -0,0 +1,154 @@
+import json
+import marshal
+import time
+
+
+class Perfil:
+    """
+    Registo do custo de cada camada de uma rede neuronal: tempo real, número de
+    chamadas, número de amostras, operações de vírgula flutuante (FLOPs) e bytes
+    reservados, estimados pela própria camada, para a propagação ("ativar") e a
+    retropropagação ("retropropagar").
+
+    O perfil é ativado com `RedeNeuronal.perfilar`. Sem perfil, cada chamada de uma
+    camada tem apenas o custo de verificar que o perfil não existe.
+    """
+
+    def __init__(self):
+        # (camada, operação) -> [chamadas, tempo, amostras, flops, bytes]
+        self.__registos = {}
+
+    def medir(self, camada, operacao, num_amostras, custo, funcao, *argumentos):
+        """
+        Executa uma operação de uma camada e regista o seu custo.
+
+        Parâmetros:
+            camada: Nome da camada.
+            operacao: Nome da operação ("ativar" ou "retropropagar").
+            num_amostras: Número de amostras do lote.
+            custo: Tuplo (FLOPs, bytes) estimado para a operação.
+            funcao: Função que executa a operação.
+            argumentos: Argumentos da função.
+
+        Retorna:
+            Resultado da função.
+        """
+
+        inicio = time.perf_counter()
+        resultado = funcao(*argumentos)
+        self.registar(
+            camada, operacao, time.perf_counter() - inicio, num_amostras, *custo
+        )
+        return resultado
+
+    def registar(self, camada, operacao, tempo, num_amostras, flops, num_bytes):
+        """
+        Acumula o custo de uma chamada de uma operação de uma camada.
+
+        Parâmetros:
+            camada: Nome da camada.
+            operacao: Nome da operação.
+            tempo: Tempo real da chamada, em segundos.
+            num_amostras: Número de amostras do lote.
+            flops: Número estimado de operações de vírgula flutuante.
+            num_bytes: Número estimado de bytes reservados.
+        """
+
+        registo = self.__registos.setdefault((camada, operacao), [0, 0.0, 0, 0, 0])
+        registo[0] += 1
+        registo[1] += tempo
+        registo[2] += num_amostras
+        registo[3] += flops
+        registo[4] += num_bytes
+
+    def limpar(self):
+        """
+        Apaga todos os registos.
+        """
+
+        self.__registos.clear()
+
+    def tempo(self, camada):
+        """
+        Obtém o tempo total de todas as operações de uma camada, em segundos.
+        """
+
+        return sum(r[1] for (c, _), r in self.__registos.items() if c == camada)
+
+    def como_dicionario(self):
+        """
+        Exporta os registos, por camada e operação.
+
+        Retorna:
+            Dicionário {camada: {operação: {"chamadas", "tempo", "amostras",
+            "tamanho_lote_medio", "flops", "bytes", "flops_por_segundo"}}},
+            serializável em JSON.
+        """
+
+        resultado = {}
+        for (camada, operacao), registo in self.__registos.items():
+            chamadas, tempo, amostras, flops, num_bytes = registo
+            resultado.setdefault(camada, {})[operacao] = {
+                "chamadas": chamadas,
+                "tempo": tempo,
+                "amostras": amostras,
+                "tamanho_lote_medio": amostras / chamadas,
+                "flops": flops,
+                "bytes": num_bytes,
+                "flops_por_segundo": flops / tempo if tempo > 0 else 0.0,
+            }
+        return resultado
+
+    def guardar_json(self, caminho):
+        """
+        Guarda os registos (ver `como_dicionario`) num ficheiro JSON.
+
+        Parâmetros:
+            caminho: Caminho do ficheiro.
+        """
+
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(self.como_dicionario(), f, indent=2)
+
+    def guardar_pstats(self, caminho):
+        """
+        Guarda os registos no formato do módulo `pstats` (o de `cProfile`), em que
+        cada operação de cada camada é uma "função", para serem analisados com as
+        ferramentas habituais (por exemplo, `pstats.Stats(caminho).print_stats()`
+        ou `snakeviz`).
+
+        Parâmetros:
+            caminho: Caminho do ficheiro.
+        """
+
+        estatisticas = {}
+        for (camada, operacao), registo in self.__registos.items():
+            chamadas, tempo = registo[0], registo[1]
+            estatisticas[(camada, 0, operacao)] = (chamadas, chamadas, tempo, tempo, {})
+        with open(caminho, "wb") as f:
+            marshal.dump(estatisticas, f)
+
+    def __str__(self):
+        cabecalhos = ("Camada", "Operação", "Chamadas", "Lote", "Tempo (ms)", "MFLOP/s")
+        linhas = []
+        for camada, operacoes in self.como_dicionario().items():
+            for operacao, r in operacoes.items():
+                linhas.append(
+                    (
+                        camada,
+                        operacao,
+                        str(r["chamadas"]),
+                        f"{r['tamanho_lote_medio']:.1f}",
+                        f"{r['tempo'] * 1e3:.3f}",
+                        f"{r['flops_por_segundo'] / 1e6:.1f}",
+                    )
+                )
+
+        larguras = [
+            max(len(linha[i]) for linha in [cabecalhos, *linhas])
+            for i in range(len(cabecalhos))
+        ]
+        return "\n".join(
+            " | ".join(f"{c:<{w}}" for c, w in zip(linha, larguras))
+            for linha in [cabecalhos, *linhas]
+        )
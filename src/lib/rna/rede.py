@@ -0,0 +1,218 @@
+import importlib
+import os
+
+# Módulos que implementam cada plataforma (backend) da rede neuronal
+PLATAFORMAS = {
+    "numpy": "lib.rna.rede_neuronal",
+    "keras": "lib.rna.rede_neuronal_keras",
+}
+
+# Variável de ambiente que define a plataforma por omissão (por exemplo,
+# RNA_BACKEND=keras), útil para escolher a plataforma em produção sem alterar código
+VARIAVEL_PLATAFORMA = "RNA_BACKEND"
+PLATAFORMA_POR_OMISSAO = "numpy"
+
+
+def obter_plataforma(backend=None):
+    """
+    Obtém o nome da plataforma a utilizar: a dada, a definida na variável de ambiente
+    RNA_BACKEND, ou "numpy" por omissão.
+
+    Parâmetros:
+        backend: Nome da plataforma ("numpy" ou "keras"), opcional.
+
+    Retorna:
+        Nome da plataforma.
+
+    Exceções:
+        AssertionError: Se a plataforma não existir.
+    """
+
+    if backend is None:
+        backend = os.environ.get(VARIAVEL_PLATAFORMA, PLATAFORMA_POR_OMISSAO)
+    backend = backend.strip().lower()
+    assert backend in PLATAFORMAS
+    return backend
+
+
+class RedeNeuronal:
+    """
+    Ponto de entrada único para uma rede neuronal, independente da plataforma.
+
+    A rede é implementada pela plataforma "numpy" (`lib.rna.rede_neuronal`, sem
+    dependências além do NumPy) ou "keras" (`lib.rna.rede_neuronal_keras`). O módulo
+    da plataforma só é importado quando é criada a primeira rede dessa plataforma,
+    pelo que os programas que usam apenas a plataforma "numpy" nunca carregam o
+    TensorFlow.
+
+    A interface comum é `juntar`, `prever`, `prever_em_lotes`, `treinar`,
+    `treinar_incremental` e `mostrar`. As camadas juntadas são as da plataforma
+    escolhida (as de `lib.rna.camada`, como `CamadaDensa` ou `CamadaConv2D`, ou
+    camadas Keras). Os restantes métodos de cada plataforma (por exemplo,
+    `compilar` ou `guardar` da plataforma "numpy") continuam acessíveis.
+
+    Parâmetros:
+        backend: Nome da plataforma ("numpy" ou "keras"). Por omissão, é lida da
+        variável de ambiente RNA_BACKEND ou, se não estiver definida, é "numpy".
+        parametros: Argumentos do construtor da rede da plataforma (por exemplo,
+        `dtype` para a plataforma "numpy").
+    """
+
+    def __init__(self, backend=None, **parametros):
+        self.__backend = obter_plataforma(backend)
+        modulo = importlib.import_module(PLATAFORMAS[self.__backend])
+        self.__rede = modulo.RedeNeuronal(**parametros)
+
+    @property
+    def backend(self):
+        return self.__backend
+
+    @property
+    def rede(self):
+        """
+        Rede neuronal da plataforma escolhida.
+        """
+        return self.__rede
+
+    def juntar(self, camada):
+        """
+        Junta uma camada à rede neuronal.
+
+        Parâmetros:
+            camada: Camada da plataforma escolhida.
+        """
+
+        self.__rede.juntar(camada)
+
+    def prever(self, entradas):
+        """
+        Realiza a previsão da rede neuronal para as entradas fornecidas.
+
+        Parâmetros:
+            entradas: Entradas da rede neuronal.
+
+        Retorna:
+            Saídas da rede neuronal.
+        """
+
+        return self.__rede.prever(entradas)
+
+    def prever_em_lotes(self, fonte, tamanho_lote, saida=None):
+        """
+        Realiza a previsão da rede neuronal lote a lote.
+        Ver `prever_em_lotes` da rede de cada plataforma.
+        """
+
+        return self.__rede.prever_em_lotes(fonte, tamanho_lote, saida=saida)
+
+    def treinar(
+        self,
+        entradas,
+        saidas,
+        epocas,
+        taxa_aprendizagem,
+        momento=0.0,
+        ordem_aleatoria=False,
+        tamanho_lote=32,
+        monitores=None,
+        continuar=False,
+        otimizador=None,
+        num_processos=1,
+    ):
+        """
+        Treina a rede neuronal por retropropagação, com o erro quadrático médio e,
+        por omissão, descida de gradiente estocástico com momento.
+
+        Parâmetros:
+            entradas: Entradas da rede neuronal.
+            saidas: Saídas desejadas para as entradas fornecidas.
+            epocas: Número de épocas de treino.
+            taxa_aprendizagem: Taxa de aprendizagem.
+            momento: Momento.
+            ordem_aleatoria: Se verdadeiro, as entradas são apresentadas à rede neuronal
+            por ordem aleatória.
+            tamanho_lote: Número de amostras em cada mini-lote.
+            monitores: Lista de monitores do treino (ver `lib.rna.monitores`),
+            comuns às duas plataformas (opcional).
+            continuar: Se verdadeiro, retoma o treino anterior, mantendo o estado do
+            otimizador.
+            otimizador: Otimizador, nome ou especificação (ver
+            `lib.rna.otimizador.criar_otimizador`), comum às duas plataformas
+            (opcional).
+            num_processos: Número de processos do treino com paralelismo de dados
+            (ver `lib.rna.paralelo`), só na plataforma "numpy".
+
+        Retorna:
+            Histórico (lista) com os erros de cada época executada e a época em que o
+            treino foi interrompido (`epoca_paragem`).
+
+        Exceções:
+            AssertionError: Se for pedido mais de um processo na plataforma "keras".
+        """
+
+        parametros = {}
+        if self.__backend == "numpy":
+            parametros["num_processos"] = num_processos
+        else:
+            # A plataforma Keras gere o seu próprio paralelismo
+            assert num_processos == 1
+
+        return self.__rede.treinar(
+            entradas,
+            saidas,
+            epocas,
+            taxa_aprendizagem,
+            momento=momento,
+            ordem_aleatoria=ordem_aleatoria,
+            tamanho_lote=tamanho_lote,
+            monitores=monitores,
+            continuar=continuar,
+            otimizador=otimizador,
+            **parametros,
+        )
+
+    def treinar_incremental(
+        self,
+        fluxo,
+        tamanho_lote,
+        taxa_aprendizagem=0.01,
+        momento=0.0,
+        otimizador=None,
+        capacidade_reservatorio=0,
+        repeticoes=0,
+        monitores=None,
+        continuar=False,
+        intervalo=100,
+    ):
+        """
+        Treina a rede neuronal a partir de um fluxo contínuo de pares (entrada,
+        saída desejada), em mini-lotes de tamanho fixo, com memória constante.
+        Ver `treinar_incremental` da rede de cada plataforma.
+        """
+
+        return self.__rede.treinar_incremental(
+            fluxo,
+            tamanho_lote,
+            taxa_aprendizagem=taxa_aprendizagem,
+            momento=momento,
+            otimizador=otimizador,
+            capacidade_reservatorio=capacidade_reservatorio,
+            repeticoes=repeticoes,
+            monitores=monitores,
+            continuar=continuar,
+            intervalo=intervalo,
+        )
+
+    def mostrar(self):
+        """
+        Mostra a estrutura da rede neuronal.
+        """
+
+        self.__rede.mostrar()
+
+    def __getattr__(self, nome):
+        # Só é chamado para atributos que não existem na fachada; os atributos
+        # privados não são delegados (por exemplo, antes de a rede existir)
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return getattr(self.__rede, nome)
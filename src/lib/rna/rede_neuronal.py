@@ -1,52 +1,803 @@
+import json
+import os
+import numpy as np
+from lib.rna.ativacao import criar_funcao_ativacao
+from lib.rna.camada import MAX_INT8, CamadaDensa, criar_camada
+from lib.rna.compilacao import RedeCompilada
+from lib.rna.conjunto import ConjuntoRedes
+from lib.rna.esparsa import MatrizEsparsa
+from lib.rna.incremental import Reservatorio, treinar_fluxo
+from lib.rna.lotes import escrever_lotes, iterar_lotes
+from lib.rna.monitores import HistoricoTreino
+from lib.rna.otimizador import SGD, criar_otimizador
+from lib.rna.padroes import PadroesEmpacotados
+from lib.rna.paralelo import treinar_paralelo
+from lib.rna.perfil import Perfil
+from lib.rna.tabela import RedeBinaria, TabelaVerdade
+
+# Número de padrões empacotados desempacotados de cada vez na previsão
+TAMANHO_LOTE_EMPACOTADO = 4096
+
+
 class RedeNeuronal:
     """
     Classe para representar uma rede neuronal.
 
     Parâmetros:
         camadas: Lista de camadas da rede neuronal.
+        dtype: Tipo de vírgula flutuante da rede. Se for dado, as camadas juntadas
+        são convertidas para este tipo; caso contrário, cada camada mantém o seu tipo
+        e a rede usa o tipo da primeira camada com pesos. As entradas são convertidas
+        para este tipo na previsão e no treino.
 
     """
 
-    def __init__(self):
+    def __init__(self, dtype=None):
         self.camadas = []
+        self.__dtype = None if dtype is None else np.dtype(dtype)
+        self.__otimizador = None
+        self.__perfil = None
+
+    @property
+    def perfil(self):
+        """
+        Perfil do custo de cada camada, ou None se não estiver ativo.
+        """
+        return self.__perfil
+
+    @property
+    def dtype(self):
+        if self.__dtype is not None:
+            return self.__dtype
+        for camada in self.camadas:
+            if camada.treinavel:
+                return camada.dtype
+        return np.dtype(np.float64)
 
     def juntar(self, camada):
         """
         Junta uma camada à rede neural.
 
+        A forma das entradas da nova camada (por exemplo, (altura, largura, canais)
+        numa `CamadaConv2D`) tem de ser a forma das saídas da última camada. Uma
+        camada espacial pode também seguir uma camada com saídas achatadas (por
+        exemplo, a camada de entrada) com o mesmo número de valores, mas uma camada
+        densa só pode seguir uma camada espacial através de `CamadaAchatar`.
+
         Parâmetros:
             camada: Camada a ser adicionada à rede neural.
 
         Exceções:
-            AssertionError: Se a dimensão de entrada da nova camada não for igual à
-            dimensão de saída da última camada, ou se a dimensão de entrada da primeira
-            camada não for 0.
+            AssertionError: Se a forma das entradas da nova camada não for compatível
+            com a forma das saídas da última camada, ou se a dimensão de entrada da
+            primeira camada não for 0.
         """
 
         if len(self.camadas) == 0:
             assert camada.dim_entrada == 0
-        else:
+        elif camada.forma_entrada != self.camadas[-1].forma_saida:
+            assert len(self.camadas[-1].forma_saida) == 1
             assert camada.dim_entrada == self.camadas[-1].dim_saida
 
+        if self.__dtype is not None:
+            camada.converter_tipo(self.__dtype)
+
         self.camadas.append(camada)
+        self.__otimizador = None
+        if self.__perfil is not None:
+            camada.perfilar(self.__perfil, self.__nome_camada(len(self.camadas) - 1))
+
+    def perfilar(self, ativo=True):
+        """
+        Ativa (ou desativa) o registo do custo de cada camada na propagação e na
+        retropropagação: tempo real, chamadas, tamanho dos lotes, FLOPs e bytes
+        reservados (ver `lib.rna.perfil.Perfil`). A previsão com uma rede compilada
+        (`compilar`) não é registada.
+
+        Parâmetros:
+            ativo: Se verdadeiro, cria um novo perfil; caso contrário, desativa-o.
+
+        Retorna:
+            Perfil criado, ou None.
+        """
+
+        self.__perfil = Perfil() if ativo else None
+        for i, camada in enumerate(self.camadas):
+            camada.perfilar(self.__perfil, self.__nome_camada(i))
+        return self.__perfil
+
+    def __nome_camada(self, indice):
+        return f"{indice}:{type(self.camadas[indice]).__name__}"
+
+    def copiar(self, dtype=None):
+        """
+        Cria uma cópia independente da rede neuronal, opcionalmente com outro tipo
+        de dados em todas as camadas.
+
+        Parâmetros:
+            dtype: Tipo de dados da cópia (por omissão, o de cada camada).
+
+        Retorna:
+            Nova rede neuronal com cópias das camadas.
+        """
+
+        copia = RedeNeuronal(self.__dtype if dtype is None else dtype)
+        for camada in self.camadas:
+            copia.juntar(camada.copiar(dtype))
+        return copia
+
+    def guardar(self, caminho):
+        """
+        Guarda a rede neuronal numa pasta, sem depender da plataforma Keras.
+
+        A pasta contém um ficheiro `modelo.json` com a descrição das camadas
+        (tipo, dimensões, tipo de dados, função de ativação e os seus parâmetros) e um
+        ficheiro .npy por matriz de pesos e de pendores, em formato binário, que pode
+        ser mapeado diretamente em memória ao carregar.
+
+        Parâmetros:
+            caminho: Pasta onde guardar a rede (criada se não existir).
+        """
+
+        os.makedirs(caminho, exist_ok=True)
+
+        camadas = []
+        for i, camada in enumerate(self.camadas):
+            descricao = {"tipo": type(camada).__name__, **camada.configuracao()}
+            if camada.treinavel:
+                for nome in ("pesos", "pendores"):
+                    ficheiro = f"camada_{i}_{nome}.npy"
+                    np.save(
+                        os.path.join(caminho, ficheiro),
+                        np.ascontiguousarray(getattr(camada, nome)),
+                    )
+                    descricao[nome] = ficheiro
+            camadas.append(descricao)
+
+        modelo = {
+            "formato": 1,
+            "dtype": None if self.__dtype is None else self.__dtype.name,
+            "camadas": camadas,
+        }
+        with open(os.path.join(caminho, "modelo.json"), "w", encoding="utf-8") as f:
+            json.dump(modelo, f, indent=2)
+
+    @staticmethod
+    def carregar(caminho, mmap=True):
+        """
+        Carrega uma rede neuronal guardada com `guardar`.
+
+        Com mapeamento em memória, os pesos não são lidos para a memória do processo:
+        são lidos do ficheiro a pedido e partilhados (só de leitura) entre todos os
+        processos que carreguem a mesma rede, pelo que o carregamento é praticamente
+        imediato. O treino continua possível, porque cria novas matrizes de pesos.
+
+        Parâmetros:
+            caminho: Pasta onde a rede foi guardada.
+            mmap: Se verdadeiro, mapeia os pesos em memória, só para leitura.
+
+        Retorna:
+            Rede neuronal carregada.
+
+        Exceções:
+            AssertionError: Se o formato ou o tipo de alguma camada não for suportado.
+        """
+
+        with open(os.path.join(caminho, "modelo.json"), encoding="utf-8") as f:
+            modelo = json.load(f)
+        assert modelo["formato"] == 1
+
+        rede = RedeNeuronal(modelo["dtype"])
+        for descricao in modelo["camadas"]:
+            parametros = {
+                chave: valor
+                for chave, valor in descricao.items()
+                if chave not in ("tipo", "pesos", "pendores")
+            }
+
+            # Só as camadas com função de ativação têm pesos a inicializar
+            if "funcao_ativacao" in parametros:
+                funcao = parametros["funcao_ativacao"]
+                if funcao is not None:
+                    funcao = criar_funcao_ativacao(
+                        funcao["nome"], **funcao["parametros"]
+                    )
+                parametros["funcao_ativacao"] = funcao
+                parametros["inicializar"] = False
+
+            camada = criar_camada(descricao["tipo"], **parametros)
+            if "pesos" in descricao:
+                modo = "r" if mmap else None
+                camada.atualizar_pesos(
+                    np.load(os.path.join(caminho, descricao["pesos"]), mmap_mode=modo)
+                )
+                camada.atualizar_pendores(
+                    np.load(
+                        os.path.join(caminho, descricao["pendores"]), mmap_mode=modo
+                    )
+                )
+            rede.juntar(camada)
+
+        return rede
+
+    def quantizar(self, dados_calibracao, saidas_calibracao=None):
+        """
+        Cria uma cópia da rede neuronal, só para inferência, com os pesos de cada
+        camada quantizados em inteiros de 8 bits (ver `CamadaDensa.quantizar`).
+
+        A escala das entradas de cada camada é calibrada com o maior valor absoluto
+        dessas entradas na propagação dos dados de calibração pela rede original. O
+        relatório compara as previsões das duas redes nesses dados: a classe de cada
+        amostra é a saída com maior valor (ou a saída arredondada, se houver apenas
+        uma).
+
+        Parâmetros:
+            dados_calibracao: Entradas representativas (por exemplo, mutações dos
+            padrões de treino).
+            saidas_calibracao: Saídas desejadas para os dados de calibração, para
+            calcular a exatidão de cada rede (opcional).
+
+        Retorna:
+            Tuplo (rede quantizada, relatório), em que o relatório é um dicionário
+            com a concordância das classes das duas redes, o erro absoluto máximo e
+            médio das saídas, a memória dos parâmetros (bytes) de cada rede e, se
+            forem dadas as saídas, a exatidão de cada rede e a sua diferença.
+
+        Exceções:
+            AssertionError: Se os dados de calibração estiverem vazios.
+        """
+
+        entradas = np.asarray(dados_calibracao, dtype=self.dtype)
+        assert len(entradas) > 0
+
+        quantizada = RedeNeuronal(self.__dtype)
+        for camada in self.camadas:
+            if isinstance(camada, CamadaDensa) and camada.treinavel:
+                maximo = float(np.max(np.abs(entradas)))
+                escala = maximo / MAX_INT8 if maximo > 0 else 1.0
+                quantizada.juntar(camada.quantizar(escala))
+            else:
+                quantizada.juntar(camada.copiar())
+            entradas = camada.ativar(entradas)
+
+        def classes(saidas):
+            if saidas.shape[1] == 1:
+                return np.round(saidas[:, 0])
+            return np.argmax(saidas, axis=1)
+
+        previsoes = self.prever(dados_calibracao)
+        previsoes_quantizadas = quantizada.prever(dados_calibracao)
+        diferenca = np.abs(previsoes - previsoes_quantizadas)
+        relatorio = {
+            "concordancia": float(
+                np.mean(classes(previsoes) == classes(previsoes_quantizadas))
+            ),
+            "erro_maximo": float(np.max(diferenca)),
+            "erro_medio": float(np.mean(diferenca)),
+            "memoria": sum(c.nbytes for c in self.camadas if c.treinavel),
+            "memoria_quantizada": sum(
+                c.nbytes for c in quantizada.camadas if c.treinavel
+            ),
+        }
+        if saidas_calibracao is not None:
+            esperadas = classes(np.asarray(saidas_calibracao))
+            exatidao = float(np.mean(classes(previsoes) == esperadas))
+            exatidao_quantizada = float(
+                np.mean(classes(previsoes_quantizadas) == esperadas)
+            )
+            relatorio["exatidao"] = exatidao
+            relatorio["exatidao_quantizada"] = exatidao_quantizada
+            relatorio["delta_exatidao"] = exatidao_quantizada - exatidao
+        return quantizada, relatorio
+
+    def podar(self, limiar=None, manter=None):
+        """
+        Cria uma cópia da rede neuronal com os pesos de menor valor absoluto de cada
+        camada a zero (ver `CamadaDensa.podar`): os pesos abaixo de um limiar, ou
+        todos exceto os `manter` maiores de cada neurónio. As camadas suficientemente
+        esparsas guardam apenas os pesos não nulos.
+
+        Parâmetros:
+            limiar: Valor absoluto abaixo do qual os pesos são podados.
+            manter: Número de pesos mantidos em cada neurónio.
+
+        Retorna:
+            Tuplo (rede podada, relatório), em que o relatório é um dicionário com o
+            número de parâmetros não nulos, os FLOPs por amostra na propagação
+            (contando apenas os pesos não nulos) e a memória dos parâmetros (bytes)
+            de cada rede, e o número de camadas com pesos esparsos.
+
+        Exceções:
+            AssertionError: Se não for dado exatamente um dos critérios.
+        """
+
+        podada = RedeNeuronal(self.__dtype)
+        for camada in self.camadas:
+            if isinstance(camada, CamadaDensa) and camada.treinavel:
+                podada.juntar(camada.podar(limiar, manter))
+            else:
+                podada.juntar(camada.copiar())
+
+        def contar(rede):
+            # Parâmetros não nulos e FLOPs por amostra (como em `estimar_custo`); os
+            # pesos de uma convolução são aplicados em cada posição das saídas
+            num_parametros = num_flops = 0
+            for camada in rede.camadas:
+                if camada.treinavel:
+                    num_pesos = int(np.count_nonzero(camada.pesos))
+                    num_pendores = camada.pendores.size
+                    posicoes = camada.dim_saida // num_pendores
+                    num_parametros += num_pesos + num_pendores
+                    num_flops += posicoes * (2 * num_pesos + 2 * num_pendores)
+            return num_parametros, num_flops
+
+        treinaveis = [c for c in podada.camadas if c.treinavel]
+        parametros, flops = contar(self)
+        parametros_podados, flops_podados = contar(podada)
+        return podada, {
+            "parametros": parametros,
+            "parametros_podados": parametros_podados,
+            "flops": flops,
+            "flops_podados": flops_podados,
+            "memoria": sum(c.nbytes for c in self.camadas if c.treinavel),
+            "memoria_podada": sum(c.nbytes for c in treinaveis),
+            "camadas_esparsas": sum(
+                getattr(c, "pesos_esparsos", None) is not None for c in treinaveis
+            ),
+        }
 
     def prever(self, entradas):
         """
         Realiza a previsão da rede neuronal para as entradas fornecidas.
 
+        Os padrões binários empacotados (`PadroesEmpacotados`) são desempacotados
+        lote a lote, imediatamente antes da primeira camada, pelo que nunca existe
+        em memória a matriz de bits completa.
+
         Parâmetros:
-            entradas: Entradas da rede neuronal.
+            entradas: Entradas da rede neuronal (matriz, matriz esparsa ou padrões
+            empacotados).
 
         Retorna:
             Saídas da rede neuronal depois de ativadas todas as camadas (feedforward).
 
         """
 
+        if isinstance(entradas, PadroesEmpacotados):
+            saidas = np.empty(
+                (len(entradas), *self.camadas[-1].forma_saida), self.dtype
+            )
+            inicio = 0
+            for lote in entradas.lotes(TAMANHO_LOTE_EMPACOTADO, self.dtype):
+                saidas[inicio : inicio + len(lote)] = self.prever(lote)
+                inicio += len(lote)
+            return saidas
+
+        if not isinstance(entradas, MatrizEsparsa):
+            entradas = np.asarray(entradas, dtype=self.dtype)
         for camada in self.camadas:
             entradas = camada.ativar(entradas)
 
         return entradas
 
+    def prever_em_lotes(self, fonte, tamanho_lote, saida=None):
+        """
+        Realiza a previsão da rede neuronal lote a lote, para fontes de dados que não
+        cabem (ou não devem estar) completamente em memória. A previsão usa a rede
+        compilada para o tamanho do lote, pelo que a memória necessária depende
+        apenas do tamanho do lote e não do tamanho da fonte.
+
+        Parâmetros:
+            fonte: Matriz, np.memmap, padrões empacotados ou iterável de linhas de
+            entrada.
+            tamanho_lote: Número de amostras em cada lote.
+            saida: Matriz (por exemplo, um np.memmap) onde escrever as saídas
+            (opcional).
+
+        Retorna:
+            Gerador das saídas de cada lote (partes da saída, se for dada).
+        """
+
+        plano = self.compilar(tamanho_lote)
+        lotes = iterar_lotes(fonte, tamanho_lote, dtype=self.dtype)
+        yield from escrever_lotes(map(plano.prever, lotes), saida)
+
+    def compilar(self, tamanho_lote):
+        """
+        Compila a rede neuronal num plano de inferência para um tamanho de lote fixo,
+        com matrizes reservadas para cada camada, de forma a que previsões repetidas
+        não aloquem memória. Ver `RedeCompilada`.
+
+        Parâmetros:
+            tamanho_lote: Número máximo de amostras em cada previsão.
+
+        Retorna:
+            Rede compilada, com o método `prever`.
+
+        Exceções:
+            AssertionError: Se a rede não tiver camadas, ou se tiver camadas que não
+            sejam densas.
+        """
+
+        assert len(self.camadas) > 0
+        self.__validar_densa()
+        return RedeCompilada(
+            self.camadas, tamanho_lote, self.camadas[0].dim_saida, self.dtype
+        )
+
+    def compilar_tabela(self, tamanho_bloco=65536):
+        """
+        Compila a rede neuronal, para entradas binárias, numa tabela de verdade com
+        as saídas para todas as 2^n entradas possíveis (até 24 bits), calculada por
+        blocos. Cada previsão seguinte é apenas uma leitura da tabela. Ver
+        `TabelaVerdade`.
+
+        Parâmetros:
+            tamanho_bloco: Número de entradas calculadas de cada vez.
+
+        Retorna:
+            Tabela de verdade, com os métodos `prever` e `prever_codigos`.
+        """
+
+        return TabelaVerdade(self, tamanho_bloco)
+
+    def compilar_binaria(self):
+        """
+        Compila uma rede com a função degrau (saídas 0 ou 1) em todas as camadas
+        numa avaliação inteira, bit-a-bit, com até 64 bits de entrada e sem a tabela
+        das 2^n entradas. Ver `RedeBinaria`.
+
+        Retorna:
+            Rede binária, com os métodos `prever` e `prever_codigos`.
+
+        Exceções:
+            AssertionError: Se a rede tiver camadas que não sejam densas, ou mais de
+            64 entradas.
+        """
+
+        self.__validar_densa()
+        return RedeBinaria(self)
+
+    def __validar_densa(self):
+        # Os planos compilados e as réplicas combinam matrizes de pesos de camadas
+        # densas (as camadas espaciais só são suportadas por `prever` e `treinar`)
+        assert all(isinstance(camada, CamadaDensa) for camada in self.camadas)
+
+    def comparar_precisao(self, entradas, saidas=None, dtype=np.float32):
+        """
+        Compara as previsões da rede num tipo de menor precisão com as previsões em
+        np.float64, para avaliar se a perda de precisão é aceitável.
+
+        A exatidão é a fração de previsões corretas: para uma saída, o valor
+        arredondado; para várias saídas, o índice do maior valor.
+
+        Parâmetros:
+            entradas: Entradas de avaliação.
+            saidas: Saídas desejadas (opcional), para comparar a exatidão.
+            dtype: Tipo de dados a avaliar.
+
+        Retorna:
+            Dicionário com o erro absoluto máximo e médio entre previsões, a fração
+            de classificações iguais e, se forem dadas as saídas, a exatidão em cada
+            tipo e a sua diferença.
+        """
+
+        referencia = self.copiar(np.float64).prever(entradas)
+        previsao = self.copiar(dtype).prever(entradas).astype(np.float64)
+        erro = np.abs(previsao - referencia)
+
+        resultado = {
+            "dtype": np.dtype(dtype).name,
+            "erro_maximo": float(np.max(erro)),
+            "erro_medio": float(np.mean(erro)),
+            "concordancia": float(
+                np.mean(self.__classes(previsao) == self.__classes(referencia))
+            ),
+        }
+
+        if saidas is not None:
+            classes = self.__classes(np.asarray(saidas))
+            exatidao_referencia = float(np.mean(self.__classes(referencia) == classes))
+            exatidao = float(np.mean(self.__classes(previsao) == classes))
+            resultado["exatidao_float64"] = exatidao_referencia
+            resultado["exatidao"] = exatidao
+            resultado["diferenca_exatidao"] = exatidao - exatidao_referencia
+
+        return resultado
+
+    @staticmethod
+    def __classes(valores):
+        if valores.shape[-1] == 1:
+            return np.round(valores[..., 0])
+        return np.argmax(valores, axis=-1)
+
+    def replicar(self, num_replicas, inicializar=True):
+        """
+        Cria um conjunto de réplicas independentes da rede neuronal, com a mesma
+        arquitetura, que são treinadas em simultâneo. Ver `ConjuntoRedes`.
+
+        Parâmetros:
+            num_replicas: Número de réplicas.
+            inicializar: Se verdadeiro, cada réplica tem pesos aleatórios próprios;
+            caso contrário, todas começam com os pesos desta rede.
+
+        Retorna:
+            Conjunto de réplicas da rede.
+
+        Exceções:
+            AssertionError: Se a rede tiver camadas que não sejam densas.
+        """
+
+        self.__validar_densa()
+        return ConjuntoRedes(self, num_replicas, inicializar=inicializar)
+
+    def treinar(
+        self,
+        entradas,
+        saidas,
+        epocas,
+        taxa_aprendizagem,
+        momento=0.0,
+        ordem_aleatoria=False,
+        tamanho_lote=32,
+        monitores=None,
+        continuar=False,
+        otimizador=None,
+        num_processos=1,
+    ):
+        """
+        Treina a rede neuronal utilizando o algoritmo de retropropagação, com a mesma
+        interface da rede neuronal Keras, mas sem depender da plataforma.
+
+        A função de perda utilizada é o erro quadrático médio, em mini-lotes. Cada
+        mini-lote é propagado pela rede de forma vetorizada, e os gradientes são
+        calculados camada a camada, da saída para a entrada. Por omissão, o
+        otimizador é a descida de gradiente estocástico (SGD) com termo de momento,
+        em que a velocidade de cada parâmetro acumula os gradientes anteriores:
+
+            v = momento * v - taxa_aprendizagem * gradiente
+            w = w + v
+
+        Outro otimizador (por exemplo, "adam" ou "rmsprop") pode ser dado com a
+        mesma especificação da rede Keras (ver `lib.rna.otimizador`). O estado do
+        otimizador é reservado uma única vez por treino, e os pesos e pendores de
+        cada camada são atualizados no próprio lugar em cada mini-lote.
+
+        Os pesos e pendores aprendidos são os das próprias camadas, pelo que o
+        treino continua a partir dos valores atuais. Com `continuar`, o estado do
+        otimizador do treino anterior (por exemplo, as velocidades) também é
+        mantido, pelo que treinar N épocas e depois mais M é equivalente a treinar
+        N + M épocas de uma só vez.
+
+        Os monitores (ver `lib.rna.monitores`) são chamados no fim de cada mini-lote
+        e de cada época, e podem interromper o treino antes de terminarem as épocas
+        (por exemplo, quando o erro converge).
+
+        Com mais de um processo, cada mini-lote é dividido pelos processos, com os
+        parâmetros em memória partilhada e os gradientes somados antes de cada
+        atualização (ver `lib.rna.paralelo`), com os mesmos resultados, a menos de
+        arredondamentos. O estado do otimizador não é mantido para `continuar`.
+
+        Parâmetros:
+            entradas: Entradas da rede neuronal.
+            saidas: Saídas desejadas para as entradas fornecidas.
+            epocas: Número de épocas de treino.
+            taxa_aprendizagem: Taxa de aprendizagem.
+            momento: Momento.
+            ordem_aleatoria: Se verdadeiro, as entradas são apresentadas à rede neuronal
+            por ordem aleatória (diferente em cada época).
+            tamanho_lote: Número de amostras em cada mini-lote.
+            monitores: Lista de monitores do treino (opcional).
+            continuar: Se verdadeiro, retoma o treino anterior, mantendo o estado do
+            otimizador.
+            otimizador: Otimizador, nome ou especificação (ver `criar_otimizador`),
+            que usa a taxa de aprendizagem e o momento dados se não os indicar. Por
+            omissão, SGD com momento.
+            num_processos: Número de processos do treino com paralelismo de dados.
+
+        Retorna:
+            Histórico (lista) com os erros de cada época executada e a época em que o
+            treino foi interrompido (`epoca_paragem`).
+
+        Exceções:
+            AssertionError: Se o número de entradas e de saídas for diferente, ou se
+            for pedido `continuar` com mais de um processo.
+        """
+
+        entradas = np.asarray(entradas, dtype=self.dtype)
+        saidas = np.asarray(saidas, dtype=self.dtype)
+        assert len(entradas) == len(saidas)
+
+        if num_processos > 1:
+            assert not continuar
+            self.__otimizador = None
+            return treinar_paralelo(
+                self,
+                entradas,
+                saidas,
+                epocas,
+                criar_otimizador(
+                    (
+                        SGD(taxa_aprendizagem, momento)
+                        if otimizador is None
+                        else otimizador
+                    ),
+                    taxa_aprendizagem,
+                    momento,
+                ),
+                ordem_aleatoria=ordem_aleatoria,
+                tamanho_lote=tamanho_lote,
+                monitores=monitores,
+                num_processos=num_processos,
+            )
+
+        num_amostras = len(entradas)
+        passo = self.__preparar_treino(
+            taxa_aprendizagem, momento, otimizador, continuar
+        )
+
+        monitores = monitores or []
+        for monitor in monitores:
+            monitor.ao_iniciar()
+
+        erros = HistoricoTreino()
+        for epoca in range(epocas):
+            x, y = entradas, saidas
+            if ordem_aleatoria:
+                permutacao = np.random.permutation(num_amostras)
+                x, y = entradas[permutacao], saidas[permutacao]
+
+            perda_epoca = 0.0
+            amostras_epoca = 0
+            for lote, inicio in enumerate(range(0, num_amostras, tamanho_lote)):
+                fim = inicio + tamanho_lote
+                perda = passo(x[inicio:fim], y[inicio:fim])
+                perda_epoca += perda * len(x[inicio:fim])
+                amostras_epoca += len(x[inicio:fim])
+
+                for monitor in monitores:
+                    monitor.ao_terminar_lote(lote, float(perda))
+                if any(monitor.parar for monitor in monitores):
+                    break
+
+            erros.append(float(perda_epoca / amostras_epoca))
+            for monitor in monitores:
+                monitor.ao_terminar_epoca(epoca, erros[-1])
+            if any(monitor.parar for monitor in monitores):
+                erros.epoca_paragem = epoca
+                break
+
+        return erros
+
+    def treinar_incremental(
+        self,
+        fluxo,
+        tamanho_lote,
+        taxa_aprendizagem=0.01,
+        momento=0.0,
+        otimizador=None,
+        capacidade_reservatorio=0,
+        repeticoes=0,
+        monitores=None,
+        continuar=False,
+        intervalo=100,
+    ):
+        """
+        Treina a rede neuronal a partir de um fluxo contínuo de amostras (por
+        exemplo, amostras etiquetadas que chegam em produção), com memória
+        constante, qualquer que seja o comprimento do fluxo (ver
+        `lib.rna.incremental.treinar_fluxo`).
+
+        As amostras são acumuladas em mini-lotes de tamanho fixo, numa matriz
+        reutilizada, e cada mini-lote é um passo do otimizador, como em `treinar`.
+        Opcionalmente, um reservatório guarda uma amostra uniforme das amostras
+        antigas, e cada mini-lote é completado com `repeticoes` amostras sorteadas
+        do reservatório.
+
+        Parâmetros:
+            fluxo: Iterável (por exemplo, um gerador) de pares (entrada, saída
+            desejada) de uma amostra.
+            tamanho_lote: Número de amostras novas em cada mini-lote.
+            taxa_aprendizagem: Taxa de aprendizagem.
+            momento: Momento.
+            otimizador: Otimizador, nome ou especificação (ver `treinar`).
+            capacidade_reservatorio: Número de amostras do reservatório de
+            repetição (0 para não usar o reservatório).
+            repeticoes: Número de amostras do reservatório em cada mini-lote.
+            monitores: Lista de monitores do treino, que recebem o erro corrente
+            (opcional).
+            continuar: Se verdadeiro, mantém o estado do otimizador do treino
+            anterior (por exemplo, para treinar fluxo a fluxo).
+            intervalo: Número de mini-lotes entre chamadas de `ao_terminar_epoca`
+            dos monitores.
+
+        Retorna:
+            Dicionário com o número de amostras e de mini-lotes, o erro corrente
+            (média móvel exponencial dos erros dos mini-lotes) e o erro médio.
+
+        Exceções:
+            AssertionError: Se forem pedidas repetições sem reservatório.
+        """
+
+        reservatorio = (
+            Reservatorio(capacidade_reservatorio)
+            if capacidade_reservatorio > 0
+            else None
+        )
+        return treinar_fluxo(
+            fluxo,
+            tamanho_lote,
+            self.__preparar_treino(taxa_aprendizagem, momento, otimizador, continuar),
+            self.dtype,
+            reservatorio=reservatorio,
+            repeticoes=repeticoes,
+            monitores=monitores,
+            intervalo=intervalo,
+        )
+
+    def __preparar_treino(self, taxa_aprendizagem, momento, otimizador, continuar):
+        """
+        Prepara os parâmetros e o otimizador de um treino.
+
+        Retorna:
+            Função (entradas, saidas) -> erro, que executa um passo de treino com um
+            mini-lote.
+        """
+
+        camadas = [camada for camada in self.camadas if camada.treinavel]
+
+        # Cópia própria dos parâmetros (que podem ser partilhados ou só de leitura,
+        # por exemplo, mapeados em memória), atualizada no próprio lugar
+        parametros = []
+        gradientes = []
+        for camada in camadas:
+            camada.atualizar_pesos(np.array(camada.pesos))
+            camada.atualizar_pendores(np.array(camada.pendores))
+            parametros += [camada.pesos, camada.pendores]
+
+        if not continuar or self.__otimizador is None:
+            if otimizador is None:
+                otimizador = SGD(taxa_aprendizagem, momento)
+            self.__otimizador = criar_otimizador(otimizador, taxa_aprendizagem, momento)
+            self.__otimizador.iniciar(parametros)
+        otimizador = self.__otimizador
+
+        def passo(entradas, saidas):
+            perda = self.retropropagar(entradas, saidas)
+            gradientes.clear()
+            for camada in camadas:
+                gradientes.extend((camada.gradiente_pesos, camada.gradiente_pendores))
+            otimizador.passo(parametros, gradientes)
+            return perda
+
+        return passo
+
+    def retropropagar(self, entradas, saidas):
+        """
+        Propaga um mini-lote pela rede e retropropaga o gradiente do erro quadrático
+        médio, deixando os gradientes calculados em cada camada.
+
+        Parâmetros:
+            entradas: Entradas do mini-lote.
+            saidas: Saídas desejadas do mini-lote.
+
+        Retorna:
+            Erro quadrático médio do mini-lote, antes da atualização dos parâmetros.
+        """
+
+        for camada in self.camadas:
+            entradas = camada.ativar(entradas, treino=True)
+
+        erro = entradas - saidas
+        gradiente = erro * (2 / erro.size)
+
+        # As camadas antes da primeira camada treinável não precisam do gradiente
+        primeira = min(i for i, camada in enumerate(self.camadas) if camada.treinavel)
+        for i in range(len(self.camadas) - 1, primeira - 1, -1):
+            gradiente = self.camadas[i].retropropagar(gradiente, propagar=i > primeira)
+
+        return np.mean(erro**2)
+
     def atualizar_parametros(self, parametros):
         """
         Atualiza os pesos e pendores de todas as camadas da rede neuronal exceto a
@@ -61,6 +812,69 @@ class RedeNeuronal:
             self.camadas[i + 1].atualizar_pesos(pesos)
             self.camadas[i + 1].atualizar_pendores(pendores)
 
+    def mostrar(self, custos=False):
+        """
+        Mostra a estrutura da rede neuronal,
+        no formato de tabela (camada, dimensão, parâmetros), como na rede Keras.
+
+        Parâmetros:
+            custos: Se verdadeiro, mostra também a memória dos parâmetros, os FLOPs
+            por amostra na propagação e, se o perfil estiver ativo, o tempo total de
+            cada camada.
+        """
+
+        print(self.__tabela(custos))
+
+    def __str__(self):
+        return self.__tabela(custos=True)
+
+    def __tabela(self, custos):
+        cabecalhos = ["Camada", "Dimensão", "Ativação", "Parâmetros"]
+        if custos:
+            cabecalhos += ["Memória (B)", "FLOPs/amostra"]
+            if self.__perfil is not None:
+                cabecalhos.append("Tempo (ms)")
+
+        linhas = []
+        total = 0
+        memoria = 0
+        for i, camada in enumerate(self.camadas):
+            funcao = camada.funcao_ativacao
+            parametros = camada.num_parametros
+            num_bytes = camada.nbytes if camada.treinavel else 0
+            total += parametros
+            memoria += num_bytes
+            linha = [
+                type(camada).__name__,
+                f"(None, {', '.join(map(str, camada.forma_saida))})",
+                "-" if funcao is None else type(funcao).__name__,
+                str(parametros),
+            ]
+            if custos:
+                linha += [
+                    str(num_bytes),
+                    str(camada.estimar_custo(1)[0]),
+                ]
+                if self.__perfil is not None:
+                    tempo = self.__perfil.tempo(self.__nome_camada(i))
+                    linha.append(f"{tempo * 1e3:.3f}")
+            linhas.append(linha)
+
+        larguras = [
+            max(len(linha[i]) for linha in [cabecalhos, *linhas])
+            for i in range(len(cabecalhos))
+        ]
+        separador = "-" * (sum(larguras) + 3 * (len(larguras) - 1))
+        texto = [" | ".join(f"{c:<{w}}" for c, w in zip(cabecalhos, larguras))]
+        texto.append(separador)
+        for linha in linhas:
+            texto.append(" | ".join(f"{c:<{w}}" for c, w in zip(linha, larguras)))
+        texto.append(separador)
+        texto.append(f"Total de parâmetros: {total} ({self.dtype})")
+        if custos:
+            texto.append(f"Memória dos parâmetros: {memoria} bytes")
+        return "\n".join(texto)
+
     def imprimir_previsao(self, entradas):
         """
         Realiza a previsão para as entradas fornecidas e imprime os resultados
@@ -1,14 +1,23 @@
-from keras.models import Sequential
-from keras.optimizers import SGD
+import numpy as np
+from lib.rna.incremental import Reservatorio, treinar_fluxo
+from lib.rna.lotes import escrever_lotes, iterar_lotes
+from lib.rna.monitores import HistoricoTreino, Monitor, callback_keras
+from lib.rna.otimizador import SGD, criar_otimizador
 
 
 class RedeNeuronal:
     """
     Encapsulamento da interface Keras para uma rede neuronal.
+
+    A plataforma Keras (e o TensorFlow) só é importada quando é criada a primeira
+    rede, pelo que importar este módulo não tem esse custo.
     """
 
     def __init__(self):
+        from keras.models import Sequential
+
         self.__modelo = Sequential()
+        self.__epocas_treinadas = None
 
     def juntar(self, camada):
         """
@@ -20,6 +29,7 @@ class RedeNeuronal:
         """
 
         self.__modelo.add(camada)
+        self.__epocas_treinadas = None
 
     def prever(self, entradas):
         """
@@ -35,6 +45,41 @@ class RedeNeuronal:
 
         return self.__modelo.predict(entradas)
 
+    def prever_lote(self, entradas):
+        """
+        Executa a rede neuronal para um lote de entradas diretamente pelo modelo
+        (`predict_on_batch`), sem o custo fixo da preparação de dados de `predict`,
+        para previsões frequentes de lotes pequenos (ver `lib.rna.servico`).
+
+        Parâmetros:
+            entradas: Lote de entradas da rede neuronal.
+
+        Retorna:
+            Saídas da rede neuronal.
+        """
+
+        return np.asarray(self.__modelo.predict_on_batch(entradas))
+
+    def prever_em_lotes(self, fonte, tamanho_lote, saida=None):
+        """
+        Executa a rede neuronal lote a lote, para fontes de dados que não cabem (ou
+        não devem estar) completamente em memória. Cada lote é executado diretamente
+        pelo modelo, sem a preparação de dados de `predict`.
+
+        Parâmetros:
+            fonte: Matriz, np.memmap ou iterável de linhas de entrada.
+            tamanho_lote: Número de amostras em cada lote.
+            saida: Matriz (por exemplo, um np.memmap) onde escrever as saídas
+            (opcional).
+
+        Retorna:
+            Gerador das saídas de cada lote (partes da saída, se for dada).
+        """
+
+        lotes = iterar_lotes(fonte, tamanho_lote, dtype="float32")
+        previsoes = (np.asarray(self.__modelo.predict_on_batch(lote)) for lote in lotes)
+        yield from escrever_lotes(previsoes, saida)
+
     def treinar(
         self,
         entradas,
@@ -43,6 +88,10 @@ class RedeNeuronal:
         taxa_aprendizagem,
         momento=0.0,
         ordem_aleatoria=False,
+        tamanho_lote=32,
+        monitores=None,
+        continuar=False,
+        otimizador=None,
     ):
         """
         Treina a rede neuronal utilizando o algoritmo de retropropagação.
@@ -51,7 +100,7 @@ class RedeNeuronal:
         médio é utilizado para medir a diferença entre as saídas desejadas e as saídas
         da rede neuronal.
 
-        O otimizador utilizado é a descida de gradiente estocástico (SGD).
+        Por omissão, o otimizador utilizado é a descida de gradiente estocástico (SGD).
         A descida de gradiente estocástico é uma estratégia de otimização iterativa
         à procura de um mínimo local da função de perda. A cada iteração, o algoritmo
         atualiza os parâmetros da rede neuronal de acordo com a direção do gradiente.
@@ -61,6 +110,9 @@ class RedeNeuronal:
         fique preso em mínimos locais, inicializando cada iteração a partir de um ponto
         diferente.
 
+        Outro otimizador pode ser dado com a mesma especificação da rede nativa (ver
+        `lib.rna.otimizador`), que é convertida no otimizador Keras equivalente.
+
         Parâmetros:
             entradas: Entradas da rede neuronal.
             saidas: Saídas desejadas para as entradas fornecidas.
@@ -69,20 +121,118 @@ class RedeNeuronal:
             momento: Momento.
             ordem_aleatoria: Se verdadeiro, as entradas são apresentadas à rede neuronal
             por ordem aleatória.
+            tamanho_lote: Número de amostras em cada mini-lote.
+            monitores: Lista de monitores do treino (ver `lib.rna.monitores`), que são
+            envolvidos num callback Keras, ou de callbacks Keras (opcional).
+            continuar: Se verdadeiro, retoma o treino anterior sem recompilar o
+            modelo, mantendo o estado do otimizador (os hiperparâmetros do otimizador
+            são os do primeiro treino).
+            otimizador: Otimizador, nome ou especificação (ver `criar_otimizador`),
+            que usa a taxa de aprendizagem e o momento dados se não os indicar. Por
+            omissão, SGD com momento.
 
         Retorna:
-            Lista com os erros de cada época.
+            Histórico (lista) com os erros de cada época executada e a época em que o
+            treino foi interrompido (`epoca_paragem`).
 
         """
 
-        self.__modelo.compile(
-            loss="mean_squared_error",
-            optimizer=SGD(learning_rate=taxa_aprendizagem, momentum=momento),
+        self.__compilar(taxa_aprendizagem, momento, otimizador, continuar)
+        epoca_inicial = self.__epocas_treinadas
+
+        monitores = monitores or []
+        callbacks = [m for m in monitores if not isinstance(m, Monitor)]
+        callback = callback_keras([m for m in monitores if isinstance(m, Monitor)])
+
+        erros = self.__modelo.fit(
+            entradas,
+            saidas,
+            epochs=epoca_inicial + epocas,
+            initial_epoch=epoca_inicial,
+            batch_size=tamanho_lote,
+            verbose=0,
+            shuffle=ordem_aleatoria,
+            callbacks=[callback, *callbacks],
+        ).history["loss"]
+        self.__epocas_treinadas += len(erros)
+
+        epoca_paragem = callback.epoca_paragem
+        if epoca_paragem is None and len(erros) < epocas:
+            epoca_paragem = epoca_inicial + len(erros) - 1
+        if epoca_paragem is not None:
+            epoca_paragem -= epoca_inicial
+        return HistoricoTreino(erros, epoca_paragem)
+
+    def treinar_incremental(
+        self,
+        fluxo,
+        tamanho_lote,
+        taxa_aprendizagem=0.01,
+        momento=0.0,
+        otimizador=None,
+        capacidade_reservatorio=0,
+        repeticoes=0,
+        monitores=None,
+        continuar=False,
+        intervalo=100,
+    ):
+        """
+        Treina a rede neuronal a partir de um fluxo contínuo de amostras, com
+        memória constante, com a mesma interface da rede nativa (ver
+        `lib.rna.incremental.treinar_fluxo`). Cada mini-lote é um passo do modelo
+        com `train_on_batch`, sem a preparação de dados de `fit`.
+
+        Parâmetros:
+            fluxo: Iterável de pares (entrada, saída desejada) de uma amostra.
+            tamanho_lote: Número de amostras novas em cada mini-lote.
+            taxa_aprendizagem: Taxa de aprendizagem.
+            momento: Momento.
+            otimizador: Otimizador, nome ou especificação (ver `treinar`).
+            capacidade_reservatorio: Número de amostras do reservatório de
+            repetição (0 para não usar o reservatório).
+            repeticoes: Número de amostras do reservatório em cada mini-lote.
+            monitores: Lista de monitores do treino (ver `lib.rna.monitores`), que
+            recebem o erro corrente (opcional).
+            continuar: Se verdadeiro, retoma o treino anterior sem recompilar o
+            modelo, mantendo o estado do otimizador.
+            intervalo: Número de mini-lotes entre chamadas de `ao_terminar_epoca`
+            dos monitores.
+
+        Retorna:
+            Dicionário com o número de amostras e de mini-lotes, o erro corrente
+            (média móvel exponencial dos erros dos mini-lotes) e o erro médio.
+        """
+
+        self.__compilar(taxa_aprendizagem, momento, otimizador, continuar)
+        reservatorio = (
+            Reservatorio(capacidade_reservatorio)
+            if capacidade_reservatorio > 0
+            else None
+        )
+        return treinar_fluxo(
+            fluxo,
+            tamanho_lote,
+            self.__modelo.train_on_batch,
+            np.float32,
+            reservatorio=reservatorio,
+            repeticoes=repeticoes,
+            monitores=monitores,
+            intervalo=intervalo,
         )
 
-        return self.__modelo.fit(
-            entradas, saidas, epochs=epocas, verbose=0, shuffle=ordem_aleatoria
-        ).history["loss"]
+    def __compilar(self, taxa_aprendizagem, momento, otimizador, continuar):
+        """
+        Compila o modelo com o otimizador dado, exceto se for pedido para continuar
+        um treino anterior.
+        """
+
+        if continuar and self.__epocas_treinadas is not None:
+            return
+        if otimizador is None:
+            otimizador = SGD(taxa_aprendizagem, momento)
+        otimizador = criar_otimizador(otimizador, taxa_aprendizagem, momento)
+        self.__modelo.compile(loss="mean_squared_error", optimizer=otimizador.keras())
+        self.__epocas_treinadas = 0
 
     def mostrar(self):
         """
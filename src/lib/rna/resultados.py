@@ -0,0 +1,180 @@
+import json
+import os
+import numpy as np
+
+
+class RepositorioResultados:
+    """
+    Repositório em disco dos resultados de um varrimento de hiperparâmetros,
+    resistente a interrupções.
+
+    As curvas de perda são guardadas num ficheiro mapeado em memória (np.memmap) com
+    a forma (*valores de cada hiperparâmetro, repetição, época), escrito diretamente
+    pelos processos de treino, pelo que as curvas nunca precisam de estar todas em
+    memória. O estado do varrimento (as células concluídas e os agregados) é guardado
+    num ficheiro separado, substituído de forma atómica depois de cada célula, pelo
+    que uma interrupção perde, no máximo, as células em curso. Ao reabrir o
+    repositório, apenas as células pendentes são treinadas.
+
+    Para cada hiperparâmetro, são mantidas a média e o desvio padrão, em cada época,
+    das curvas de todas as células com cada valor desse hiperparâmetro, atualizadas
+    incrementalmente com o algoritmo de Welford. Os gráficos do efeito de cada
+    hiperparâmetro usam apenas estes resumos.
+
+    Parâmetros:
+        caminho: Pasta do repositório (criada se não existir).
+        grelha: Lista com a lista de valores de cada hiperparâmetro.
+        num_repeticoes: Número de repetições de cada combinação.
+        num_epocas: Número de épocas de treino.
+
+    Exceções:
+        AssertionError: Se a pasta já tiver um repositório com outra grelha.
+    """
+
+    def __init__(self, caminho, grelha, num_repeticoes, num_epocas):
+        self.__caminho = caminho
+        self.__grelha = [list(valores) for valores in grelha]
+        self.__forma = (*map(len, self.__grelha), num_repeticoes, num_epocas)
+        os.makedirs(caminho, exist_ok=True)
+
+        metadados = {"grelha": self.__grelha, "forma": self.__forma}
+        caminho_metadados = os.path.join(caminho, "metadados.json")
+        existe = os.path.exists(caminho_metadados)
+        if existe:
+            with open(caminho_metadados, encoding="utf-8") as f:
+                anteriores = json.load(f)
+            assert anteriores == json.loads(json.dumps(metadados))
+        else:
+            with open(caminho_metadados, "w", encoding="utf-8") as f:
+                json.dump(metadados, f)
+
+        self.__curvas = np.memmap(
+            self.caminho_curvas,
+            dtype=np.float64,
+            mode="r+" if existe else "w+",
+            shape=self.__forma,
+        )
+
+        caminho_estado = os.path.join(caminho, "estado.npz")
+        if os.path.exists(caminho_estado):
+            with np.load(caminho_estado) as estado:
+                self.__concluidas = estado["concluidas"]
+                self.__contagens = [estado[f"n_{e}"] for e in range(len(grelha))]
+                self.__medias = [estado[f"media_{e}"] for e in range(len(grelha))]
+                self.__m2 = [estado[f"m2_{e}"] for e in range(len(grelha))]
+        else:
+            self.__concluidas = np.zeros(self.__forma[:-1], dtype=bool)
+            self.__contagens = [np.zeros(len(v), dtype=np.int64) for v in grelha]
+            self.__medias = [np.zeros((len(v), num_epocas)) for v in grelha]
+            self.__m2 = [np.zeros((len(v), num_epocas)) for v in grelha]
+
+    @property
+    def caminho_curvas(self):
+        return os.path.join(self.__caminho, "curvas.dat")
+
+    @property
+    def forma(self):
+        return self.__forma
+
+    @property
+    def curvas(self):
+        """
+        Matriz mapeada em memória (*valores de cada hiperparâmetro, repetição, época)
+        com as curvas de perda. As células pendentes têm valores indefinidos.
+        """
+        return self.__curvas
+
+    @property
+    def concluidas(self):
+        """
+        Matriz booleana (*valores de cada hiperparâmetro, repetição) das células
+        concluídas.
+        """
+        return self.__concluidas
+
+    def pendentes(self):
+        """
+        Obtém os índices das células ainda por treinar.
+
+        Retorna:
+            Lista de tuplos (*índice de cada hiperparâmetro, repetição).
+        """
+
+        return [tuple(map(int, i)) for i in np.argwhere(~self.__concluidas)]
+
+    def registar(self, indice, curva):
+        """
+        Escreve a curva de perda de uma célula e marca-a como concluída.
+
+        Parâmetros:
+            indice: Índice da célula (*índice de cada hiperparâmetro, repetição).
+            curva: Perda em cada época.
+        """
+
+        self.__curvas[indice] = curva
+        self.concluir(indice)
+
+    def concluir(self, indice):
+        """
+        Marca como concluída uma célula cuja curva já foi escrita no ficheiro das
+        curvas (por exemplo, por outro processo), atualizando os agregados.
+
+        A curva é escrita em disco antes de o estado ser substituído, pelo que o
+        estado nunca refere uma curva incompleta.
+
+        Parâmetros:
+            indice: Índice da célula (*índice de cada hiperparâmetro, repetição).
+        """
+
+        indice = tuple(indice)
+        if self.__concluidas[indice]:
+            return
+
+        self.__curvas.flush()
+        curva = np.asarray(self.__curvas[indice], dtype=np.float64)
+
+        # Algoritmo de Welford: média e soma dos quadrados dos desvios incrementais
+        for eixo, valor in enumerate(indice[:-1]):
+            self.__contagens[eixo][valor] += 1
+            media = self.__medias[eixo][valor]
+            delta = curva - media
+            media += delta / self.__contagens[eixo][valor]
+            self.__m2[eixo][valor] += delta * (curva - media)
+
+        self.__concluidas[indice] = True
+        self.__guardar_estado()
+
+    def resumo(self, eixo):
+        """
+        Obtém a média e o desvio padrão, em cada época, das curvas concluídas para
+        cada valor de um hiperparâmetro, sem ler as curvas.
+
+        Parâmetros:
+            eixo: Índice do hiperparâmetro na grelha.
+
+        Retorna:
+            Tuplo (médias, desvios), matrizes (valores do hiperparâmetro, época).
+        """
+
+        contagens = np.maximum(self.__contagens[eixo], 1)[:, np.newaxis]
+        return self.__medias[eixo].copy(), np.sqrt(self.__m2[eixo] / contagens)
+
+    def __guardar_estado(self):
+        """
+        Guarda o estado num ficheiro temporário e substitui o anterior de forma
+        atómica, para que uma interrupção nunca deixe um estado incompleto.
+        """
+
+        estado = {"concluidas": self.__concluidas}
+        for eixo in range(len(self.__grelha)):
+            estado[f"n_{eixo}"] = self.__contagens[eixo]
+            estado[f"media_{eixo}"] = self.__medias[eixo]
+            estado[f"m2_{eixo}"] = self.__m2[eixo]
+
+        caminho = os.path.join(self.__caminho, "estado.npz")
+        temporario = os.path.join(self.__caminho, "estado.tmp.npz")
+        with open(temporario, "wb") as f:
+            np.savez(f, **estado)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
@@ -0,0 +1,219 @@
+import asyncio
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+
+# Número máximo de latências guardadas para as estatísticas (as mais recentes)
+MAX_LATENCIAS = 100000
+
+
+class ServicoInferencia:
+    """
+    Serviço local de inferência que recebe pedidos de uma amostra de cada vez, de
+    várias threads ou tarefas asyncio, e os agrupa em lotes, para que cada lote seja
+    uma única previsão vetorizada da rede (em vez de uma previsão por amostra, com o
+    custo fixo de cada chamada, muito elevado na plataforma Keras).
+
+    Uma thread de agrupamento retira os pedidos da fila e fecha um lote quando este
+    atinge `tamanho_lote_max` amostras ou quando passam `espera_max` segundos desde
+    o primeiro pedido do lote. Cada lote é previsto por um conjunto de
+    `num_trabalhadores` threads, e a saída de cada amostra é devolvida através do
+    `Future` do seu pedido.
+
+    A previsão usa `prever_lote` da rede, se existir (a rede Keras usa
+    `predict_on_batch`, sem a preparação de dados de `predict`), ou `prever`.
+
+    Parâmetros:
+        rede: Rede neuronal de qualquer plataforma (ou a interface comum).
+        tamanho_lote_max: Número máximo de amostras de cada lote.
+        espera_max: Tempo máximo, em segundos, que um pedido espera por outros
+        pedidos para completar o lote.
+        num_trabalhadores: Número de threads que executam as previsões (a rede
+        Keras deve usar apenas uma).
+
+    Exceções:
+        AssertionError: Se o tamanho do lote ou o número de trabalhadores não forem
+        positivos, ou se a espera for negativa.
+    """
+
+    def __init__(
+        self, rede, tamanho_lote_max=64, espera_max=0.005, num_trabalhadores=1
+    ):
+        assert tamanho_lote_max > 0 and espera_max >= 0 and num_trabalhadores > 0
+        self.__prever = getattr(rede, "prever_lote", rede.prever)
+        self.__tamanho_lote_max = tamanho_lote_max
+        self.__espera_max = espera_max
+
+        self.__pedidos = queue.Queue()
+        self.__trabalhadores = ThreadPoolExecutor(num_trabalhadores)
+        self.__bloqueio = threading.Lock()
+        self.__latencias = collections.deque(maxlen=MAX_LATENCIAS)
+        self.__num_pedidos = 0
+        self.__num_lotes = 0
+        self.__inicio = time.perf_counter()
+        self.__fechado = False
+
+        self.__agrupador = threading.Thread(target=self.__agrupar, daemon=True)
+        self.__agrupador.start()
+
+    def submeter(self, entrada):
+        """
+        Submete um pedido de previsão de uma amostra.
+
+        Parâmetros:
+            entrada: Entrada (vetor) de uma amostra.
+
+        Retorna:
+            `concurrent.futures.Future` com a saída (vetor) da amostra, ou com a
+            exceção da previsão do lote.
+
+        Exceções:
+            AssertionError: Se o serviço estiver fechado.
+        """
+
+        assert not self.__fechado
+        futuro = Future()
+        self.__pedidos.put((np.asarray(entrada), futuro, time.perf_counter()))
+        return futuro
+
+    def prever(self, entrada, tempo_limite=None):
+        """
+        Prevê a saída de uma amostra, esperando pelo resultado do seu lote.
+
+        Parâmetros:
+            entrada: Entrada (vetor) de uma amostra.
+            tempo_limite: Tempo máximo de espera, em segundos (opcional).
+
+        Retorna:
+            Saída (vetor) da amostra.
+        """
+
+        return self.submeter(entrada).result(tempo_limite)
+
+    async def prever_async(self, entrada):
+        """
+        Prevê a saída de uma amostra numa tarefa asyncio, sem bloquear o ciclo de
+        eventos enquanto espera pelo lote.
+
+        Parâmetros:
+            entrada: Entrada (vetor) de uma amostra.
+
+        Retorna:
+            Saída (vetor) da amostra.
+        """
+
+        return await asyncio.wrap_future(self.submeter(entrada))
+
+    def estatisticas(self):
+        """
+        Obtém as estatísticas do serviço desde a sua criação (ou `limpar`).
+
+        Retorna:
+            Dicionário com o número de pedidos e de lotes, o tamanho médio dos
+            lotes, o débito (pedidos por segundo) e os percentis 50, 95 e 99 da
+            latência dos pedidos (do pedido ao resultado), em segundos.
+        """
+
+        with self.__bloqueio:
+            latencias = np.array(self.__latencias)
+            num_pedidos, num_lotes = self.__num_pedidos, self.__num_lotes
+            duracao = time.perf_counter() - self.__inicio
+
+        percentis = (
+            np.percentile(latencias, [50, 95, 99])
+            if len(latencias) > 0
+            else np.full(3, np.nan)
+        )
+        return {
+            "pedidos": num_pedidos,
+            "lotes": num_lotes,
+            "tamanho_lote_medio": num_pedidos / num_lotes if num_lotes > 0 else 0.0,
+            "debito": num_pedidos / duracao if duracao > 0 else 0.0,
+            "latencia_p50": float(percentis[0]),
+            "latencia_p95": float(percentis[1]),
+            "latencia_p99": float(percentis[2]),
+        }
+
+    def limpar(self):
+        """
+        Reinicia as estatísticas.
+        """
+
+        with self.__bloqueio:
+            self.__latencias.clear()
+            self.__num_pedidos = 0
+            self.__num_lotes = 0
+            self.__inicio = time.perf_counter()
+
+    def fechar(self):
+        """
+        Fecha o serviço: os pedidos já submetidos são previstos, e só depois
+        terminam as threads.
+        """
+
+        if self.__fechado:
+            return
+        self.__fechado = True
+        self.__pedidos.put(None)
+        self.__agrupador.join()
+        self.__trabalhadores.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+    def __agrupar(self):
+        """
+        Ciclo da thread de agrupamento: forma os lotes e envia-os aos trabalhadores.
+        """
+
+        terminar = False
+        while not terminar:
+            pedido = self.__pedidos.get()
+            if pedido is None:
+                break
+
+            lote = [pedido]
+            limite = time.perf_counter() + self.__espera_max
+            while len(lote) < self.__tamanho_lote_max:
+                espera = limite - time.perf_counter()
+                try:
+                    pedido = (
+                        self.__pedidos.get(timeout=espera)
+                        if espera > 0
+                        else self.__pedidos.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if pedido is None:
+                    terminar = True
+                    break
+                lote.append(pedido)
+
+            self.__trabalhadores.submit(self.__executar, lote)
+
+    def __executar(self, lote):
+        """
+        Prevê um lote e devolve a saída de cada amostra ao seu pedido.
+        """
+
+        futuros = [futuro for _, futuro, _ in lote]
+        try:
+            saidas = np.asarray(self.__prever(np.stack([e for e, _, _ in lote])))
+        except Exception as excecao:
+            for futuro in futuros:
+                futuro.set_exception(excecao)
+            return
+
+        fim = time.perf_counter()
+        with self.__bloqueio:
+            self.__num_pedidos += len(lote)
+            self.__num_lotes += 1
+            self.__latencias.extend(fim - inicio for _, _, inicio in lote)
+        for futuro, saida in zip(futuros, saidas):
+            futuro.set_result(saida)
@@ -0,0 +1,244 @@
+import numpy as np
+from lib.rna.ativacao import Degrau
+from lib.rna.padroes import (
+    PadroesEmpacotados,
+    desempacotar,
+    empacotar,
+    tipo_palavra,
+)
+
+# Número máximo de bits de entrada de uma tabela de verdade (2^24 entradas)
+MAX_BITS_TABELA = 24
+
+
+def _codigos_entrada(entradas, num_bits):
+    """
+    Converte entradas binárias (matriz de bits ou padrões empacotados) nos códigos
+    inteiros de cada amostra, para indexar uma tabela.
+    """
+
+    if isinstance(entradas, PadroesEmpacotados):
+        assert entradas.num_bits == num_bits
+        codigos = entradas.codigos
+        if isinstance(codigos, range):
+            return np.arange(codigos.start, codigos.stop, codigos.step, np.uint64)
+        return codigos.astype(np.uint64, copy=False)
+
+    bits = np.asarray(entradas)
+    assert bits.ndim == 2 and bits.shape[1] == num_bits
+    assert np.all((bits == 0) | (bits == 1))
+    return empacotar(bits)
+
+
+def _saidas_binarias(camada):
+    """
+    Indica se uma camada tem a função degrau com saídas 0 ou 1 (o valor em 0,
+    `limiar`, também é 0 ou 1).
+    """
+
+    funcao = camada.funcao_ativacao
+    return isinstance(funcao, Degrau) and funcao.limiar in (0, 1)
+
+
+class TabelaVerdade:
+    """
+    Tabela de verdade de uma rede neuronal com entradas binárias: as saídas da rede
+    para todas as 2^n entradas possíveis, calculadas uma única vez, pelo que cada
+    previsão seguinte é apenas a conversão dos bits de entrada num número inteiro e
+    a leitura da linha correspondente da tabela.
+
+    A tabela é calculada por blocos de entradas (padrões empacotados, ver
+    `PadroesEmpacotados`), pelo que a memória necessária para o cálculo depende do
+    tamanho do bloco. Se a última camada tiver a função degrau com saídas binárias,
+    as saídas de cada entrada são empacotadas num número inteiro (por exemplo, um
+    byte para até 8 saídas), em vez de uma linha de vírgula flutuante.
+
+    Parâmetros:
+        rede: Rede neuronal (plataforma "numpy") com até MAX_BITS_TABELA entradas.
+        tamanho_bloco: Número de entradas calculadas de cada vez.
+
+    Exceções:
+        AssertionError: Se a rede tiver mais de MAX_BITS_TABELA entradas.
+    """
+
+    def __init__(self, rede, tamanho_bloco=65536):
+        self.__num_bits = rede.camadas[0].dim_saida
+        assert 0 < self.__num_bits <= MAX_BITS_TABELA
+
+        self.__dim_saida = rede.camadas[-1].dim_saida
+        self.__dtype = rede.dtype
+        self.__binaria = _saidas_binarias(rede.camadas[-1])
+
+        num_entradas = 2**self.__num_bits
+        if self.__binaria:
+            self.__tabela = np.empty(num_entradas, dtype=tipo_palavra(self.__dim_saida))
+        else:
+            self.__tabela = np.empty((num_entradas, self.__dim_saida), self.__dtype)
+
+        todos = PadroesEmpacotados.todos(self.__num_bits)
+        inicio = 0
+        for lote in todos.lotes(tamanho_bloco, self.__dtype):
+            saidas = rede.prever(lote)
+            fim = inicio + len(lote)
+            self.__tabela[inicio:fim] = empacotar(saidas) if self.__binaria else saidas
+            inicio = fim
+        self.__tabela.flags.writeable = False
+
+    @property
+    def num_bits(self):
+        return self.__num_bits
+
+    @property
+    def binaria(self):
+        """
+        Indica se as saídas estão empacotadas (última camada com função degrau).
+        """
+        return self.__binaria
+
+    @property
+    def tabela(self):
+        """
+        Tabela (só de leitura) indexada pelo código de cada entrada: os códigos das
+        saídas (tabela binária) ou a matriz (2^n, dim_saida) das saídas.
+        """
+        return self.__tabela
+
+    @property
+    def nbytes(self):
+        return self.__tabela.nbytes
+
+    def prever_codigos(self, codigos, out=None):
+        """
+        Obtém as linhas da tabela para entradas já codificadas como números inteiros
+        (o caminho mais rápido, apenas uma leitura indexada).
+
+        Parâmetros:
+            codigos: Matriz de códigos das entradas (inteiros entre 0 e 2^n - 1).
+            out: Matriz onde escrever o resultado (opcional).
+
+        Retorna:
+            Códigos das saídas (tabela binária) ou matriz das saídas.
+        """
+
+        return np.take(self.__tabela, codigos, axis=0, out=out)
+
+    def prever(self, entradas):
+        """
+        Realiza a previsão para entradas binárias, com o mesmo resultado que a
+        previsão da rede.
+
+        Parâmetros:
+            entradas: Matriz (amostras, n) de bits ou padrões empacotados.
+
+        Retorna:
+            Matriz (amostras, dim_saida) das saídas.
+
+        Exceções:
+            AssertionError: Se as entradas não forem binárias ou não tiverem n bits.
+        """
+
+        codigos = _codigos_entrada(entradas, self.__num_bits).astype(np.intp)
+        saidas = self.prever_codigos(codigos)
+        if self.__binaria:
+            return desempacotar(saidas, self.__dim_saida).astype(self.__dtype)
+        return saidas
+
+
+class RedeBinaria:
+    """
+    Avaliação inteira (bit-a-bit) de uma rede neuronal em que todas as camadas têm
+    a função degrau com saídas binárias, com até 64 bits de entrada, sem tabela das
+    2^n entradas.
+
+    As entradas e as saídas de cada camada são números inteiros com um bit por
+    neurónio. Para cada camada, os bits de entrada são divididos em bytes, e para
+    cada byte é calculada uma tabela (256, neurónios) com a soma dos pesos dos bits
+    a 1 desse valor. A soma ponderada de uma camada é então a soma das linhas das
+    tabelas de cada byte da entrada (uma leitura indexada por byte, em vez de um
+    produto de matrizes), mais o pendor, e os bits de saída são o seu sinal.
+
+    Se todos os pesos e pendores forem inteiros (como nas redes lógicas da parte
+    1.2), as somas são calculadas com inteiros e o resultado é exato; caso
+    contrário, são somas de vírgula flutuante por outra ordem, que só podem diferir
+    da rede em somas exatamente nulas.
+
+    Parâmetros:
+        rede: Rede neuronal (plataforma "numpy") com a função degrau com saídas
+        binárias em todas as camadas treináveis.
+
+    Exceções:
+        AssertionError: Se a rede tiver mais de 64 entradas, se alguma camada não
+        tiver a função degrau com saídas 0 ou 1, ou se alguma camada tiver mais de
+        64 neurónios.
+    """
+
+    def __init__(self, rede):
+        # Os códigos de entrada e de saída de cada camada são inteiros de 64 bits
+        self.__num_bits = rede.camadas[0].dim_saida
+        assert 0 < self.__num_bits <= 64
+        self.__dtype = rede.dtype
+        self.__camadas = []
+        for camada in rede.camadas:
+            if camada.funcao_ativacao is None:
+                continue
+            assert _saidas_binarias(camada) and camada.dim_saida <= 64
+            self.__camadas.append(self.__compilar_camada(camada))
+
+    @staticmethod
+    def __compilar_camada(camada):
+        pesos, pendores = camada.pesos, camada.pendores
+        inteira = np.all(pesos == np.round(pesos)) and np.all(
+            pendores == np.round(pendores)
+        )
+        tipo = np.int64 if inteira else np.float64
+
+        # A entrada j (bit mais significativo primeiro) tem o peso 2^(n-1-j) no
+        # código; o byte k contém os bits de peso 2^(8k) a 2^(8k+7)
+        num_bits = camada.dim_entrada
+        num_bytes = (num_bits + 7) // 8
+        bits_valor = desempacotar(np.arange(256), 8)[:, ::-1]
+        tabelas = np.zeros((num_bytes, 256, camada.dim_saida), dtype=tipo)
+        for k in range(num_bytes):
+            for t in range(8):
+                j = num_bits - 1 - (8 * k + t)
+                if j >= 0:
+                    tabelas[k] += np.outer(bits_valor[:, t], pesos[j]).astype(tipo)
+
+        return tabelas, pendores.astype(tipo), camada.funcao_ativacao.limiar == 1
+
+    def prever_codigos(self, codigos):
+        """
+        Avalia a rede para entradas codificadas como números inteiros.
+
+        Parâmetros:
+            codigos: Matriz de códigos das entradas.
+
+        Retorna:
+            Matriz de códigos das saídas (np.uint64), com um bit por neurónio.
+        """
+
+        codigos = np.asarray(codigos, dtype=np.uint64)
+        for tabelas, pendores, limiar in self.__camadas:
+            somas = np.broadcast_to(pendores, (len(codigos), len(pendores))).copy()
+            for k, tabela in enumerate(tabelas):
+                byte = (codigos >> np.uint64(8 * k)) & np.uint64(0xFF)
+                somas += tabela[byte.astype(np.intp)]
+
+            codigos = empacotar((somas >= 0) if limiar else (somas > 0))
+        return codigos
+
+    def prever(self, entradas):
+        """
+        Realiza a previsão para entradas binárias, com o mesmo resultado que a
+        previsão da rede.
+
+        Parâmetros:
+            entradas: Matriz (amostras, n) de bits ou padrões empacotados.
+
+        Retorna:
+            Matriz (amostras, dim_saida) das saídas.
+        """
+
+        codigos = self.prever_codigos(_codigos_entrada(entradas, self.__num_bits))
+        num_saidas = len(self.__camadas[-1][1])
+        return desempacotar(codigos, num_saidas).astype(self.__dtype)
@@ -0,0 +1,392 @@
+import contextlib
+import itertools
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from lib.rna.monitores import HistoricoTreino
+
+# Variáveis de ambiente que limitam o número de fios de execução das bibliotecas
+# numéricas (BLAS, OpenMP, TensorFlow) em cada processo
+VARIAVEIS_FIOS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+    "TF_NUM_INTEROP_THREADS",
+)
+
+# Matriz de resultados partilhada, em cada processo de trabalho
+_memoria = None
+_resultados = None
+
+
+def semente_celula(semente, indice, forma):
+    """
+    Obtém a semente aleatória de uma célula da grelha, que depende apenas da semente
+    base e da posição da célula, e não da ordem (ou do processo) em que é executada.
+
+    Parâmetros:
+        semente: Semente base do varrimento (None para sementes aleatórias).
+        indice: Índice da célula na grelha (tuplo).
+        forma: Dimensões da grelha.
+
+    Retorna:
+        Semente da célula (inteiro de 32 bits), ou None.
+    """
+
+    if semente is None:
+        return None
+    posicao = int(np.ravel_multi_index(indice, forma))
+    return int(np.random.SeedSequence([semente, posicao]).generate_state(1)[0])
+
+
+def _iniciar_processo(nome_memoria, forma, caminho_curvas=None):
+    """
+    Inicializa um processo de trabalho, associando-o à matriz de resultados
+    partilhada: um bloco de memória partilhada ou, se for dado o caminho, o ficheiro
+    das curvas de um repositório de resultados.
+    """
+
+    global _memoria, _resultados
+    if caminho_curvas is not None:
+        _resultados = np.memmap(
+            caminho_curvas, dtype=np.float64, mode="r+", shape=forma
+        )
+        return
+
+    _memoria = SharedMemory(name=nome_memoria)
+    _resultados = np.ndarray(forma, dtype=np.float64, buffer=_memoria.buf)
+
+
+def _executar_celula(treinar_celula, indice, parametros, num_epocas, semente):
+    """
+    Treina uma célula da grelha num processo de trabalho e escreve a curva de perda
+    diretamente na matriz de resultados partilhada.
+    """
+
+    _resultados[indice] = _treinar(treinar_celula, parametros, num_epocas, semente)
+    if isinstance(_resultados, np.memmap):
+        _resultados.flush()
+    return indice
+
+
+def _treinar(treinar_celula, parametros, num_epocas, semente):
+    if semente is not None:
+        random.seed(semente)
+        np.random.seed(semente)
+    erros = treinar_celula(parametros, num_epocas, semente)
+    if not isinstance(erros, HistoricoTreino):
+        erros = HistoricoTreino(erros)
+    return erros.completar(num_epocas)
+
+
+def varrer(
+    treinar_celula,
+    grelha,
+    num_repeticoes,
+    num_epocas,
+    num_processos=None,
+    fios_por_processo=1,
+    semente=None,
+    ao_concluir=None,
+    repositorio=None,
+):
+    """
+    Executa um varrimento de hiperparâmetros, treinando uma rede para cada combinação
+    de valores da grelha e cada repetição, distribuídas por um conjunto de processos.
+
+    Cada processo escreve a curva de perda diretamente numa matriz em memória
+    partilhada, com a forma (*valores de cada hiperparâmetro, repetição, época), pelo
+    que os resultados não são copiados entre processos. O número de fios de execução
+    das bibliotecas numéricas em cada processo é limitado, para que os processos não
+    disputem os mesmos núcleos.
+
+    Os processos são iniciados de raiz ("spawn"), pelo que a função de treino tem de
+    estar definida ao nível de um módulo e o programa principal protegido com
+    `if __name__ == "__main__":`.
+
+    Com uma semente base, cada célula usa uma semente própria (ver `semente_celula`),
+    pelo que os resultados são iguais qualquer que seja o número de processos.
+
+    Parâmetros:
+        treinar_celula: Função `treinar_celula(parametros, num_epocas, semente)` que
+        treina uma rede com o tuplo de hiperparâmetros dado e retorna a perda em cada
+        época. Antes de cada chamada, os geradores `random` e `np.random` são
+        inicializados com a semente da célula. Se o treino for interrompido antes
+        do fim (por exemplo, por um monitor de paragem), a curva é completada com o
+        último erro.
+        grelha: Lista com a lista de valores de cada hiperparâmetro.
+        num_repeticoes: Número de repetições de cada combinação.
+        num_epocas: Número de épocas de treino.
+        num_processos: Número de processos (por omissão, o número de núcleos). Com 1,
+        o varrimento é executado no próprio processo.
+        fios_por_processo: Número de fios de execução em cada processo.
+        semente: Semente base (opcional).
+        ao_concluir: Função `ao_concluir(indice, parametros)` chamada no processo
+        principal quando cada célula termina (opcional).
+        repositorio: Repositório de resultados (`RepositorioResultados`) com a mesma
+        grelha (opcional). As curvas são escritas diretamente no ficheiro do
+        repositório, cada célula é registada quando termina e as células já
+        concluídas (de um varrimento interrompido) não são repetidas.
+
+    Retorna:
+        Matriz (*valores de cada hiperparâmetro, repetição, época) das perdas (a
+        matriz mapeada em memória do repositório, se for dado).
+    """
+
+    forma_grelha = (*map(len, grelha), num_repeticoes)
+    forma = (*forma_grelha, num_epocas)
+    indices = itertools.product(*map(range, forma_grelha))
+    if repositorio is not None:
+        assert repositorio.forma == forma
+        indices = repositorio.pendentes()
+    celulas = [
+        (indice, tuple(valores[i] for valores, i in zip(grelha, indice[:-1])))
+        for indice in indices
+    ]
+
+    def concluir(indice, parametros):
+        if repositorio is not None:
+            repositorio.concluir(indice)
+        if ao_concluir is not None:
+            ao_concluir(indice, parametros)
+
+    if num_processos == 1:
+        resultados = (
+            np.empty(forma, dtype=np.float64)
+            if repositorio is None
+            else repositorio.curvas
+        )
+        for indice, parametros in celulas:
+            resultados[indice] = _treinar(
+                treinar_celula,
+                parametros,
+                num_epocas,
+                semente_celula(semente, indice, forma_grelha),
+            )
+            concluir(indice, parametros)
+        return resultados
+
+    if repositorio is not None:
+        with _limitar_fios(fios_por_processo):
+            _executar_em_processos(
+                treinar_celula,
+                celulas,
+                num_epocas,
+                num_processos,
+                (None, forma, repositorio.caminho_curvas),
+                lambda indice: semente_celula(semente, indice, forma_grelha),
+                concluir,
+            )
+        return repositorio.curvas
+
+    memoria = SharedMemory(create=True, size=max(1, int(np.prod(forma)) * 8))
+    try:
+        with _limitar_fios(fios_por_processo):
+            _executar_em_processos(
+                treinar_celula,
+                celulas,
+                num_epocas,
+                num_processos,
+                (memoria.name, forma),
+                lambda indice: semente_celula(semente, indice, forma_grelha),
+                concluir,
+            )
+        return np.ndarray(forma, dtype=np.float64, buffer=memoria.buf).copy()
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+
+@contextlib.contextmanager
+def _limitar_fios(fios_por_processo):
+    """
+    Limita o número de fios de execução dos processos criados dentro do contexto.
+    Os processos herdam o ambiente do processo principal quando são criados, antes
+    de importarem qualquer biblioteca.
+    """
+
+    ambiente = {nome: os.environ.get(nome) for nome in VARIAVEIS_FIOS}
+    try:
+        for nome in VARIAVEIS_FIOS:
+            os.environ[nome] = str(fios_por_processo)
+        yield
+    finally:
+        for nome, valor in ambiente.items():
+            if valor is None:
+                os.environ.pop(nome, None)
+            else:
+                os.environ[nome] = valor
+
+
+def _executar_em_processos(
+    treinar_celula, celulas, num_epocas, num_processos, destino, sementes, concluir
+):
+    """
+    Distribui as células por um conjunto de processos, que escrevem as curvas no
+    destino dado (argumentos de `_iniciar_processo`).
+    """
+
+    with ProcessPoolExecutor(
+        max_workers=num_processos,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_iniciar_processo,
+        initargs=destino,
+    ) as executor:
+        tarefas = {
+            executor.submit(
+                _executar_celula,
+                treinar_celula,
+                indice,
+                parametros,
+                num_epocas,
+                sementes(indice),
+            ): parametros
+            for indice, parametros in celulas
+        }
+        for tarefa in as_completed(tarefas):
+            concluir(tarefa.result(), tarefas[tarefa])
+
+
+def varrer_sucessivo(
+    iniciar_celula,
+    grelha,
+    num_repeticoes,
+    num_epocas,
+    fator=3,
+    epocas_iniciais=None,
+    semente=None,
+    ao_podar=None,
+):
+    """
+    Executa um varrimento de hiperparâmetros por divisões sucessivas (successive
+    halving, a ronda base do Hyperband): todas as combinações da grelha são treinadas
+    durante poucas épocas, apenas a melhor fração (1 / fator) continua a ser treinada,
+    com o número de épocas multiplicado pelo fator, e assim sucessivamente até
+    `num_epocas`. As combinações que divergem ou convergem mal são abandonadas cedo,
+    pelo que o total de épocas treinadas é uma fração do de `varrer`.
+
+    Cada combinação é avaliada pela mediana, entre as repetições, do erro na última
+    época treinada. As redes sobreviventes continuam o treino onde pararam. O estado
+    dos geradores `random` e `np.random` de cada célula é guardado entre rondas, e as
+    sementes são as de `varrer`, pelo que (para treinos retomáveis exatos, como
+    `RedeNeuronal.treinar(continuar=True)` da plataforma "numpy") as curvas obtidas
+    são iguais às primeiras épocas das de `varrer`.
+
+    As células são treinadas no próprio processo, já que as redes sobreviventes são
+    mantidas em memória entre rondas.
+
+    Parâmetros:
+        iniciar_celula: Função `iniciar_celula(parametros, semente)` que cria uma rede
+        com o tuplo de hiperparâmetros dado e retorna uma função `treinar(num_epocas)`
+        que continua o treino dessa rede e retorna a perda em cada época.
+        grelha: Lista com a lista de valores de cada hiperparâmetro.
+        num_repeticoes: Número de repetições de cada combinação.
+        num_epocas: Número máximo de épocas de treino.
+        fator: Fator de redução das combinações (e de aumento das épocas) por ronda.
+        epocas_iniciais: Épocas da primeira ronda. Por omissão, são as rondas
+        necessárias para reduzir as combinações a uma, com as épocas divididas pelo
+        fator em cada ronda anterior à última.
+        semente: Semente base (opcional).
+        ao_podar: Função `ao_podar(ronda)` chamada no fim de cada ronda, com a
+        entrada do registo dessa ronda (opcional).
+
+    Retorna:
+        Tuplo (resultados, registo): a matriz (*valores de cada hiperparâmetro,
+        repetição, época) das perdas, com NaN nas épocas não treinadas, e o registo
+        das rondas, uma lista de dicionários com o número da ronda ("ronda"), as
+        épocas treinadas até ao fim da ronda ("epocas"), a classificação das
+        combinações ("classificacao", lista de tuplos (índice, parâmetros, perda)
+        por ordem crescente da perda) e o número de combinações que continuam
+        ("num_sobreviventes"). A primeira combinação da última ronda é a melhor.
+
+    Exceções:
+        AssertionError: Se o fator for inferior a 2 ou as épocas iniciais não
+        estiverem entre 1 e `num_epocas`.
+    """
+
+    forma_grelha = (*map(len, grelha), num_repeticoes)
+    combinacoes = list(itertools.product(*map(range, forma_grelha[:-1])))
+    assert fator >= 2
+    if epocas_iniciais is None:
+        num_rondas = int(np.log(len(combinacoes)) / np.log(fator) + 1e-9)
+        epocas_rondas = [num_epocas // fator**k for k in range(num_rondas, 0, -1)]
+    else:
+        assert 0 < epocas_iniciais <= num_epocas
+        epocas_rondas = [epocas_iniciais]
+        while epocas_rondas[-1] * fator < num_epocas:
+            epocas_rondas.append(epocas_rondas[-1] * fator)
+    epocas_rondas = [e for e in epocas_rondas if 0 < e < num_epocas] + [num_epocas]
+
+    resultados = np.full((*forma_grelha, num_epocas), np.nan)
+    celulas = {}
+    registo = []
+    epocas_treinadas = 0
+    for epocas_ronda in epocas_rondas:
+        perdas = []
+        for combinacao in combinacoes:
+            parametros = tuple(valores[i] for valores, i in zip(grelha, combinacao))
+            for repeticao in range(num_repeticoes):
+                indice = (*combinacao, repeticao)
+                if indice not in celulas:
+                    celulas[indice] = _iniciar_sucessivo(
+                        iniciar_celula,
+                        parametros,
+                        semente_celula(semente, indice, forma_grelha),
+                    )
+                treinar, estado = celulas[indice]
+
+                # Cada célula continua com o seu próprio estado aleatório
+                random.setstate(estado[0])
+                np.random.set_state(estado[1])
+                erros = treinar(epocas_ronda - epocas_treinadas)
+                celulas[indice] = (treinar, (random.getstate(), np.random.get_state()))
+
+                if not isinstance(erros, HistoricoTreino):
+                    erros = HistoricoTreino(erros)
+                resultados[indice][epocas_treinadas:epocas_ronda] = erros.completar(
+                    epocas_ronda - epocas_treinadas
+                )
+
+            perda = np.median(resultados[combinacao][:, epocas_ronda - 1])
+            perdas.append((combinacao, parametros, float(perda)))
+
+        # As combinações que divergem (NaN) ficam no fim da classificação
+        classificacao = sorted(perdas, key=lambda p: np.inf if np.isnan(p[2]) else p[2])
+        ultima = epocas_ronda >= num_epocas
+        num_sobreviventes = (
+            len(classificacao) if ultima else max(1, len(classificacao) // fator)
+        )
+        ronda = {
+            "ronda": len(registo),
+            "epocas": epocas_ronda,
+            "classificacao": classificacao,
+            "num_sobreviventes": num_sobreviventes,
+        }
+        registo.append(ronda)
+        if ao_podar is not None:
+            ao_podar(ronda)
+        if ultima:
+            return resultados, registo
+
+        combinacoes = [c for c, _, _ in classificacao[:num_sobreviventes]]
+        for combinacao, _, _ in classificacao[num_sobreviventes:]:
+            for repeticao in range(num_repeticoes):
+                del celulas[(*combinacao, repeticao)]
+        epocas_treinadas = epocas_ronda
+
+
+def _iniciar_sucessivo(iniciar_celula, parametros, semente):
+    """
+    Cria a rede de uma célula do varrimento por divisões sucessivas, com a semente
+    da célula, e retorna a função de treino e o estado aleatório inicial.
+    """
+
+    if semente is not None:
+        random.seed(semente)
+        np.random.seed(semente)
+    treinar = iniciar_celula(parametros, semente)
+    return treinar, (random.getstate(), np.random.get_state())
@@ -1,7 +1,10 @@
-import itertools
+import functools
+import sys
 import numpy as np
 from keras.layers import Input, Dense
 from lib.rna.rede_neuronal_keras import RedeNeuronal
+from lib.rna.resultados import RepositorioResultados
+from lib.rna.varrimento import varrer, varrer_sucessivo
 import matplotlib.pyplot as plt
 
 # O objetivo deste código é avaliar o efeito de diferentes hiperparâmetros no treino de
@@ -66,7 +69,54 @@ def criar_modelo():
     return rede
 
 
-def colecionar_erros(
+def treinar_celula(X, y, parametros, num_epocas, semente):
+    """
+    Treina uma rede para uma combinação de hiperparâmetros (taxa de aprendizagem,
+    momento, ordem aleatória) e retorna o erro de cada época.
+    Executada em processos separados, pelo que tem de estar definida neste nível.
+    """
+    if semente is not None:
+        import keras
+
+        keras.utils.set_random_seed(semente)
+
+    eta, alpha, chi = parametros
+    rede = criar_modelo()
+    return rede.treinar(
+        entradas=X,
+        saidas=y,
+        epocas=num_epocas,
+        taxa_aprendizagem=eta,
+        momento=alpha,
+        ordem_aleatoria=chi,
+    )
+
+
+def iniciar_celula(X, y, parametros, semente):
+    """
+    Cria uma rede para uma combinação de hiperparâmetros e retorna a função que
+    continua o seu treino durante um número de épocas, para a procura por divisões
+    sucessivas.
+    """
+    if semente is not None:
+        import keras
+
+        keras.utils.set_random_seed(semente)
+
+    eta, alpha, chi = parametros
+    rede = criar_modelo()
+    return lambda num_epocas: rede.treinar(
+        entradas=X,
+        saidas=y,
+        epocas=num_epocas,
+        taxa_aprendizagem=eta,
+        momento=alpha,
+        ordem_aleatoria=chi,
+        continuar=True,
+    )
+
+
+def procurar_melhores(
     X,
     y,
     valores_taxa_aprend,
@@ -74,31 +124,65 @@ def colecionar_erros(
     valores_ordem,
     num_repeticoes,
     num_epocas,
+    semente=None,
 ):
-    dim_matriz = (
-        # *map(len, hiperparametros),
-        len(valores_taxa_aprend),
-        len(valores_momento),
-        len(valores_ordem),
+    """
+    Procura a melhor combinação de hiperparâmetros por divisões sucessivas: em cada
+    ronda, apenas o melhor terço das combinações continua a ser treinado, com o
+    triplo das épocas. Retorna a matriz (taxa_aprend, momento, ordem, repetição,
+    época) dos erros, com NaN nas épocas não treinadas, e o registo das rondas.
+    """
+
+    def mostrar_ronda(ronda):
+        print(
+            f"Ronda {ronda['ronda']}: {ronda['epocas']} épocas, "
+            f"{ronda['num_sobreviventes']}/{len(ronda['classificacao'])} continuam"
+        )
+        for posicao, (_, (eta, alpha, chi), perda) in enumerate(
+            ronda["classificacao"]
+        ):
+            estado = "continua" if posicao < ronda["num_sobreviventes"] else "podada"
+            ordem = "aleatória" if chi else "original"
+            print(f"  {eta:<6} | {alpha:<5} | {ordem:<9} | {perda:.6f} | {estado}")
+
+    return varrer_sucessivo(
+        functools.partial(iniciar_celula, X, y),
+        [valores_taxa_aprend, valores_momento, valores_ordem],
         num_repeticoes,
         num_epocas,
+        semente=semente,
+        ao_podar=mostrar_ronda,
     )
 
-    matriz = np.empty(dim_matriz, dtype=np.float64)
-    matriz_param = itertools.product(
-        valores_taxa_aprend, valores_momento, valores_ordem, range(num_repeticoes)
-    )
 
+def colecionar_erros(
+    X,
+    y,
+    valores_taxa_aprend,
+    valores_momento,
+    valores_ordem,
+    num_repeticoes,
+    num_epocas,
+    num_processos=None,
+    semente=None,
+    repositorio=None,
+):
+    """
+    Treina uma rede para cada combinação de hiperparâmetros e repetição, distribuídas
+    por `num_processos` processos (por omissão, um por núcleo), e retorna a matriz
+    (taxa_aprend, momento, ordem, repetição, época) dos erros.
+    Com uma semente, os resultados são reprodutíveis.
+    Com um repositório, os resultados são guardados em disco à medida que cada
+    célula termina, e um varrimento interrompido continua onde parou.
+    """
     cabecalhos = ("Repetição", "Taxa Apr.", "Momento", "Ordem")
     linha_cabeca = " | ".join([f"{header:<9}" for header in cabecalhos])
     print(linha_cabeca)
     print("-" * len(linha_cabeca))
 
-    # Para cada com combinação de hiperparâmetros,
-    # treinar a rede e guardar os resultados
-    for eta, alpha, chi, rep in matriz_param:
-        rede = criar_modelo()
-
+    def mostrar_celula(indice, parametros):
+        eta, alpha, chi = parametros
+        rep = indice[-1]
         table_row = (
             f"{rep+1:>4}/{num_repeticoes:<4}",
             f"{eta:<9}",
@@ -108,23 +192,18 @@ def colecionar_erros(
         row_string = " | ".join(table_row)
         print(row_string)
 
-        matriz[
-            valores_taxa_aprend.index(eta),
-            valores_momento.index(alpha),
-            valores_ordem.index(chi),
-            rep,
-        ] = rede.treinar(
-            entradas=X,
-            saidas=y,
-            epocas=num_epocas,
-            taxa_aprendizagem=eta,
-            momento=alpha,
-            ordem_aleatoria=chi,
-        )
-
-        # yn = rede.prever(X_treino)
-        # print(yn)
-    return matriz
+    # Para cada com combinação de hiperparâmetros,
+    # treinar a rede e guardar os resultados
+    return varrer(
+        functools.partial(treinar_celula, X, y),
+        [valores_taxa_aprend, valores_momento, valores_ordem],
+        num_repeticoes,
+        num_epocas,
+        num_processos=num_processos,
+        semente=semente,
+        ao_concluir=mostrar_celula,
+        repositorio=repositorio,
+    )
 
 
 def mostrar_efeito_param(
@@ -135,17 +214,25 @@ def mostrar_efeito_param(
     no treino da rede neuronal.
 
     Parâmetros:
-        erros: array shape (num_epocas,)
+        erros: array shape (taxa, momento, ordem, repetição, época), ou um
+        repositório de resultados, cujos resumos (média e desvio por época)
+        evitam ler as curvas completas
     """
-    num_epocas = erros.shape[-1]
+    if isinstance(erros, RepositorioResultados):
+        erros_medios, desvios_erro = erros.resumo(eixo)
+    else:
+        erros_param = np.moveaxis(erros, eixo, 0)
+        dim_epoca = tuple(range(1, erros_param.ndim - 1))
+        erros_medios = np.mean(erros_param, axis=dim_epoca)
+        desvios_erro = np.std(erros_param, axis=dim_epoca)
+
+    num_epocas = erros_medios.shape[-1]
     plt.figure(figsize=(12, 6))
 
     # para cada valor possível no parâmetro
     for idx, v in enumerate(valores):
-        erros_param = np.take(erros, indices=idx, axis=eixo)
-        dim_epoca = tuple(range(erros_param.ndim - 1))
-        erro_medio = np.mean(erros_param, axis=dim_epoca)
-        desvio_erro = np.std(erros_param, axis=dim_epoca)
+        erro_medio = erros_medios[idx]
+        desvio_erro = desvios_erro[idx]
 
         dom = np.arange(num_epocas)
         plt.errorbar(
@@ -186,6 +273,33 @@ if __name__ == "__main__":
     valores_momento = list(reversed([0, 0.5, 0.9, 0.99]))
     valores_ordem = [False, True]
 
+    # Com --sucessivo, apenas procura a melhor combinação por divisões sucessivas,
+    # com uma fração das épocas do varrimento completo
+    if "--sucessivo" in sys.argv:
+        matriz, registo = procurar_melhores(
+            X_treino,
+            y_treino,
+            valores_taxa_aprend,
+            valores_momento,
+            valores_ordem,
+            num_repeticoes=10,
+            num_epocas=5000,
+            semente=46307,
+        )
+        _, (eta, alpha, chi), perda = registo[-1]["classificacao"][0]
+        print(f"Melhor: taxa {eta}, momento {alpha}, ordem aleatória {chi} ({perda})")
+        print(f"Épocas treinadas: {np.count_nonzero(~np.isnan(matriz))}/{matriz.size}")
+        sys.exit()
+
+    # Repositório em disco dos resultados, que permite continuar um varrimento
+    # interrompido (apagar a pasta para repetir o varrimento)
+    repositorio = RepositorioResultados(
+        "out/efeito_params",
+        [valores_taxa_aprend, valores_momento, valores_ordem],
+        num_repeticoes=10,
+        num_epocas=5000,
+    )
+
     # Matriz para guardar os resultados (taxa_aprend, momento, ordem, repetição, época)
     matriz = colecionar_erros(
         X_treino,
@@ -195,6 +309,8 @@ if __name__ == "__main__":
         valores_ordem,
         num_repeticoes=10,
         num_epocas=5000,
+        semente=46307,
+        repositorio=repositorio,
     )
 
     # ultima época (taxa, momento, ordem, repetição)
@@ -202,7 +318,7 @@ if __name__ == "__main__":
 
     # Taxa de aprendizagem
     mostrar_efeito_param(
-        matriz,
+        repositorio,
         0,
         valores_taxa_aprend,
         "Taxa de aprendizagem",
@@ -212,7 +328,7 @@ if __name__ == "__main__":
 
     # Termo de momento
     mostrar_efeito_param(
-        matriz,
+        repositorio,
         1,
         valores_momento,
         "Termo de momento",
@@ -222,7 +338,7 @@ if __name__ == "__main__":
 
     # Ordem de apresentação
     mostrar_efeito_param(
-        matriz,
+        repositorio,
         2,
         valores_ordem,
         "Aleatoriedade",
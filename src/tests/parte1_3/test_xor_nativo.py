@@ -0,0 +1,59 @@
+import numpy as np
+from lib.rna.ativacao import Sigmoide, TangenteHiperbolica
+from lib.rna.camada import CamadaDensa
+from lib.rna.monitores import ParagemLimiar, ParagemPlateau
+from lib.rna.rede_neuronal import RedeNeuronal
+import matplotlib.pyplot as plt
+
+print("-- PROBLEMA XOR -- (cod. binária, treino sem Keras)")
+
+
+"""
+Testa a rede XOR com a mesma arquitetura de test_xor.py, mas treinada com a
+implementação própria da retropropagação (sem TensorFlow).
+"""
+X = np.array([[0, 0], [0, 1], [1, 0], [1, 1]])
+y = np.array([[0], [1], [1], [0]])
+
+# Semente fixa, para que o treino (e a inicialização aleatória dos pesos) seja
+# reprodutível
+np.random.seed(2)
+
+# Arquitetura da rede
+rede = RedeNeuronal()
+rede.juntar(CamadaDensa(dim_entrada=0, dim_saida=2))
+rede.juntar(
+    CamadaDensa(dim_entrada=2, dim_saida=2, funcao_ativacao=TangenteHiperbolica())
+)
+rede.juntar(CamadaDensa(dim_entrada=2, dim_saida=1, funcao_ativacao=Sigmoide()))
+
+# Treino da rede
+# Os pesos começam com uma distribuição normal (e não a inicialização da
+# plataforma Keras), com a qual o momento 0.99 de test_xor.py oscila e só converge
+# em cerca de 40% das sementes; com momento 0.9 e mais épocas, cerca de 75% das
+# sementes (0 a 29) atingem o erro de 1e-3 (as restantes ficam num mínimo local,
+# comum numa camada escondida com apenas 2 neurónios)
+erros = rede.treinar(
+    entradas=X,
+    saidas=y,
+    epocas=5000,
+    taxa_aprendizagem=0.5,
+    momento=0.9,
+    ordem_aleatoria=False,
+    # Termina o treino quando o erro converge, em vez de executar todas as épocas
+    monitores=[ParagemLimiar(1e-3), ParagemPlateau(paciencia=200, delta_min=1e-6)],
+)
+if erros.epoca_paragem is not None:
+    print(f"Treino interrompido na época {erros.epoca_paragem}")
+
+# Previsão
+yn = rede.prever(X)
+
+# Resultados da previsão
+[print(f"{vetor[0]} => {vetor[1]} {np.round(vetor[1])}") for vetor in zip(X, yn)]
+
+# Gráfico de desempenho
+plt.plot(erros)
+plt.xlabel("Época")
+plt.ylabel("Erro")
+plt.show()
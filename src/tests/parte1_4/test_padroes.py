@@ -1,5 +1,6 @@
 import numpy as np
 from keras.layers import Dense, Input
+from lib.rna.padroes import PadroesEmpacotados, gerar_conjunto
 from lib.rna.rede_neuronal_keras import RedeNeuronal
 import matplotlib.pyplot as plt
 
@@ -7,24 +8,20 @@ dim_padrao = (4, 4)  # 16 bits / dimensões / vetores de caraterísticas
 padrao_A = int("0000011001100000", 2)
 padrao_B = int("0110100110010110", 2)
 
-# Todas as combinações possíveis de 16 bits, organizadas em matrizes 4x4
-combinacoes = np.array(
-    [
-        [int(digito) for digito in format(n, "016b")]
-        for n in range(2 ** np.prod(dim_padrao))
-    ]
-).reshape(-1, 4, 4, 1)
+# Todas as combinações possíveis de 16 bits, empacotadas (sem ocupar memória); cada
+# padrão é desempacotado apenas quando é usado
+combinacoes = PadroesEmpacotados.todos(np.prod(dim_padrao))
 
 # Visualização dos padrões
 plt.figure(figsize=(10, 5))
 
 plt.subplot(1, 2, 1)
 plt.title("Padrão A")
-plt.imshow(combinacoes[padrao_A], cmap=plt.cm.gray)
+plt.imshow(combinacoes[padrao_A].reshape(dim_padrao), cmap=plt.cm.gray)
 
 plt.subplot(1, 2, 2)
 plt.title("Padrão B")
-plt.imshow(combinacoes[padrao_B], cmap=plt.cm.gray)
+plt.imshow(combinacoes[padrao_B].reshape(dim_padrao), cmap=plt.cm.gray)
 
 plt.show()
 
@@ -77,60 +74,16 @@ plt.ylabel("Erro")
 plt.show()
 
 
-def gerar_mutacao(padrao, dim, fator_exponencial=1.2):
-    """
-    Gera uma mutação do padrão fornecido.
-    Começa por esoclher a quantidade de bits a alterar com uma distribuição exponencial
-    (mais provável que se alterem poucos bits do que muitos, mínimo 1).
-    Em seguida, escolhe aleatoriamente as posições dos bits a alterar.
-    Por fim, altera os bits selecionados com a operação XOR bit-a-bit.
-
-    Parâmetros:
-        padrao: Padrão a ser mutado (número inteiro).
-        dim: Dimensão do padrão (porque zeros à esquerda não são contados para inteiros)
-
-    Retorna:
-        Padrão mutado (número inteiro).
-    """
-    max_alterar = dim // 2
-    probabilidades = [1 / (N + 1) ** fator_exponencial for N in range(max_alterar)]
-    probabilidades /= np.sum(probabilidades)
-
-    # Gerar um número aleatório de bits a alterar
-    num_alterar = np.random.choice(range(max_alterar), p=probabilidades) + 1
-
-    # Criar uma máscara com o número selecionado de bits a 1
-    posicoes_alterar = np.random.choice(range(dim), size=num_alterar, replace=False)
-    mascara = np.zeros(dim, dtype=int)
-    mascara[posicoes_alterar] = 1
-
-    mascara_bit = int("".join(map(str, mascara)), 2)
-
-    # Aplicar a operação XOR para inverter os bits selecionados
-    padrao_mutacao = padrao ^ mascara_bit
-
-    return padrao_mutacao
-
-
 # Dados de teste
+# Mutações dos padrões A e B: o número de bits alterados segue uma distribuição
+# exponencial (mais provável que se alterem poucos bits do que muitos, mínimo 1),
+# e as posições dos bits a alterar são escolhidas aleatoriamente
 num_instancias = 500
-num_padrao_A = num_instancias // 2  # metade das instâncias são do padrão A
-# caso este valor seja ímpar, o padrão B terá a que resta da divisão inteira
-
-Xteste = np.empty((0, 16), dtype=int)
-
-# Gerar mutações para o padrão A e acrescentar ao conjunto de teste
-for _ in range(num_padrao_A):
-    mutacaoA = combinacoes[gerar_mutacao(padrao_A, dim=16)].flatten()
-    Xteste = np.vstack((Xteste, mutacaoA))
-
-# Gerar mutações para o padrão B e acrescentar ao conjunto de teste
-for _ in range(num_instancias - num_padrao_A):
-    mutacaoB = combinacoes[gerar_mutacao(padrao_B, dim=16)].flatten()
-    Xteste = np.vstack((Xteste, mutacaoB))
-
-# As saídas esperadas do conjunto de teste
-yteste = np.array([[1, 0]] * num_padrao_A + [[0, 1]] * (num_instancias - num_padrao_A))
+# Metade das instâncias são do padrão A; caso este valor seja ímpar, o padrão B terá
+# a que resta da divisão inteira
+Xteste, yteste = gerar_conjunto(
+    [padrao_A, padrao_B], num_instancias, num_bits=np.prod(dim_padrao)
+)
 
 # Previsão
 yn_teste = rede.prever(Xteste)